@@ -1,33 +1,19 @@
 import streamlit as st
-import base64
-from email.mime.text import MIMEText
 from datetime import datetime
 import json
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+import gmail_api
+import mime_builder
+import templates
+import token_manager
+
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.send', 
           'https://www.googleapis.com/auth/gmail.compose']
 
-# Template body
-TEMPLATE_BODY = """My Relevant experience includes:
-
- • Advanced Modeling: Built MAVeRiC-AD, a vision-language ensemble for Alzheimer's MRI classification (0.90 ROC-AUC across multi-site data). Responsible for dataset design, modeling, and multi-center validation.
-
- • End-to-End Delivery: Developed and deployed HIPAA-compliant risk prediction systems on 1.5M+ patient records using XGBoost/LightGBM with SHAP explainability—covering data engineering, modeling, evaluation, and operationalization.
-
- • System-Level Work: Experienced with reproducible pipelines, model tracking, scalable inference, and cross-functional collaboration with clinical and product teams.
-
-I'm exploring opportunities where I can contribute to both high-level ML strategy and hands-on development within healthcare AI. If your group is hiring, or if there's someone you'd recommend I connect with, I'd appreciate the guidance.
-
-Thank you,
-Pavithra
-Website: https://pavi2803.notion.site/Pavithra-Senthilkumar-36e0d62aea2f4c8086fd279363c59b34
-LinkedIn: https://www.linkedin.com/in/pavithra-senthilkumar-2803/
-GitHub: https://github.com/pavi2803"""
+# Template body (registered in templates.py)
+TEMPLATE_BODY = templates.registry.render('text/standard')
 
 def get_credentials_from_secrets():
     """Get credentials from Streamlit secrets or manual input"""
@@ -49,42 +35,31 @@ def get_gmail_service():
         return None
     
     try:
-        creds = Credentials.from_authorized_user_info(st.session_state.token_data, SCOPES)
-        
-        # Refresh if expired
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+        # Shared per account: refreshed in the background before it expires
+        creds = token_manager.for_info(st.session_state.token_data, SCOPES).get()
+        if creds.token != st.session_state.token_data.get('token'):
             st.session_state.token_data = json.loads(creds.to_json())
         
-        return build('gmail', 'v1', credentials=creds)
+        return gmail_api.get_service(creds)
     except Exception as e:
         st.error(f"Failed to create Gmail service: {e}")
         return None
 
 def create_message(to, subject, body):
-    """Create email message"""
-    message = MIMEText(body)
-    message['to'] = to
-    message['subject'] = subject
-    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+    """Create email message (RFC 822 bytes, uploaded as media)"""
+    return mime_builder.build_message({'to': to, 'subject': subject}, body)
 
 def schedule_email(service, to, subject, body, scheduled_time):
     """Schedule email to be sent at specific time"""
     try:
-        message = create_message(to, subject, body)
+        data = create_message(to, subject, body)
         
         # Convert scheduled time to milliseconds since epoch
         scheduled_datetime = datetime.fromisoformat(scheduled_time)
         scheduled_send_time = int(scheduled_datetime.timestamp() * 1000)
         
-        # Add scheduledSendDateTime to message
-        message['scheduledSendDateTime'] = scheduled_send_time
-        
-        # Send the message
-        sent_message = service.users().messages().send(
-            userId='me',
-            body=message
-        ).execute()
+        # Send the message, with scheduledSendDateTime as its metadata
+        sent_message = gmail_api.send_message(service, data, {'scheduledSendDateTime': scheduled_send_time})
         
         return True, f"Email scheduled successfully! Message ID: {sent_message['id']}"
     except HttpError as error:
@@ -182,6 +157,7 @@ with st.sidebar:
     else:
         st.success("✅ Authenticated with Gmail!")
         st.info("Token stored in session")
+        st.caption(gmail_api.get_budgeter().describe())
         
         if st.button("🔄 Clear Token"):
             if 'token_data' in st.session_state:
@@ -247,7 +223,12 @@ if 'token_data' in st.session_state:
     # Preview
     st.markdown("---")
     with st.expander("👁️ Preview Email"):
-        full_body = f"Hi {recipient_first_name},\n\n{company_intro}\n\n{TEMPLATE_BODY}" if company_intro else f"Hi {recipient_first_name},\n\n{TEMPLATE_BODY}"
+        if company_intro:
+            full_body = templates.registry.render('text/intro_email', recipient_name=recipient_first_name,
+                                                  company_intro=company_intro, experience=TEMPLATE_BODY)
+        else:
+            full_body = templates.registry.render('text/greeting_email', recipient_name=recipient_first_name,
+                                                  experience=TEMPLATE_BODY)
         
         st.markdown(f"**To:** {recipient_email or '[Recipient Email]'}")
         st.markdown(f"**Subject:** {subject_line}")
@@ -269,7 +250,8 @@ if 'token_data' in st.session_state:
             st.error("❌ Please enter custom company introduction")
         else:
             # Create full email body
-            full_body = f"Hi {recipient_first_name},\n\n{company_intro}\n\n{TEMPLATE_BODY}"
+            full_body = templates.registry.render('text/intro_email', recipient_name=recipient_first_name,
+                                                  company_intro=company_intro, experience=TEMPLATE_BODY)
             
             # Get Gmail service
             service = get_gmail_service()
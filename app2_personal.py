@@ -1,107 +1,35 @@
 import streamlit as st
-import base64
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 import json
 from datetime import datetime, timezone
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-# Gmail API scopes
-SCOPES = [
-    'https://www.googleapis.com/auth/gmail.compose',
-    'https://www.googleapis.com/auth/gmail.send'
-]
-
-# ---------------- TEMPLATES ---------------- #
-
-RECRUITER_TEMPLATE = """
-I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions, (link: https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1) and have built end-to-end ML systems including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.
-"""
-
-HIRING_MANAGER_TEMPLATE = """
-I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions, (link: https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1) and have built end-to-end ML systems including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.
-"""
-
-SOFTWARE_RECRUITER = """
-My Relevant experience includes:
-
-• Backend Development & Data Pipelines: Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records with optimized ETL pipelines and database integrations.
-
-• System Architecture & Performance: Implemented distributed systems with performance optimization, achieving ~2× throughput improvements through efficient resource management and parallel processing.
-
-• Full-Stack Development & Deployment: Built and deployed production applications with end-to-end ownership, including API development, cloud infrastructure (AWS), CI/CD pipelines, and monitoring.
-"""
-
-SIGNATURE = """
-Thank you,
-Pavithra
-Website: https://pavi2803.github.io/pavithrasenthilkumar.github.io/
-LinkedIn: https://www.linkedin.com/in/pavithra-senthilkumar-2803/
-GitHub: https://github.com/pavi2803"""
+import campaign
+import gmail_api
+import templates
 
 # ---------------- AUTH ---------------- #
 
+def get_gmail_credentials():
+    return campaign.session_credentials(st.session_state)
+
 def get_gmail_service():
-    if 'token_data' not in st.session_state:
+    creds = get_gmail_credentials()
+    if creds is None:
         return None
-
-    creds = Credentials.from_authorized_user_info(
-        st.session_state.token_data, SCOPES
-    )
-
-    if creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        st.session_state.token_data = json.loads(creds.to_json())
-
-    return build('gmail', 'v1', credentials=creds)
+    return gmail_api.get_service(creds)
 
 # ---------------- GMAIL HELPERS ---------------- #
 
-def create_message_with_attachment(to, subject, body_text, attachment_data=None, attachment_filename=None):
-    """Create a plain text email message with optional attachment"""
-    message = MIMEMultipart("mixed")
-    message['to'] = to
-    message['subject'] = subject
-
-    # Use plain text
-    text_part = MIMEText(body_text, "plain")
-    message.attach(text_part)
-
-    # Add attachment if provided
-    if attachment_data and attachment_filename:
-        attachment = MIMEApplication(attachment_data, _subtype="pdf")
-        attachment.add_header('Content-Disposition', 'attachment', filename=attachment_filename)
-        message.attach(attachment)
-
-    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
-
-def create_draft(service, to, subject, body, attachment_data=None, attachment_filename=None):
-    """Create a draft in Gmail"""
-    message = create_message_with_attachment(to, subject, body, attachment_data, attachment_filename)
-    draft = service.users().drafts().create(
-        userId='me',
-        body={'message': message}
-    ).execute()
-    return draft['id']
-
 def schedule_send(service, to, subject, body, send_datetime, attachment_data=None, attachment_filename=None):
     """Schedule an email to be sent at a specific time"""
     try:
-        message = create_message_with_attachment(to, subject, body, attachment_data, attachment_filename)
+        data = gmail_api.compose_message(to, subject, body, attachment_data, attachment_filename, 'plain', media=True)
         
         # Convert to milliseconds timestamp
         timestamp_ms = int(send_datetime.timestamp() * 1000)
-        message['scheduledSendTime'] = timestamp_ms
         
-        # Send with schedule
-        result = service.users().messages().send(
-            userId='me',
-            body=message
-        ).execute()
+        # Send with schedule (the message goes up as media, the schedule as its metadata)
+        result = gmail_api.send_message(service, data, {'scheduledSendTime': timestamp_ms})
         
         return True, f"Email scheduled! Message ID: {result['id']}"
     except HttpError as e:
@@ -110,6 +38,47 @@ def schedule_send(service, to, subject, body, send_datetime, attachment_data=Non
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+# ---------------- CAMPAIGN ---------------- #
+
+CAMPAIGN_SECTIONS = {
+    "Recruiter": 'text/recruiter',
+    "Hiring Manager / Technical Contact": 'text/hiring_manager',
+    "Software Hiring Manager": 'text/software',
+}
+
+def create_plain_drafts(service, drafts):
+    return gmail_api.compose_drafts(service, drafts, 'plain')
+
+def plain_closing(outro_text, has_resume):
+    return campaign.build_closing(outro_text, has_resume, 'plain')
+
+def campaign_schedule_action(attachment, send_time):
+    """Schedule each row's send; rows Gmail won't schedule get a draft instead"""
+    attachment_data, attachment_filename = attachment or (None, None)
+
+    def action(service, rows):
+        fallback = []
+        for row in rows:
+            if row.draft_id is not None:
+                fallback.append(row)
+                continue
+            success, message = schedule_send(service, row.email, row.subject, row.body,
+                                             row.send_time or send_time, attachment_data, attachment_filename)
+            if success:
+                row.result = message
+                row.done = True
+            else:
+                fallback.append(row)
+        for row in campaign.draft_rows(create_plain_drafts, service, fallback, attachment):
+            row.result = f"draft {row.draft_id} (schedule manually)"
+            row.done = True
+    return action
+
+CAMPAIGN_ACTIONS = {
+    "📝 Create Drafts": lambda attachment, send_time: campaign.drafts_action(create_plain_drafts, attachment),
+    "⏰ Schedule Send": campaign_schedule_action,
+}
+
 # ---------------- UI ---------------- #
 
 st.set_page_config(page_title="Gmail Scheduler", layout="wide", page_icon="📧")
@@ -161,6 +130,7 @@ with st.sidebar:
                 st.error("❌ Invalid JSON")
     else:
         st.success("✅ Authenticated with Gmail!")
+        st.caption(gmail_api.get_budgeter().describe())
         if st.button("🔄 Clear Token"):
             del st.session_state.token_data
             st.rerun()
@@ -195,6 +165,15 @@ with st.sidebar:
 
 if 'token_data' in st.session_state:
     st.markdown("---")
+
+    mode = st.radio("Mode", ["✉️ Single Email", "📋 Campaign (CSV)"], horizontal=True)
+    if mode == "📋 Campaign (CSV)":
+        campaign.campaign_ui(
+            CAMPAIGN_SECTIONS, 'text/email', plain_closing, CAMPAIGN_ACTIONS,
+            get_gmail_credentials, default_subject="Applied ML in Healthcare – Quick Intro",
+            scheduled=("⏰ Schedule Send",), html=False
+        )
+        st.stop()
     
     # Recipient info
     st.markdown("### 👤 Recipient Information")
@@ -227,11 +206,11 @@ if 'token_data' in st.session_state:
 
     # Select template
     if recipient_type == "Recruiter":
-        experience_template = RECRUITER_TEMPLATE
+        experience_template = templates.registry['text/recruiter']
     elif recipient_type == "Hiring Manager / Technical Contact":
-        experience_template = HIRING_MANAGER_TEMPLATE
+        experience_template = templates.registry['text/hiring_manager']
     else:
-        experience_template = SOFTWARE_RECRUITER
+        experience_template = templates.registry['text/software']
 
     # Custom intro
     st.markdown("### ✍️ Custom Company Introduction")
@@ -304,15 +283,10 @@ if 'token_data' in st.session_state:
         st.info(f"⏰ Email will be sent at: {send_datetime.strftime('%B %d, %Y at %I:%M %p')}")
 
     # Build email body
-    body_text = f"Hi {recipient_name or '[First Name]'},\n\n{company_intro}\n\n{experience_template}"
-    
-    if outro_text:
-        body_text += f"\n\n{outro_text}"
-    
-    if resume_text:
-        body_text += resume_text
-    
-    body_text += f"\n\n{SIGNATURE}"
+    email_template = templates.registry['text/email'].bind(
+        experience=experience_template, closing=campaign.build_closing(outro_text, bool(resume_text), 'plain')
+    )
+    body_text = email_template.render(recipient_name=recipient_name or '[First Name]', company_intro=company_intro)
 
     # Preview
     st.markdown("---")
@@ -351,13 +325,14 @@ if 'token_data' in st.session_state:
                     if send_option == "Create Draft (Manual Schedule)":
                         # Create draft
                         with st.spinner("Creating draft..."):
-                            draft_id = create_draft(
+                            draft_id = gmail_api.compose_draft(
                                 service,
                                 recipient_email,
                                 subject_line,
                                 body_text,
                                 resume_data,
-                                resume_filename
+                                resume_filename,
+                                'plain'
                             )
                         st.success("✅ Draft created in Gmail!")
                         st.info("📧 Open Gmail → Drafts → Click on draft → Schedule send")
@@ -381,13 +356,14 @@ if 'token_data' in st.session_state:
                         else:
                             st.warning(message)
                             # Fallback to draft
-                            draft_id = create_draft(
+                            draft_id = gmail_api.compose_draft(
                                 service,
                                 recipient_email,
                                 subject_line,
                                 body_text,
                                 resume_data,
-                                resume_filename
+                                resume_filename,
+                                'plain'
                             )
                             st.info("✅ Draft created instead. Schedule manually from Gmail.")
                             
@@ -1,135 +1,93 @@
 import streamlit as st
-import base64
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 import json
 from datetime import datetime
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-import gspread
-
-# Gmail API scopes
-GMAIL_SCOPES = [
-    'https://www.googleapis.com/auth/gmail.compose',
-    'https://www.googleapis.com/auth/gmail.send'
-]
-
-# Google Sheets scopes
-SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-
-# ---------------- TEMPLATES ---------------- #
-
-AGENT_PAPER_TEMPLATE = """
-<p>I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions (link: <a href="https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1">https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1</a>) and have built end-to-end ML systems including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.</p>
-"""
-
-ML_SYSTEMS_TEMPLATE = """
-<p>My Relevant experience includes:</p>
-<p><b>• Applied ML and Finetuning LLM:</b> Built an Agentic vision-language model for medical image classification, achieving ~0.90 ROC-AUC across multi-site data, with ownership across dataset design, modeling, and validation.</p>
-<p><b>• End-to-End ML Delivery:</b> Developed and deployed large-scale risk prediction models on 1.5M+ records using XGBoost/LightGBM, including feature engineering, explainability, evaluation, and production workflows.</p>
-<p><b>• ML Systems & Collaboration:</b> Experience with reproducible pipelines, model tracking, scalable inference, and close collaboration with cross-functional stakeholders.</p>
-"""
-
-SOFTWARE_TEMPLATE = """
-<p>My Relevant experience includes:</p>
-<p><b>• Backend Development & Data Pipelines:</b> Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records with optimized ETL pipelines and database integrations.</p>
-<p><b>• System Architecture & Performance:</b> Implemented distributed systems with performance optimization, achieving ~2× throughput improvements through efficient resource management and parallel processing.</p>
-<p><b>• Full-Stack Development & Deployment:</b> Built and deployed production applications with end-to-end ownership, including API development, cloud infrastructure (AWS), CI/CD pipelines, and monitoring.</p>
-"""
-
-SIGNATURE = """
-<p>Thank you,<br>
-Pavithra<br>
-<a href="https://pavi2803.github.io/pavithrasenthilkumar.github.io/">Website</a> | 
-<a href="https://www.linkedin.com/in/pavithra-senthilkumar-2803/">LinkedIn</a> | 
-<a href="https://github.com/pavi2803">GitHub</a></p>
-"""
+
+import campaign
+import gmail_api
+import sheets
+import templates
 
 # ---------------- AUTH ---------------- #
 
+def get_gmail_credentials():
+    return campaign.session_credentials(st.session_state)
+
 def get_gmail_service():
-    if 'token_data' not in st.session_state:
+    creds = get_gmail_credentials()
+    if creds is None:
         return None
+    return gmail_api.get_service(creds)
 
-    creds = Credentials.from_authorized_user_info(
-        st.session_state.token_data, GMAIL_SCOPES
-    )
-
-    if creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        st.session_state.token_data = json.loads(creds.to_json())
-
-    return build('gmail', 'v1', credentials=creds)
-
-def get_sheets_client():
-    """Get Google Sheets client using service account"""
+def get_schedule_writer():
+    """Buffered writer for the schedule sheet; client and worksheet are opened once per process"""
     if 'sheets_creds' not in st.session_state:
         return None
-    
-    creds = ServiceAccountCredentials.from_service_account_info(
-        st.session_state.sheets_creds,
-        scopes=SHEETS_SCOPES
-    )
-    return gspread.authorize(creds)
+    if 'schedule_writer' not in st.session_state:
+        st.session_state.schedule_writer = sheets.get_writer(st.session_state.sheets_creds, st.session_state.sheet_id)
+    return st.session_state.schedule_writer
 
 # ---------------- GMAIL HELPERS ---------------- #
 
-def create_message_with_attachment(to, subject, body_html, attachment_data=None, attachment_filename=None):
-    """Create an HTML email message with optional attachment"""
-    message = MIMEMultipart("mixed")
-    message['to'] = to
-    message['subject'] = subject
-
-    # Create the HTML part
-    msg_alternative = MIMEMultipart("alternative")
-    html_part = MIMEText(body_html, "html")
-    msg_alternative.attach(html_part)
-    message.attach(msg_alternative)
-
-    # Add attachment if provided
-    if attachment_data and attachment_filename:
-        attachment = MIMEApplication(attachment_data, _subtype="pdf")
-        attachment.add_header('Content-Disposition', 'attachment', filename=attachment_filename)
-        message.attach(attachment)
-
-    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
-
-def create_draft(service, to, subject, body, attachment_data=None, attachment_filename=None):
-    message = create_message_with_attachment(to, subject, body, attachment_data, attachment_filename)
-    draft = service.users().drafts().create(
-        userId='me',
-        body={'message': message}
-    ).execute()
-    return draft['id']
-
 def add_to_schedule_sheet(draft_id, recipient_email, recipient_name, subject, send_time):
     """Add scheduled email to Google Sheet"""
     try:
-        client = get_sheets_client()
-        if not client:
+        writer = get_schedule_writer()
+        if not writer:
             return False, "Sheets client not configured"
         
-        sheet = client.open_by_key(st.session_state.sheet_id).sheet1
-        
-        row = [
-            draft_id,
-            recipient_email,
-            recipient_name,
-            subject,
-            send_time.strftime('%Y-%m-%d %H:%M:%S'),
-            'pending',
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        ]
-        
-        sheet.append_row(row)
+        # Buffered: written with other rows in one append within a couple of seconds
+        writer.append(schedule_row(draft_id, recipient_email, recipient_name, subject, send_time))
         return True, "Added to schedule"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+def schedule_row(draft_id, recipient_email, recipient_name, subject, send_time):
+    """Schedule sheet row for a draft"""
+    return [
+        draft_id,
+        recipient_email,
+        recipient_name,
+        subject,
+        send_time.strftime('%Y-%m-%d %H:%M:%S'),
+        'pending',
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    ]
+
+# ---------------- CAMPAIGN ---------------- #
+
+CAMPAIGN_SECTIONS = {
+    "Agent Paper": 'html/agent_paper',
+    "ML Systems": 'html/ml_systems',
+    "Software Content": 'html/software',
+}
+
+def campaign_schedule_action(attachment, send_time):
+    """Create drafts, then queue each chunk's drafts for the schedule sheet"""
+    try:
+        writer = get_schedule_writer()
+    except Exception as e:
+        raise ValueError(f"Could not open the schedule sheet: {e}")
+    if not writer:
+        raise ValueError("Configure Google Sheets in the sidebar for scheduling")
+
+    def action(service, rows):
+        drafted = campaign.draft_rows(gmail_api.compose_drafts, service, rows, attachment)
+        if drafted:
+            writer.extend([
+                schedule_row(row.draft_id, row.email, row.name, row.subject, row.send_time or send_time)
+                for row in drafted
+            ])
+        for row in drafted:
+            row.result = f"scheduled {(row.send_time or send_time).strftime('%Y-%m-%d %H:%M')}"
+            row.done = True
+    return action
+
+CAMPAIGN_ACTIONS = {
+    "📝 Create Drafts": lambda attachment, send_time: campaign.drafts_action(gmail_api.compose_drafts, attachment),
+    "⏰ Schedule for Later": campaign_schedule_action,
+}
+
 # ---------------- UI ---------------- #
 
 st.set_page_config(page_title="Gmail Draft + Scheduler", layout="wide")
@@ -157,6 +115,7 @@ with st.sidebar:
                 st.error("Invalid JSON")
     else:
         st.success("✅ Gmail Authenticated")
+        st.caption(gmail_api.get_budgeter().describe())
         if st.button("Clear Gmail Token"):
             del st.session_state.token_data
             st.rerun()
@@ -186,10 +145,30 @@ with st.sidebar:
                 st.error("Invalid configuration")
     else:
         st.success("✅ Sheets Configured")
+        writer = st.session_state.get('schedule_writer')
+        if writer is not None and writer.pending:
+            st.info(f"📤 {writer.pending} schedule rows waiting to be written")
+            if writer.last_error is not None:
+                st.warning(f"⚠️ Last sheet write failed: {writer.last_error}")
+            if st.button("Write now"):
+                try:
+                    writer.flush()
+                except Exception as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.rerun()
         if st.button("Clear Sheets Config"):
-            del st.session_state.sheets_creds
-            del st.session_state.sheet_id
-            st.rerun()
+            # Done with this sheet: write anything still buffered first
+            try:
+                if writer is not None:
+                    writer.flush()
+            except Exception as e:
+                st.error(f"❌ {writer.pending} rows could not be written: {e}")
+            else:
+                del st.session_state.sheets_creds
+                del st.session_state.sheet_id
+                st.session_state.pop('schedule_writer', None)
+                st.rerun()
 
     st.markdown("---")
     st.header("📄 Resume Files")
@@ -220,6 +199,15 @@ with st.sidebar:
 
 if 'token_data' in st.session_state:
 
+    mode = st.radio("Mode", ["✉️ Single Email", "📋 Campaign (CSV)"], horizontal=True)
+    if mode == "📋 Campaign (CSV)":
+        campaign.campaign_ui(
+            CAMPAIGN_SECTIONS, 'html/email', campaign.build_closing, CAMPAIGN_ACTIONS,
+            get_gmail_credentials, default_subject="Applied ML in Healthcare – Quick Intro",
+            scheduled=("⏰ Schedule for Later",)
+        )
+        st.stop()
+
     col1, col2 = st.columns(2)
 
     with col1:
@@ -253,11 +241,11 @@ if 'token_data' in st.session_state:
 
     # Select template
     if recipient_type == "Agent Paper":
-        experience_template = AGENT_PAPER_TEMPLATE
+        experience_template = templates.registry['html/agent_paper']
     elif recipient_type == "ML Systems":
-        experience_template = ML_SYSTEMS_TEMPLATE
+        experience_template = templates.registry['html/ml_systems']
     else:
-        experience_template = SOFTWARE_TEMPLATE
+        experience_template = templates.registry['html/software']
 
     # ---------- OPTIONAL SECTIONS ---------- #
     
@@ -329,15 +317,11 @@ if 'token_data' in st.session_state:
 
     st.markdown("---")
     with st.expander("Preview Email"):
-        body_html = f"<p>Hi {recipient_name},</p>\n<p>{company_intro}</p>\n{experience_template}"
-        
-        if outro_text:
-            body_html += f"\n<p>{outro_text}</p>"
-        
-        if resume_text:
-            body_html += f"\n{resume_text}"
-        
-        body_html += f"\n{SIGNATURE}"
+        # Build email body
+        email_template = templates.registry['html/email'].bind(
+            experience=experience_template, closing=campaign.build_closing(outro_text, bool(resume_text))
+        )
+        body_html = email_template.render(recipient_name=recipient_name, company_intro=company_intro)
         
         st.markdown(f"**To:** {recipient_email}<br>**Subject:** {subject_line}<br><br>", unsafe_allow_html=True)
         st.markdown(body_html, unsafe_allow_html=True)
@@ -363,7 +347,7 @@ if 'token_data' in st.session_state:
 
             try:
                 # Create draft
-                draft_id = create_draft(
+                draft_id = gmail_api.compose_draft(
                     service,
                     recipient_email,
                     subject_line,
@@ -0,0 +1,470 @@
+"""
+Asyncio scheduler engine with async transports.
+
+One event loop holds a timer per due job and a bounded number of sends in
+flight, so a single process on one core can keep thousands of SMTP /
+Gmail / Graph requests going at once instead of blocking on each.
+
+Transports (all plain asyncio streams, no extra dependencies):
+- AsyncSMTPTransport   - pooled ESMTP with STARTTLS + AUTH PLAIN
+- GmailRESTTransport   - Gmail REST messages.send / drafts.create
+- GraphTransport       - Microsoft Graph POST /me/messages (drafts)
+
+Every transport takes a base URL / host so it can be pointed at the local
+stand-ins in benchmarks/standins.py.
+"""
+
+import asyncio
+import base64
+import json
+import re
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import graph_api
+import mime_builder
+from scheduler import DispatchReport
+
+GMAIL_API_URL = 'https://gmail.googleapis.com'
+GRAPH_API_URL = 'https://graph.microsoft.com/v1.0'
+
+
+# ---------------- HTTP ---------------- #
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class AsyncHTTPClient:
+    """Minimal HTTP/1.1 keep-alive client with a bounded connection pool"""
+
+    def __init__(self, base_url, max_connections=100, timeout=30):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _open(self):
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=ssl.create_default_context() if self.https else None
+        )
+
+    async def request(self, method, path, body=b'', headers=None):
+        """Send a request and return (status, headers, body)"""
+        async with self._slots:
+            for attempt in range(2):
+                conn = self._idle.pop() if self._idle else None
+                reused = conn is not None
+                if conn is None:
+                    conn = await self._open()
+                try:
+                    status, resp_headers, data = await asyncio.wait_for(
+                        self._roundtrip(conn, method, path, body, headers or {}), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if reused and attempt == 0:
+                        continue  # keep-alive connection went stale; retry on a fresh one
+                    raise
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if resp_headers.get('connection', '').lower() == 'close':
+                    conn[1].close()
+                else:
+                    self._idle.append(conn)
+                return status, resp_headers, data
+
+    async def request_json(self, method, path, payload, headers=None):
+        body = json.dumps(payload).encode()
+        all_headers = {'Content-Type': 'application/json'}
+        all_headers.update(headers or {})
+        status, _, data = await self.request(method, path, body, all_headers)
+        if status >= 400:
+            raise HTTPError(status, data)
+        return json.loads(data) if data else {}
+
+    async def _roundtrip(self, conn, method, path, body, headers):
+        reader, writer = conn
+        head = [f'{method} {self.base_path}{path} HTTP/1.1', f'Host: {self.host}',
+                f'Content-Length: {len(body)}']
+        head.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        status = int(status_line.split()[1])
+        resp_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            resp_headers[name.strip().lower()] = value.strip()
+
+        if resp_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b''.join(chunks)
+        elif 'content-length' in resp_headers:
+            data = await reader.readexactly(int(resp_headers['content-length']))
+        else:
+            data = await reader.read()
+            resp_headers['connection'] = 'close'
+        return status, resp_headers, data
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+# ---------------- SMTP ---------------- #
+
+class SMTPError(Exception):
+    def __init__(self, code, text):
+        super().__init__(f"{code} {text}")
+        self.code = code
+        self.text = text
+
+
+def _to_smtp_data(data):
+    """Normalise to CRLF line endings and dot-stuff, as smtplib does"""
+    data = re.sub(rb'(?:\r\n|\n|\r(?!\n))', b'\r\n', data)
+    data = re.sub(rb'(?m)^\.', b'..', data)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    return data + b'.\r\n'
+
+
+def _is_reconnectable(error):
+    # 421 = service not available, closing transmission channel
+    return not isinstance(error, SMTPError) or error.code == 421
+
+
+class _SMTPConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def reply(self, expect):
+        lines = []
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError('SMTP connection closed')
+            lines.append(line[4:].decode(errors='replace').strip())
+            if line[3:4] != b'-':
+                break
+        code = int(line[:3])
+        if code != expect:
+            raise SMTPError(code, ' '.join(lines))
+        return code
+
+    async def command(self, line, expect):
+        self.writer.write(line.encode() + b'\r\n')
+        await self.writer.drain()
+        return await self.reply(expect)
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncSMTPTransport:
+    """
+    Pooled async SMTP sender (STARTTLS + AUTH PLAIN).
+
+    A 421 or a dropped socket is retried once on a fresh connection, unless
+    the whole message was already written: the server may have queued it,
+    so the error is raised rather than risking a duplicate. A refusal the
+    server answered is RSET and the connection goes back to the pool.
+    """
+
+    def __init__(self, host, port, username, password, from_email=None, use_tls=True,
+                 connections=8, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.from_email = from_email or username
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(connections)
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        conn = _SMTPConnection(reader, writer)
+        try:
+            await conn.reply(220)
+            await conn.command('EHLO localhost', 250)
+            if self.use_tls:
+                await conn.command('STARTTLS', 220)
+                await writer.start_tls(ssl.create_default_context(), server_hostname=self.host)
+                await conn.command('EHLO localhost', 250)
+            if self.username:
+                token = base64.b64encode(f'\0{self.username}\0{self.password}'.encode()).decode()
+                await conn.command(f'AUTH PLAIN {token}', 235)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    async def send_message(self, to_addrs, data):
+        """Send raw RFC 822 bytes; reconnects once after a 421 or dropped socket before the message is out"""
+        await self.send_data(to_addrs, _to_smtp_data(data))
+
+    async def send_data(self, to_addrs, payload):
+        """send_message() for a payload that is already DATA-ready (CRLF, dot-stuffed, terminated)"""
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        async with self._slots:
+            for attempt in range(2):
+                conn = self._idle.pop() if self._idle else await self._connect()
+                try:
+                    await asyncio.wait_for(self._transaction(conn, to_addrs, payload), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError, SMTPError) as e:
+                    if not _is_reconnectable(e) and await self._reset(conn):
+                        self._idle.append(conn)
+                        raise
+                    conn.close()
+                    if attempt == 0 and _is_reconnectable(e) and not getattr(e, 'after_data', False):
+                        continue
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+                self._idle.append(conn)
+                return
+
+    async def _transaction(self, conn, to_addrs, payload):
+        await conn.command(f'MAIL FROM:<{self.from_email}>', 250)
+        for addr in to_addrs:
+            await conn.command(f'RCPT TO:<{addr}>', 250)
+        await conn.command('DATA', 354)
+        conn.writer.write(payload)
+        # The message is out: from here the server may have queued it, whatever happens to the reply
+        try:
+            await conn.writer.drain()
+            await conn.reply(250)
+        except (ConnectionError, asyncio.IncompleteReadError, SMTPError) as e:
+            e.after_data = True
+            raise
+
+    async def _reset(self, conn):
+        """RSET after an answered refusal; False if the session didn't survive it"""
+        try:
+            await asyncio.wait_for(conn.command('RSET', 250), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError, SMTPError, asyncio.TimeoutError):
+            return False
+        return True
+
+    async def send(self, to, subject, body, html=False):
+        headers = {'From': self.from_email, 'To': to, 'Subject': subject}
+        # Same layout as simple_app.send_email, so a job's message doesn't depend on the engine
+        with mime_builder.writer(smtp=True).write(headers, body, 'html' if html else 'plain', mixed=True) as view:
+            payload = bytes(view)  # other sends on this loop reuse the writer while this one awaits
+        await self.send_data(to, payload)
+        return "Email sent successfully"
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                await asyncio.wait_for(conn.command('QUIT', 221), 5)
+            except Exception:
+                pass
+            conn.close()
+
+
+# ---------------- GMAIL / GRAPH ---------------- #
+
+class GmailRESTTransport:
+    """Gmail REST API: users.messages.send and users.drafts.create"""
+
+    def __init__(self, get_token, base_url=GMAIL_API_URL, max_connections=100, budgeter=None,
+                 max_retries=4):
+        self.get_token = get_token  # () -> OAuth access token
+        self.http = AsyncHTTPClient(base_url, max_connections)
+        self.budgeter = budgeter  # optional gmail_api.QuotaBudgeter pacing every call
+        self.max_retries = max_retries
+
+    async def _call(self, method, path, payload):
+        for attempt in range(self.max_retries + 1):
+            if self.budgeter:
+                await self.budgeter.acquire_async(method)
+            try:
+                return await self.http.request_json(
+                    'POST', path, payload, {'Authorization': f'Bearer {self.get_token()}'}
+                )
+            except HTTPError as e:
+                rate_limited = e.status == 429 or (e.status == 403 and b'ateLimitExceeded' in e.body)
+                if not (self.budgeter and rate_limited) or attempt == self.max_retries:
+                    raise
+                self.budgeter.penalize(2 ** attempt)
+
+    async def send_raw(self, raw):
+        return await self._call('messages.send', '/gmail/v1/users/me/messages/send', {'raw': raw})
+
+    async def create_draft_raw(self, raw):
+        return await self._call('drafts.create', '/gmail/v1/users/me/drafts', {'message': {'raw': raw}})
+
+    async def send(self, to, subject, body, html=False):
+        raw = mime_builder.build_raw({'to': to, 'subject': subject}, body, 'html' if html else 'plain')
+        result = await self.send_raw(raw)
+        return f"Message ID: {result['id']}"
+
+    async def close(self):
+        await self.http.close()
+
+
+class GraphTransport:
+    """Microsoft Graph: POST /me/messages (creates the message in Drafts)"""
+
+    def __init__(self, get_token, base_url=GRAPH_API_URL, max_connections=100):
+        self.get_token = get_token
+        self.http = AsyncHTTPClient(base_url, max_connections)
+
+    async def create_draft(self, to, subject, body_html):
+        return await self.http.request_json(
+            'POST', '/me/messages', graph_api.draft_message(to, subject, body_html),
+            {'Authorization': f'Bearer {self.get_token()}'}
+        )
+
+    async def send(self, to, subject, body, html=True):
+        result = await self.create_draft(to, subject, body)
+        return f"Draft ID: {result['id']}"
+
+    async def close(self):
+        await self.http.close()
+
+
+# ---------------- ENGINE ---------------- #
+
+class AsyncScheduler:
+    """
+    Arms one event-loop timer per job and sends with bounded concurrency.
+
+    on_result usually writes to a job store, so it runs on one recorder
+    thread (in completion order) instead of blocking the event loop.
+    """
+
+    def __init__(self, send, max_in_flight=1000, on_result=None):
+        self.send = send  # async (job) -> (success, message)
+        self.on_result = on_result
+        self.report = DispatchReport(max_in_flight)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._timers = 0
+        self._tasks = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._finished = asyncio.Event()
+        self._recorder = ThreadPoolExecutor(1, thread_name_prefix='record-result') if on_result else None
+
+    @property
+    def pending(self):
+        """Jobs waiting on a timer or currently being sent"""
+        return self._timers + len(self._tasks)
+
+    def add(self, due, job):
+        loop = asyncio.get_running_loop()
+        self._timers += 1
+        self._idle.clear()
+        loop.call_later(max(0.0, due - time.time()), self._fire, due, job)
+
+    def _fire(self, due, job):
+        self._timers -= 1
+        task = asyncio.create_task(self._run(due, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self._tasks.discard(task)
+        self._finished.set()
+        if not self.pending:
+            self._idle.set()
+
+    async def _run(self, due, job):
+        async with self._slots:
+            started = time.time()
+            try:
+                success, message = await self.send(job)
+            except Exception as e:
+                success, message = False, str(e)
+            self.report.record(job, due, started, time.time(), success, message)
+        if self.on_result:
+            await asyncio.get_running_loop().run_in_executor(self._recorder, self.on_result, job, success, message)
+
+    async def join(self):
+        """Wait until every armed job has been sent and recorded"""
+        await self._idle.wait()
+
+    async def next_finished(self):
+        """Wait until one more job has been sent and recorded"""
+        self._finished.clear()
+        await self._finished.wait()
+
+    def close(self):
+        if self._recorder:
+            self._recorder.shutdown()
+
+
+async def run_queue(queue, send, due_of, max_in_flight=1000, lookahead=1.0,
+                    batch_size=1000, on_result=None, max_pending=None):
+    """
+    Drain a scheduler queue backend (HeapQueue / JobStore) through the async engine.
+
+    Jobs due within `lookahead` seconds are popped (claimed, for the store) and
+    armed as timers; the loop then sleeps until more jobs come within range.
+    At most `max_pending` jobs (default 2 * max_in_flight) are claimed and
+    not yet finished at a time, so a large backlog stays in the queue rather
+    than in timers whose leases could run out. Store calls run in threads.
+    Returns the DispatchReport once the queue is empty and everything is sent.
+    """
+    max_pending = max_pending or 2 * max_in_flight
+    engine = AsyncScheduler(send, max_in_flight, on_result)
+    flush = getattr(queue, 'flush', None)
+    try:
+        while True:
+            room = max_pending - engine.pending
+            if room <= 0:
+                await engine.next_finished()
+                continue
+            limit = min(batch_size, room)
+            jobs = await asyncio.to_thread(queue.pop_due, time.time() + lookahead, limit)
+            for job in jobs:
+                engine.add(due_of(job), job)
+            if len(jobs) == limit:
+                await asyncio.sleep(0)
+                continue
+            if flush:
+                await asyncio.to_thread(flush)
+            next_due = await asyncio.to_thread(queue.next_due)
+            if next_due is None:
+                await engine.join()
+                if await asyncio.to_thread(queue.next_due) is None:  # failed sends may have been re-queued
+                    break
+                continue
+            await asyncio.sleep(min(60.0, max(0.0, next_due - time.time() - lookahead)))
+    finally:
+        engine.close()
+    if flush:
+        await asyncio.to_thread(flush)
+    return engine.report
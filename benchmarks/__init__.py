@@ -0,0 +1 @@
+"""Benchmarks and local stand-in servers for load testing the schedulers."""
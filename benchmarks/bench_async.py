@@ -0,0 +1,68 @@
+"""
+Throughput of the asyncio engine against the local stand-ins.
+
+    python -m benchmarks.bench_async --jobs 2000 --latency-ms 50 --in-flight 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from async_engine import AsyncSMTPTransport, GmailRESTTransport, GraphTransport, run_queue
+from benchmarks.standins import StandinAPIServer, StandinSMTPServer
+from scheduler import HeapQueue
+
+
+async def _drain(transport, jobs, in_flight):
+    queue = HeapQueue()
+    now = time.time()
+    for i in range(jobs):
+        queue.push(now, {'to': f'user{i}@example.com', 'due': now})
+
+    async def send(job):
+        return True, await transport.send(job['to'], 'Benchmark', 'Hello from the benchmark.')
+
+    start = time.perf_counter()
+    report = await run_queue(queue, send, due_of=lambda job: job['due'], max_in_flight=in_flight)
+    elapsed = time.perf_counter() - start
+    await transport.close()
+    return report, elapsed
+
+
+def run(jobs=2000, latency_ms=50.0, in_flight=200):
+    latency = latency_ms / 1000
+    results = {}
+    with StandinAPIServer(latency=latency) as api, \
+            StandinSMTPServer(send_delay=latency) as smtp:
+        transports = {
+            'smtp': lambda: AsyncSMTPTransport('127.0.0.1', smtp.port, 'bench', 'secret',
+                                               use_tls=False, connections=in_flight),
+            'gmail': lambda: GmailRESTTransport(lambda: 'token', api.url, max_connections=in_flight),
+            'graph': lambda: GraphTransport(lambda: 'token', api.url, max_connections=in_flight),
+        }
+        for name, make in transports.items():
+            report, elapsed = asyncio.run(_drain(make(), jobs, in_flight))
+            results[name] = {
+                'sent': report.sent,
+                'failed': report.failed,
+                'seconds': round(elapsed, 3),
+                'sends_per_sec': round(jobs / elapsed, 1),
+                'max_drift': round(max(report.drift), 3),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--in-flight', type=int, default=200)
+    args = parser.parse_args()
+
+    for name, r in run(args.jobs, args.latency_ms, args.in_flight).items():
+        print(f"{name:6s} {r['sends_per_sec']:8.1f} sends/s  {r['seconds']:7.3f}s  "
+              f"sent={r['sent']} failed={r['failed']} max_drift={r['max_drift']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-message cost of attaching the same PDF to every email in a campaign.
+
+"rebuild" is how the apps built messages before: a fresh MIMEApplication
+part (base64-encoded again) and a full base64url pass for Gmail, per
+message. "cached" goes through mime_builder: the part is encoded once and
+spliced into every message written by the reused writer. CPU time and allocations are measured in
+separate passes so tracemalloc does not skew the timings.
+
+    python -m benchmarks.bench_attachments --messages 1000 --attachment-kb 500
+"""
+
+import argparse
+import base64
+import os
+import time
+import tracemalloc
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import mime_builder
+
+BODY = '<p>Hi {name},</p>' + '<p>I came across your team and wanted to reach out.</p>' * 20
+
+
+def _message(i):
+    message = MIMEMultipart('mixed')
+    message['to'] = f'user{i}@example.com'
+    message['subject'] = 'Exploring opportunities'
+    alternative = MIMEMultipart('alternative')
+    alternative.attach(MIMEText(BODY.format(name=f'User{i}'), 'html'))
+    message.attach(alternative)
+    return message
+
+
+def rebuild(i, pdf):
+    message = _message(i)
+    attachment = MIMEApplication(pdf, _subtype='pdf')
+    attachment.add_header('Content-Disposition', 'attachment', filename='resume.pdf')
+    message.attach(attachment)
+    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+
+
+def cached(i, pdf):
+    return {'raw': mime_builder.build_raw({'to': f'user{i}@example.com', 'subject': 'Exploring opportunities'},
+                                          BODY.format(name=f'User{i}'), 'html',
+                                          mime_builder.attachment_part(pdf, 'resume.pdf'), alternative=True)}
+
+
+def run(messages=1000, attachment_kb=500):
+    pdf = os.urandom(attachment_kb * 1024)
+    results = {}
+    for name, build in (('rebuild', rebuild), ('cached', cached)):
+        mime_builder.attachment_cache.clear()
+        start_cpu, start = time.process_time(), time.perf_counter()
+        for i in range(messages):
+            build(i, pdf)
+        cpu, wall = time.process_time() - start_cpu, time.perf_counter() - start
+
+        mime_builder.attachment_cache.clear()
+        sample = min(messages, 100)
+        tracemalloc.start()
+        allocated = peak = 0
+        for i in range(sample):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            build(i, pdf)
+            current, message_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, message_peak - before)
+            allocated += message_peak - before
+        tracemalloc.stop()
+
+        results[name] = {
+            'cpu_ms_per_message': round(cpu / messages * 1000, 3),
+            'messages_per_sec': round(messages / wall, 1),
+            'peak_kb_per_message': round(allocated / sample / 1024, 1),
+            'max_peak_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--attachment-kb', type=int, default=500)
+    args = parser.parse_args()
+
+    results = run(args.messages, args.attachment_kb)
+    for name, r in results.items():
+        print(f"{name:8s} {r['cpu_ms_per_message']:8.3f} ms CPU/message  {r['messages_per_sec']:8.1f} messages/s  "
+              f"peak {r['peak_kb_per_message']:8.1f} KB/message (max {r['max_peak_kb']:.1f} KB)")
+    speedup = results['rebuild']['cpu_ms_per_message'] / results['cached']['cpu_ms_per_message']
+    print(f"Cached parts use {speedup:.1f}x less CPU per message")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Preparing a mail-merge campaign: one draft at a time vs campaign.py.
+
+"one_by_one" is what the single-email form does for every recipient:
+render the body, then one drafts.create request. "campaign" parses the
+same CSV, renders every body with render_batch, and creates the drafts
+in batch requests from a small thread pool. Both paths run against the
+local API stand-in, attach the same PDF, and pay Gmail quota through a
+fresh QuotaBudgeter, so neither can go faster than real Gmail would allow.
+
+    python -m benchmarks.bench_campaign --recipients 300 --latency-ms 100
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import campaign
+import gmail_api
+import mime_builder
+from benchmarks.standins import StandinAPIServer
+
+SECTIONS = {"Agent Paper": 'html/agent_paper', "ML Systems": 'html/ml_systems', "Software": 'html/software'}
+CLOSING = "\n<p>I have attached my resume for your reference.</p>"
+
+
+def recipients_csv(count):
+    lines = ['email,name,template,intro']
+    for i in range(count):
+        template = list(SECTIONS)[i % len(SECTIONS)]
+        lines.append(f'user{i}@example.com,User{i},{template},'
+                     f'"I\'ve been following Company{i}\'s work in healthcare AI, and it maps to my background."')
+    return '\n'.join(lines).encode()
+
+
+def _message(to, subject, body, attachment):
+    return {'raw': mime_builder.build_raw({'to': to, 'subject': subject}, body, 'html',
+                                          mime_builder.attachment_part(*attachment), alternative=True)}
+
+
+def run(count=300, latency_ms=100.0, workers=campaign.MAX_WORKERS, chunk_size=campaign.CHUNK_SIZE):
+    data = recipients_csv(count)
+    attachment = (os.urandom(200 * 1024), 'resume.pdf')
+    results = {}
+    with StandinAPIServer(latency=latency_ms / 1000) as api:
+        local = threading.local()
+
+        def get_service():
+            if not hasattr(local, 'service'):
+                local.service = build('gmail', 'v1', credentials=Credentials('token'),
+                                      client_options={'api_endpoint': api.url + '/'})
+            return local.service
+
+        # One by one: what the form does per recipient
+        budgeter = gmail_api.QuotaBudgeter()
+        before = api.stats['requests']
+        start = time.perf_counter()
+        recipients, _ = campaign.parse_csv(data, SECTIONS, 'Quick intro')
+        service = get_service()
+        for recipient in recipients:
+            campaign.render([recipient], 'html/email', CLOSING)
+            message = _message(recipient.email, recipient.subject, recipient.body, attachment)
+            gmail_api.execute(service.users().drafts().create(userId='me', body={'message': message}),
+                              'drafts.create', budgeter=budgeter)
+        results['one_by_one'] = (time.perf_counter() - start, 0.0, api.stats['requests'] - before, count)
+
+        # Campaign: batch render, batched drafts on a thread pool
+        budgeter = gmail_api.QuotaBudgeter()
+
+        def create_drafts(service, drafts):
+            requests = (
+                (i, service.users().drafts().create(userId='me', body={'message': _message(
+                    draft['to'], draft['subject'], draft['body'],
+                    (draft['attachment_data'], draft['attachment_filename'])
+                )}))
+                for i, draft in enumerate(drafts)
+            )
+            created, errors = gmail_api.execute_batch(service, requests, 'drafts.create', budgeter=budgeter,
+                                                      batch_uri=api.url + '/batch/gmail/v1')
+            return [(draft['to'], created[i]['id'] if i in created else None, errors.get(i))
+                    for i, draft in enumerate(drafts)]
+
+        before = api.stats['requests']
+        start = time.perf_counter()
+        recipients, _ = campaign.parse_csv(data, SECTIONS, 'Quick intro')
+        campaign.render(recipients, 'html/email', CLOSING)
+        rendered = time.perf_counter() - start
+        succeeded, _ = campaign.run(recipients, campaign.drafts_action(create_drafts, attachment), get_service,
+                                    chunk_size=chunk_size, max_workers=workers)
+        results['campaign'] = (time.perf_counter() - start, rendered, api.stats['requests'] - before, succeeded)
+    return {
+        name: {
+            'seconds': round(seconds, 2),
+            'render_ms': round(rendered * 1000, 1),
+            'drafts_per_sec': round(count / seconds, 1),
+            'http_requests': requests,
+            'created': created,
+        }
+        for name, (seconds, rendered, requests, created) in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--workers', type=int, default=campaign.MAX_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=campaign.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    results = run(args.recipients, args.latency_ms, args.workers, args.chunk_size)
+    for name, r in results.items():
+        print(f"{name:10s} {r['seconds']:7.2f}s  {r['drafts_per_sec']:6.1f} drafts/s  "
+              f"{r['http_requests']:4d} HTTP requests  {r['created']} created")
+    print(f"campaign rendered {args.recipients} bodies in {results['campaign']['render_ms']} ms; "
+          f"{results['one_by_one']['seconds'] / results['campaign']['seconds']:.1f}x faster overall")
+
+
+if __name__ == '__main__':
+    main()
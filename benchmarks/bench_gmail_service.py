@@ -0,0 +1,92 @@
+"""
+Gmail service construction: discovery.build() per action vs gmail_api.get_service().
+
+Cold start runs each path in a fresh interpreter (imports included) up to
+the first request object; per-action cost is what a Streamlit rerun or a
+json_2 send pays to get a service and build one drafts.create request.
+
+    python -m benchmarks.bench_gmail_service --cold-runs 5 --calls 500
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import gmail_api
+
+COLD_START = {
+    'build': (
+        "from googleapiclient.discovery import build\n"
+        "service = build('gmail', 'v1', credentials=creds)\n"
+    ),
+    'get_service': (
+        "import gmail_api\n"
+        "service = gmail_api.get_service(creds)\n"
+    ),
+}
+
+COLD_TEMPLATE = """
+import time
+start = time.perf_counter()
+from google.oauth2.credentials import Credentials
+creds = Credentials('token', refresh_token='refresh', client_id='client')
+{body}
+service.users().drafts().create(userId='me', body={{'message': {{'raw': 'x'}}}})
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(name, runs):
+    code = COLD_TEMPLATE.format(body=COLD_START[name])
+    times = [float(subprocess.check_output([sys.executable, '-c', code], text=True)) for _ in range(runs)]
+    return statistics.median(times)
+
+
+def per_action(get_service, calls):
+    creds = Credentials('token', refresh_token='refresh', client_id='client')
+    start = time.perf_counter()
+    for _ in range(calls):
+        service = get_service(creds)
+        service.users().drafts().create(userId='me', body={'message': {'raw': 'x'}})
+    return (time.perf_counter() - start) / calls
+
+
+def run(cold_runs=5, calls=500):
+    paths = {
+        'build': lambda creds: build('gmail', 'v1', credentials=creds),
+        'get_service': gmail_api.get_service,
+    }
+    return {
+        name: {
+            'cold_start_ms': round(cold_start(name, cold_runs) * 1000, 1),
+            'per_action_ms': round(per_action(get_service, calls) * 1000, 3),
+        }
+        for name, get_service in paths.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    results = run(args.cold_runs, args.calls)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results.items():
+        print(f"{name:12s} cold start {r['cold_start_ms']:7.1f} ms   per action {r['per_action_ms']:7.3f} ms")
+    print(f"get_service: cold start {results['build']['cold_start_ms'] / results['get_service']['cold_start_ms']:.1f}x, "
+          f"per action {results['build']['per_action_ms'] / results['get_service']['per_action_ms']:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
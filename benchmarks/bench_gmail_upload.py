@@ -0,0 +1,119 @@
+"""
+Creating a Gmail draft with a large attachment: `raw` JSON vs media upload.
+
+"raw" is how create_draft worked before: the message is base64url-encoded
+into the `raw` field of a JSON body, on top of the attachment's own MIME
+base64. "media" is gmail_api.create_draft, which uploads the RFC 822
+bytes as message/rfc822 media. Below RESUMABLE_THRESHOLD that is one
+request; from there up it is a resumable upload in UPLOAD_CHUNK pieces.
+Both paths build the attachment part from scratch every time, with no
+cache, and run against the local Gmail stand-in.
+
+Payload is the request bytes the stand-in received. Peak memory comes
+from tracemalloc in passes separate from the timing: once for building
+and sending, and once for sending an already built message (what the
+transport itself costs). The stand-in runs in this process, so its
+buffer for the request it is reading counts too.
+
+    python -m benchmarks.bench_gmail_upload --sizes-mb 1 10 25 --latency-ms 50
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+
+import gmail_api
+import mime_builder
+from benchmarks.standins import StandinAPIServer
+
+MB = 1024 * 1024
+BODY = "<p>Hi User,</p>\n<p>I have attached my resume for your reference.</p>"
+
+
+HEADERS = {'to': 'user@example.com', 'subject': 'Quick intro'}
+
+
+def _build_raw(data):
+    return mime_builder.build_raw(HEADERS, BODY, 'html', mime_builder.encode_part(data, 'resume.pdf'),
+                                  alternative=True)
+
+
+def _send_raw(service, raw, budgeter):
+    return gmail_api.execute(service.users().drafts().create(userId='me', body={'message': {'raw': raw}}),
+                             'drafts.create', budgeter=budgeter)
+
+
+def _build_media(data):
+    return mime_builder.build_message(HEADERS, BODY, 'html', mime_builder.mime_part(data, 'resume.pdf'),
+                                      alternative=True)
+
+
+def _send_media(service, message, budgeter):
+    return gmail_api.create_draft(service, message, budgeter=budgeter)
+
+
+PATHS = {'raw': (_build_raw, _send_raw), 'media': (_build_media, _send_media)}
+
+
+def _peak(fn, *args):
+    """Peak bytes allocated by fn beyond what was already allocated"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return result, peak
+
+
+def run(sizes_mb=(1, 10, 25), latency_ms=50.0, fail_every=0):
+    results = {}
+    budgeter = gmail_api.QuotaBudgeter(10 ** 9)
+    with StandinAPIServer(latency=latency_ms / 1000, upload_errors_every=fail_every) as api:
+        # rootUrl too: googleapiclient keeps the discovery document's https scheme for upload URLs
+        service = build_from_document({**gmail_api.load_discovery(), 'rootUrl': api.url + '/'},
+                                      credentials=Credentials('token'))
+        for size_mb in sizes_mb:
+            data = os.urandom(int(size_mb * MB))
+            for name, (build, send) in PATHS.items():
+                before = dict(api.stats)
+                start = time.perf_counter()
+                draft = send(service, build(data), budgeter)
+                seconds = time.perf_counter() - start
+                payload = api.stats['bytes'] - before['bytes']
+                requests = api.stats['requests'] - before['requests']
+
+                _, peak = _peak(lambda: send(service, build(data), budgeter))
+                message = build(data)
+                _, send_peak = _peak(send, service, message, budgeter)
+                del message
+
+                results[f'{name}_{size_mb:g}mb'] = {
+                    'seconds': round(seconds, 3),
+                    'payload_mb': round(payload / MB, 2),
+                    'peak_mb': round(peak / MB, 1),
+                    'send_peak_mb': round(send_peak / MB, 1),
+                    'http_requests': requests,
+                    'intact': name == 'raw' or api.media[draft['id']]['size'] == len(build(data)),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 10, 25])
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--fail-every', type=int, default=0, help='503 every Nth resumable chunk (0 = never)')
+    args = parser.parse_args()
+
+    results = run(args.sizes_mb, args.latency_ms, args.fail_every)
+    for name, r in results.items():
+        print(f"{name:10s} {r['seconds']:7.3f}s  payload {r['payload_mb']:6.2f} MB  peak {r['peak_mb']:6.1f} MB "
+              f"(sending {r['send_peak_mb']:6.1f} MB)  {r['http_requests']:2d} HTTP requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Attaching large files to Outlook drafts: inline base64 vs upload sessions.
+
+"inline" reads the whole file and posts it base64-encoded inside the
+message JSON, the only way to attach with a single create call. Real
+Graph refuses this above about 3 MB, but the stand-in accepts any size
+so the cost can be compared. "create_draft" is graph_api.create_draft
+with the file's path: small files still go inline, and larger ones are
+streamed from disk through an upload session in UPLOAD_CHUNK pieces.
+--fail-every N drops every Nth chunk with a 503 to exercise resuming.
+
+Peak memory comes from tracemalloc in a separate pass from the timing.
+The stand-in runs in this process, so its buffer for the request body it
+is reading counts too: the whole JSON for inline, one chunk for uploads.
+Every attachment's SHA-256 is checked against what the stand-in received.
+
+    python -m benchmarks.bench_graph_attachments --sizes-mb 1 10 50 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+import graph_api
+from benchmarks.standins import StandinAPIServer
+
+MB = 1024 * 1024
+
+
+def _write_file(path, size):
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        for offset in range(0, size, MB):
+            block = os.urandom(min(MB, size - offset))
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def _inline(api, path):
+    with open(path, 'rb') as f:
+        message = {**graph_api.draft_message('user@example.com', 'Quick intro', '<p>Hi</p>'),
+                   'attachments': [graph_api.file_attachment(os.path.basename(path), f.read())]}
+    return graph_api.request('token', 'POST', '/me/messages', message, base_url=api.url)
+
+
+def _create_draft(api, path):
+    return graph_api.create_draft('token', graph_api.draft_message('user@example.com', 'Quick intro', '<p>Hi</p>'),
+                                  [(os.path.basename(path), path)], base_url=api.url)
+
+
+PATHS = {'inline': _inline, 'create_draft': _create_draft}
+
+
+def run(sizes_mb=(1, 10, 50), latency_ms=50.0, fail_every=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, \
+            StandinAPIServer(latency=latency_ms / 1000, upload_errors_every=fail_every) as api:
+        for size_mb in sizes_mb:
+            path = os.path.join(directory, f'attachment-{size_mb}mb.bin')
+            digest = _write_file(path, int(size_mb * MB))
+            for name, attach in PATHS.items():
+                before = dict(api.stats)
+                start = time.perf_counter()
+                created = attach(api, path)
+                seconds = time.perf_counter() - start
+                requests = api.stats['requests'] - before['requests']
+
+                tracemalloc.start()
+                attach(api, path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                received = api.messages[created['id']]['attachments']
+                results[f'{name}_{size_mb:g}mb'] = {
+                    'seconds': round(seconds, 3),
+                    'peak_mb': round(peak / MB, 1),
+                    'http_requests': requests,
+                    'intact': [a['sha256'] for a in received] == [digest],
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--fail-every', type=int, default=0, help='503 every Nth upload chunk (0 = never)')
+    args = parser.parse_args()
+
+    results = run(args.sizes_mb, args.latency_ms, args.fail_every)
+    for name, r in results.items():
+        print(f"{name:20s} {r['seconds']:7.3f}s  peak {r['peak_mb']:6.1f} MB  "
+              f"{r['http_requests']:3d} HTTP requests  {'intact' if r['intact'] else 'CORRUPTED'}")
+
+
+if __name__ == '__main__':
+    main()
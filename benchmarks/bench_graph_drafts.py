@@ -0,0 +1,75 @@
+"""
+Creating Outlook drafts: requests.post per draft vs a pooled session vs $batch.
+
+"requests_post" is what outlook.py did before: a module-level
+requests.post per draft, so every draft opens a new connection. "session"
+is graph_api.create_draft on the thread's keep-alive session. "batch" is
+graph_api.create_drafts, which packs 20 drafts into each JSON $batch
+request. All three run against the local Graph stand-in. It charges
+--handshake-ms for every new connection (TCP + TLS) and --latency-ms for
+every request, and --throttle-every N answers every Nth batched call
+with a 429, which the batch path retries on its own.
+
+    python -m benchmarks.bench_graph_drafts --drafts 200 --latency-ms 50 --handshake-ms 100
+"""
+
+import argparse
+import json
+import time
+
+import requests
+
+import graph_api
+from benchmarks.standins import StandinAPIServer
+
+BODY = "<p>Hi User,</p>\n<p>I've been following your team's work in healthcare AI.</p>\n" * 4
+
+
+def run(count=200, latency_ms=50.0, handshake_ms=100.0, throttle_every=0):
+    messages = [(i, graph_api.draft_message(f'user{i}@example.com', 'Quick intro', BODY)) for i in range(count)]
+    results = {}
+    for name in ('requests_post', 'session', 'batch'):
+        with StandinAPIServer(latency=latency_ms / 1000, handshake_delay=handshake_ms / 1000,
+                              throttle_every=throttle_every if name == 'batch' else 0) as api:
+            graph_api._local.__dict__.clear()  # every path starts without an open connection
+            start = time.perf_counter()
+            if name == 'requests_post':
+                created = 0
+                for _, message in messages:
+                    response = requests.post(f'{api.url}/me/messages', data=json.dumps(message),
+                                             headers={'Authorization': 'Bearer token',
+                                                      'Content-Type': 'application/json'})
+                    created += response.status_code in (200, 201)
+            elif name == 'session':
+                created = sum(1 for _, message in messages
+                              if graph_api.create_draft('token', message, base_url=api.url).get('id'))
+            else:
+                drafts, _ = graph_api.create_drafts('token', messages, base_url=api.url)
+                created = len(drafts)
+            seconds = time.perf_counter() - start
+            results[name] = {
+                'seconds': round(seconds, 2),
+                'drafts_per_sec': round(count / seconds, 1),
+                'http_requests': api.stats['requests'],
+                'connections': api.stats['connections'],
+                'created': created,
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--drafts', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--handshake-ms', type=float, default=100.0, help='stand-in cost of a new connection')
+    parser.add_argument('--throttle-every', type=int, default=0, help='429 every Nth batched call (0 = never)')
+    args = parser.parse_args()
+
+    results = run(args.drafts, args.latency_ms, args.handshake_ms, args.throttle_every)
+    for name, r in results.items():
+        print(f"{name:14s} {r['seconds']:7.2f}s  {r['drafts_per_sec']:7.1f} drafts/s  "
+              f"{r['http_requests']:4d} HTTP requests  {r['connections']:4d} connections  {r['created']} created")
+
+
+if __name__ == '__main__':
+    main()
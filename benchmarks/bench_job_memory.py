@@ -0,0 +1,94 @@
+"""
+Memory per scheduled job: the old per-email dicts vs jobs.Job records.
+
+Both sides are built from the same synthetic rows, with fresh string
+objects per row as they would come out of SQLite or a CSV, and measured
+with tracemalloc.
+
+    python -m benchmarks.bench_job_memory --jobs 1000000 --intros 50
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime
+
+from jobs import DEFAULT_TEMPLATE, PENDING, Job, TextTable
+from scheduler import TIME_FORMAT
+
+BASE = 1_733_000_000
+
+INTRO = ("I've been following your team's work in AI-driven utilization review using ML to "
+         "prioritize cases, improve patient-status decisions, and reduce denial risk; and my "
+         "background aligns closely with the problems your group focuses on at Company {}.")
+
+
+def rows(count, intros, seed=0):
+    """(to, subject, name, intro, due) with a fresh str per field, like rows read from disk"""
+    rng = random.Random(seed)
+    for i in range(count):
+        company = rng.randrange(intros)
+        yield (
+            f'recipient{i}@company{company}.com',
+            f'Interested in ML Roles at Company {company} - USC Grad',
+            f'Name{i}',
+            INTRO.format(company),
+            BASE + rng.randrange(7 * 86400),
+        )
+
+
+def as_dict(row, texts):
+    """The job record simple_app used before jobs.Job"""
+    to, subject, name, intro, due = row
+    return {
+        'id': None,
+        'to': to,
+        'subject': subject,
+        'recipient_name': name,
+        'company_intro': intro,
+        'scheduled_time': datetime.fromtimestamp(due).strftime(TIME_FORMAT),
+        'due': float(due),
+        'sent': False,
+        'status': 'pending',
+    }
+
+
+def as_job(row, texts):
+    to, subject, name, intro, due = row
+    return Job(None, due, to, subject, name, texts.intern(intro), texts.intern(DEFAULT_TEMPLATE), PENDING)
+
+
+def measure(make, count, intros):
+    gc.collect()
+    tracemalloc.start()
+    texts = TextTable()
+    records = [make(row, texts) for row in rows(count, intros)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records, texts
+    return {'bytes_per_job': round(current / count, 1), 'total_mb': round(current / 2**20, 1),
+            'peak_mb': round(peak / 2**20, 1)}
+
+
+def run(count=1_000_000, intros=50):
+    return {
+        'dict': measure(as_dict, count, intros),
+        'job': measure(as_job, count, intros),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=1_000_000)
+    parser.add_argument('--intros', type=int, default=50, help='distinct company intros shared by the jobs')
+    args = parser.parse_args()
+
+    results = run(args.jobs, args.intros)
+    for name, r in results.items():
+        print(f"{name:5s} {r['bytes_per_job']:8.1f} bytes/job  {r['total_mb']:8.1f} MB  (peak {r['peak_mb']} MB)")
+    print(f"Job records use {results['dict']['bytes_per_job'] / results['job']['bytes_per_job']:.1f}x less memory")
+
+
+if __name__ == '__main__':
+    main()
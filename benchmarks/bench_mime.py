@@ -0,0 +1,164 @@
+"""
+Per-message allocations of building outgoing messages: email package vs MessageWriter.
+
+Each send path builds the same message both ways for --messages
+recipients. "email" is what the call sites did before: a Message tree
+flattened with as_bytes()/as_string(), then spliced with the cached
+attachment, or handed to smtplib, which fixes line ends, dot-stuffs and
+terminates the message. "writer" is mime_builder's reused per-thread
+buffer. Paths:
+
+  text_media   app.create_message / json_2.send_email (bytes uploaded as media)
+  html_media   create_draft in app2/app3 (HTML + cached PDF part, media)
+  html_raw     create_drafts in app2/app3 (the same message as a `raw` str)
+  smtp         simple_app.send_email (what is handed to the socket)
+
+Peak is tracemalloc's peak above what was allocated before each message,
+averaged over the run; CPU time comes from a separate pass without
+tracemalloc.
+
+    python -m benchmarks.bench_mime --messages 10000 --attachment-kb 200
+"""
+
+import argparse
+import base64
+import os
+import smtplib
+import time
+import tracemalloc
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import mime_builder
+
+FROM = 'me@example.com'
+SUBJECT = 'Exploring opportunities'
+HTML = '<p>Hi {name},</p>' + '<p>I came across your team and wanted to reach out.</p>' * 20
+TEXT = ('Hi {name},\n\nMy relevant experience includes:\n'
+        + ' • End-to-End Delivery: risk prediction on 1.5M+ patient records—data, modeling, deployment.\n' * 12)
+
+
+def _html_message(i):
+    message = MIMEMultipart('mixed')
+    message['to'] = f'user{i}@example.com'
+    message['subject'] = SUBJECT
+    alternative = MIMEMultipart('alternative')
+    alternative.attach(MIMEText(HTML.format(name=f'User{i}'), 'html'))
+    message.attach(alternative)
+    return message
+
+
+def _splice(message, part):
+    # The previous mime_builder.message_bytes(): as_bytes(), then one join with the cached part
+    text = message.as_bytes()
+    boundary = message.get_boundary().encode()
+    end = text.rindex(b'\n--' + boundary + b'--')
+    view = memoryview(text)
+    return b''.join((view[:end], b'\n--' + boundary + b'\n', part.data, view[end:]))
+
+
+def _splice_raw(message, part):
+    # The previous mime_builder.raw_message()
+    text = message.as_bytes()
+    boundary = message.get_boundary().encode()
+    end = text.rindex(b'\n--' + boundary + b'--')
+    head, tail = text[:end], text[end:]
+    delimiter = b'\n--' + boundary + b'\n'
+    head += b'\n' * (-(len(head) + len(delimiter)) % 3) + delimiter
+    return ''.join((base64.urlsafe_b64encode(head).decode(), part.raw, base64.urlsafe_b64encode(tail).decode()))
+
+
+def _smtp_data(text):
+    # What smtplib.sendmail() and data() do to a str before it reaches the socket
+    data = smtplib._quote_periods(smtplib._fix_eols(text).encode('ascii'))
+    if data[-2:] != b'\r\n':
+        data += b'\r\n'
+    return data + b'.\r\n'
+
+
+def text_media(i, pdf, use_writer):
+    headers = {'to': f'user{i}@example.com', 'subject': SUBJECT}
+    body = TEXT.format(name=f'User{i}')
+    if use_writer:
+        return mime_builder.build_message(headers, body)
+    message = MIMEText(body)
+    message['to'], message['subject'] = headers['to'], headers['subject']
+    return message.as_bytes()
+
+
+def html_media(i, pdf, use_writer):
+    part = mime_builder.attachment_mime(pdf, 'resume.pdf')
+    if use_writer:
+        return mime_builder.build_message({'to': f'user{i}@example.com', 'subject': SUBJECT},
+                                          HTML.format(name=f'User{i}'), 'html', part, alternative=True)
+    return _splice(_html_message(i), part)
+
+
+def html_raw(i, pdf, use_writer):
+    part = mime_builder.attachment_part(pdf, 'resume.pdf')
+    if use_writer:
+        return mime_builder.build_raw({'to': f'user{i}@example.com', 'subject': SUBJECT},
+                                      HTML.format(name=f'User{i}'), 'html', part, alternative=True)
+    return _splice_raw(_html_message(i), part)
+
+
+def smtp(i, pdf, use_writer):
+    headers = {'From': FROM, 'To': f'user{i}@example.com', 'Subject': SUBJECT}
+    body = TEXT.format(name=f'User{i}')
+    if use_writer:
+        with mime_builder.writer(smtp=True).write(headers, body, mixed=True) as data:
+            return len(data)  # SMTPPool.send_data writes this view to the socket as it is
+    message = MIMEMultipart()
+    for name, value in headers.items():
+        message[name] = value
+    message.attach(MIMEText(body, 'plain'))
+    return len(_smtp_data(message.as_string()))
+
+
+PATHS = {'text_media': text_media, 'html_media': html_media, 'html_raw': html_raw, 'smtp': smtp}
+
+
+def run(messages=10000, attachment_kb=200):
+    pdf = os.urandom(attachment_kb * 1024)
+    results = {}
+    for path, build in PATHS.items():
+        for name, use_writer in (('email', False), ('writer', True)):
+            build(0, pdf, use_writer)  # warm the attachment caches and this thread's writer
+            start = time.process_time()
+            for i in range(messages):
+                build(i, pdf, use_writer)
+            cpu = time.process_time() - start
+
+            tracemalloc.start()
+            total = worst = 0
+            for i in range(messages):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                build(i, pdf, use_writer)
+                peak = tracemalloc.get_traced_memory()[1] - before
+                total += peak
+                worst = max(worst, peak)
+            tracemalloc.stop()
+
+            results[f'{path}/{name}'] = {
+                'cpu_us_per_message': round(cpu / messages * 1e6, 1),
+                'peak_kb_per_message': round(total / messages / 1024, 1),
+                'max_peak_kb': round(worst / 1024, 1),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--attachment-kb', type=int, default=200)
+    args = parser.parse_args()
+
+    results = run(args.messages, args.attachment_kb)
+    for name, r in results.items():
+        print(f"{name:18s} {r['cpu_us_per_message']:8.1f} us CPU/message  "
+              f"peak {r['peak_kb_per_message']:8.1f} KB/message (max {r['max_peak_kb']:8.1f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Heap vs timing-wheel due queues for very large schedules.
+
+Each (backend, size) run happens in its own subprocess so peak memory is
+measured in isolation.
+
+    python -m benchmarks.bench_queues --sizes 1000000 5000000 10000000
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from scheduler import HeapQueue, TimingWheel
+
+BASE = 1_700_000_000.0
+
+# name -> (seconds the due times are spread over, simulated tick length)
+WINDOWS = {
+    'near_term_1h': (3600, 1),
+    'campaign_7d': (7 * 86400, 10),
+}
+
+
+def run_one(backend, size, window, seed=0):
+    spread, step = WINDOWS[window]
+    rng = random.Random(seed)
+    dues = [BASE + rng.random() * spread for _ in range(size)]
+    queue = HeapQueue() if backend == 'heap' else TimingWheel(now=BASE)
+
+    start = time.perf_counter()
+    for job_id, due in enumerate(dues):
+        queue.push(due, job_id)
+    insert_seconds = time.perf_counter() - start
+    del dues
+
+    start = time.perf_counter()
+    now, popped = BASE, 0
+    while len(queue):
+        now += step
+        popped += len(queue.pop_due(now))
+    drain_seconds = time.perf_counter() - start
+
+    return {
+        'backend': backend,
+        'size': size,
+        'window': window,
+        'insert_seconds': round(insert_seconds, 3),
+        'inserts_per_sec': round(size / insert_seconds),
+        'drain_seconds': round(drain_seconds, 3),
+        'pops_per_sec': round(popped / drain_seconds),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+
+
+def run(sizes, windows=tuple(WINDOWS), backends=('heap', 'wheel')):
+    """Yield one result dict per (window, size, backend) as each run finishes"""
+    for window in windows:
+        for size in sizes:
+            for backend in backends:
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_queues', '--single', backend, str(size), window],
+                    capture_output=True, text=True
+                )
+                if out.returncode != 0:
+                    yield {'backend': backend, 'size': size, 'window': window,
+                           'error': out.stderr.strip().splitlines()[-1] if out.stderr else 'killed'}
+                else:
+                    yield json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument('--windows', nargs='+', default=list(WINDOWS), choices=list(WINDOWS))
+    parser.add_argument('--single', nargs=3, metavar=('BACKEND', 'SIZE', 'WINDOW'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        backend, size, window = args.single
+        print(json.dumps(run_one(backend, int(size), window)))
+        return
+
+    for r in run(args.sizes, args.windows):
+        if 'error' in r:
+            print(f"{r['window']:13s} {r['backend']:5s} {r['size']:>10,}  ERROR {r['error']}")
+            continue
+        print(f"{r['window']:13s} {r['backend']:5s} {r['size']:>10,}  "
+              f"insert {r['inserts_per_sec']:>9,}/s  drain {r['pops_per_sec']:>9,}/s  "
+              f"peak {r['peak_rss_mb']:>6,} MB", flush=True)
+
+
+if __name__ == '__main__':
+    main()
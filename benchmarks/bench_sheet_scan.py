@@ -0,0 +1,114 @@
+"""
+Reading the schedule sheet each run: full rescans vs the incremental cursor.
+
+The sheet starts with --rows rows, all sent except a few scheduled for
+later near the bottom. Every tick appends --new due rows and runs
+sheet_worker.run once, the way a cron job would. "full" reads the whole
+sheet every tick. "incremental" keeps a Cursor and reads only the rows
+from the watermark down, plus the deferred ones. "compacted" does the
+same and lets the first run move the finished rows to the archive tab.
+For each mode the benchmark reports cells read, response bytes and
+seconds per tick (median of the ticks after the first), and the first
+tick on its own, since that one does the full scan and the compaction.
+
+    python -m benchmarks.bench_sheet_scan --rows 10000 --ticks 10 --latency-ms 50
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import gspread
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import gmail_api
+import sheet_worker
+from benchmarks.standins import StandinAPIServer, StandinSession
+from scheduler import TIME_FORMAT
+
+SHEET_ID = 'schedule-sheet'
+HEADER = ['Draft ID', 'Email', 'Name', 'Subject', 'Send Time', 'Status', 'Created At', 'Sent At', 'Result']
+
+
+def _row(key, when, status='pending'):
+    stamp = time.strftime(TIME_FORMAT, time.localtime(when))
+    row = [key, f'{key}@example.com', 'User', 'Quick intro', stamp, status, stamp]
+    return row + [stamp, f'msg-{key}'] if status == 'sent' else row
+
+
+def _fill(api, rows, later, now):
+    api.sheets[SHEET_ID] = [HEADER] + [
+        _row(f'r-{i}', now + 86400) if i >= rows - later else _row(f'r-{i}', now - 86400, 'sent')
+        for i in range(rows)
+    ]
+
+
+MODES = {
+    'full': dict(cursor=False, compact_rows=0),
+    'incremental': dict(cursor=True, compact_rows=0),
+    'compacted': dict(cursor=True, compact_rows=sheet_worker.COMPACT_ROWS),
+}
+
+
+def run(rows=10000, ticks=10, new=10, later=20, latency_ms=50.0):
+    results = {}
+    for name, mode in MODES.items():
+        with StandinAPIServer(latency=latency_ms / 1000) as api:
+            now = time.time()
+            _fill(api, rows, later, now)
+            local = threading.local()
+
+            def get_service():
+                if not hasattr(local, 'service'):
+                    local.service = build('gmail', 'v1', credentials=Credentials('token'),
+                                          client_options={'api_endpoint': api.url + '/'})
+                return local.service
+
+            budgeter = gmail_api.QuotaBudgeter(10 ** 9)
+            worksheet = gspread.authorize(None, session=StandinSession(api.url)).open_by_key(SHEET_ID).sheet1
+            cursor = sheet_worker.Cursor(SHEET_ID) if mode['cursor'] else None
+            samples = []
+            for tick in range(ticks):
+                api.sheets[SHEET_ID] += [_row(f't{tick}-{i}', now - 60) for i in range(new)]
+                before = dict(api.stats)
+                start = time.perf_counter()
+                sheet_worker.run(worksheet, get_service, now=now, budgeter=budgeter,
+                                 cursor=cursor, compact_rows=mode['compact_rows'])
+                samples.append((time.perf_counter() - start,
+                                api.stats['sheet_cells_read'] - before['sheet_cells_read'],
+                                api.stats['bytes_out'] - before['bytes_out']))
+            sent = sum(1 for row in api.sheets[SHEET_ID] + api.tabs.get(SHEET_ID, {}).get('Archive', [])
+                       if row[0].startswith('t') and row[5] == 'sent')
+            steady = samples[1:] or samples
+            results[name] = {
+                'first_seconds': round(samples[0][0], 3),
+                'first_cells': samples[0][1],
+                'seconds': round(statistics.median(s for s, _, _ in steady), 3),
+                'cells': round(statistics.median(c for _, c, _ in steady)),
+                'bytes': round(statistics.median(b for _, _, b in steady)),
+                'sheet_rows': len(api.sheets[SHEET_ID]),
+                'sent': sent,
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=10, help='worker runs per mode')
+    parser.add_argument('--new', type=int, default=10, help='due rows appended before each run')
+    parser.add_argument('--later', type=int, default=20, help='rows scheduled for tomorrow near the bottom')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='stand-in round trip per HTTP request')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.ticks, args.new, args.later, args.latency_ms)
+    for name, r in results.items():
+        print(f"{name:12s} first run {r['first_seconds']:6.3f}s {r['first_cells']:7d} cells | per run "
+              f"{r['seconds']:6.3f}s {r['cells']:7d} cells {r['bytes'] / 1024:8.1f} KiB | "
+              f"{r['sheet_rows']:6d} rows left, {r['sent']} sent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Draining the schedule sheet: a row-at-a-time worker vs sheet_worker.
+
+"row_at_a_time" sends each due draft and then writes that row's status
+back, one call after the other, like a straightforward cron script would.
+"sheet_worker" is sheet_worker.run: one values read, concurrent
+drafts.send calls, and one batchUpdate. Both run against the Gmail and
+Sheets stand-ins. Real Gmail allows about 2.5 drafts.send calls per second
+per user (100 of 250 quota units), which would bound both paths. So the
+default --units-per-second 0 turns pacing off to measure the worker
+itself; pass 250 to see the quota-bound rate.
+
+    python -m benchmarks.bench_sheet_worker --rows 500 --latency-ms 50
+"""
+
+import argparse
+import threading
+import time
+
+import gspread
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import gmail_api
+import sheet_worker
+from benchmarks.standins import StandinAPIServer, StandinSession
+from scheduler import TIME_FORMAT
+
+SHEET_ID = 'schedule-sheet'
+
+
+def _fill(api, rows, now):
+    past, future = time.strftime(TIME_FORMAT, time.localtime(now - 60)), time.strftime(TIME_FORMAT, time.localtime(now + 3600))
+    api.sheets[SHEET_ID] = [['Draft ID', 'Email', 'Name', 'Subject', 'Send Time', 'Status', 'Created At']] + [
+        [f'r-{i}', f'user{i}@example.com', f'User{i}', 'Quick intro',
+         past if i % 10 else future, 'sent' if i % 7 == 0 else 'pending', past]
+        for i in range(rows)
+    ]
+
+
+def run(rows=500, latency_ms=50.0, workers=sheet_worker.MAX_WORKERS, units_per_second=0):
+    results = {}
+    for name in ('row_at_a_time', 'sheet_worker'):
+        with StandinAPIServer(latency=latency_ms / 1000) as api:
+            now = time.time()
+            _fill(api, rows, now)
+            local = threading.local()
+
+            def get_service():
+                if not hasattr(local, 'service'):
+                    local.service = build('gmail', 'v1', credentials=Credentials('token'),
+                                          client_options={'api_endpoint': api.url + '/'})
+                return local.service
+
+            budgeter = gmail_api.QuotaBudgeter(units_per_second or 10 ** 9)
+            worksheet = gspread.authorize(None, session=StandinSession(api.url)).open_by_key(SHEET_ID).sheet1
+            before = dict(api.stats)
+            start = time.perf_counter()
+            if name == 'row_at_a_time':
+                for number, row in enumerate(worksheet.get_values('A:G'), start=1):
+                    if row[5] != 'pending' or row[4] > time.strftime(TIME_FORMAT, time.localtime(now)):
+                        continue
+                    message = gmail_api.execute(
+                        get_service().users().drafts().send(userId='me', body={'id': row[0]}),
+                        'drafts.send', budgeter=budgeter
+                    )
+                    worksheet.update([['sent', row[6], time.strftime(TIME_FORMAT), message['id']]], f'F{number}:I{number}')
+            else:
+                sheet_worker.run(worksheet, get_service, now=now, max_workers=workers, budgeter=budgeter)
+            seconds = time.perf_counter() - start
+            sent = sum(1 for row in api.sheets[SHEET_ID][1:] if len(row) > 7 and row[5] == 'sent' and row[7])
+            results[name] = {
+                'seconds': round(seconds, 2),
+                'sent': sent,
+                'rows_per_sec': round(sent / seconds, 1),
+                'http_requests': api.stats['requests'] - before['requests'],
+                'sheet_writes': api.stats['sheet_writes'] - before['sheet_writes'],
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--workers', type=int, default=sheet_worker.MAX_WORKERS)
+    parser.add_argument('--units-per-second', type=float, default=0, help='Gmail quota pacing (0 = off)')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.latency_ms, args.workers, args.units_per_second)
+    for name, r in results.items():
+        print(f"{name:14s} {r['seconds']:7.2f}s  {r['sent']:5d} sent  {r['rows_per_sec']:7.1f} rows/s  "
+              f"{r['http_requests']:5d} HTTP requests  {r['sheet_writes']:4d} sheet writes")
+
+
+if __name__ == '__main__':
+    main()
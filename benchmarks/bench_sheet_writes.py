@@ -0,0 +1,78 @@
+"""
+Writing schedule rows: one append_row per email vs a buffered SheetWriter.
+
+"per_row" is what add_to_schedule_sheet did before: authorize a client,
+open the spreadsheet, and append one row, for every scheduled email.
+"buffered" opens the worksheet once and appends through sheets.SheetWriter.
+Both run against the Sheets stand-in through gspread. The real per-row
+path also paid a token exchange per call, which the stand-in does not
+model. --interval-ms spaces the schedules out, like single emails being
+scheduled from the form, so the time-based flush has to do the batching.
+
+    python -m benchmarks.bench_sheet_writes --rows 300 --latency-ms 100
+"""
+
+import argparse
+import time
+
+import gspread
+
+import sheets
+from benchmarks.standins import StandinAPIServer, StandinSession
+
+SHEET_ID = 'schedule-sheet'
+
+
+def _row(i):
+    return [f'r-{i}', f'user{i}@example.com', f'User{i}', 'Quick intro', '2026-11-01 09:30:00', 'pending',
+            '2026-10-17 12:00:00']
+
+
+def run(rows=300, latency_ms=100.0, interval_ms=0.0, flush_rows=sheets.FLUSH_ROWS,
+        flush_seconds=sheets.FLUSH_SECONDS):
+    results = {}
+    for name in ('per_row', 'buffered'):
+        with StandinAPIServer(latency=latency_ms / 1000) as api:
+            start = time.perf_counter()
+            if name == 'per_row':
+                for i in range(rows):
+                    client = gspread.authorize(None, session=StandinSession(api.url))
+                    client.open_by_key(SHEET_ID).sheet1.append_row(_row(i))
+                    time.sleep(interval_ms / 1000)
+            else:
+                worksheet = gspread.authorize(None, session=StandinSession(api.url)).open_by_key(SHEET_ID).sheet1
+                writer = sheets.SheetWriter(worksheet, max_rows=flush_rows, max_delay=flush_seconds)
+                for i in range(rows):
+                    writer.append(_row(i))
+                    time.sleep(interval_ms / 1000)
+                writer.close()
+            seconds = time.perf_counter() - start
+            assert api.sheets[SHEET_ID] == [_row(i) for i in range(rows)], name
+            results[name] = {
+                'seconds': round(seconds, 2),
+                'http_requests': api.stats['requests'],
+                'sheet_writes': api.stats['sheet_writes'],
+                'sheet_reads': api.stats['sheet_reads'],
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='stand-in round trip per HTTP request')
+    parser.add_argument('--interval-ms', type=float, default=0.0, help='time between scheduled emails')
+    parser.add_argument('--flush-rows', type=int, default=sheets.FLUSH_ROWS)
+    parser.add_argument('--flush-seconds', type=float, default=sheets.FLUSH_SECONDS)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.latency_ms, args.interval_ms, args.flush_rows, args.flush_seconds)
+    for name, r in results.items():
+        print(f"{name:9s} {r['seconds']:7.2f}s  {r['http_requests']:5d} HTTP requests  "
+              f"{r['sheet_writes']:4d} writes  {r['sheet_reads']:4d} metadata reads")
+    print(f"Sheets write quota (60/min) used: {results['per_row']['sheet_writes']} vs "
+          f"{results['buffered']['sheet_writes']} requests")
+
+
+if __name__ == '__main__':
+    main()
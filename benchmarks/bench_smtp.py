@@ -0,0 +1,82 @@
+"""
+Messages/sec through a connection-per-message SMTP sender vs SMTPPool.
+
+    python -m benchmarks.bench_smtp --messages 500 --handshake-ms 30
+"""
+
+import argparse
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from benchmarks.standins import StandinSMTPServer
+from smtp_pool import SMTPPool
+
+FROM = 'bench@example.com'
+
+
+def build_message(i):
+    msg = MIMEMultipart()
+    msg['From'] = FROM
+    msg['To'] = f'user{i}@example.com'
+    msg['Subject'] = f'Benchmark {i}'
+    msg.attach(MIMEText('Hello from the benchmark.\n' * 40, 'plain'))
+    return msg.as_string()
+
+
+def send_per_connection(port, messages):
+    """The original send_email: connect, login, send, quit for every message"""
+    for i, msg in enumerate(messages):
+        server = smtplib.SMTP('127.0.0.1', port)
+        server.login(FROM, 'secret')
+        server.sendmail(FROM, f'user{i}@example.com', msg)
+        server.quit()
+
+
+def send_pooled(port, messages, pool_size):
+    pool = SMTPPool('127.0.0.1', port, FROM, 'secret', size=pool_size, use_tls=False)
+    for i, msg in enumerate(messages):
+        pool.sendmail(FROM, f'user{i}@example.com', msg)
+    pool.close()
+    return pool.stats
+
+
+def run(messages=500, handshake_ms=30.0, pool_size=2):
+    payloads = [build_message(i) for i in range(messages)]
+    results = {}
+    for name in ('per_connection', 'pooled'):
+        with StandinSMTPServer(handshake_delay=handshake_ms / 1000) as server:
+            start = time.perf_counter()
+            if name == 'pooled':
+                send_pooled(server.port, payloads, pool_size)
+            else:
+                send_per_connection(server.port, payloads)
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'seconds': round(elapsed, 3),
+                'messages_per_sec': round(messages / elapsed, 1),
+                'connections': server.stats['connections'],
+                'logins': server.stats['logins'],
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--handshake-ms', type=float, default=30.0,
+                        help='simulated TCP+TLS+AUTH cost per new connection')
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args()
+
+    results = run(args.messages, args.handshake_ms, args.pool_size)
+    for name, r in results.items():
+        print(f"{name:15s} {r['messages_per_sec']:8.1f} msg/s  {r['seconds']:7.3f}s  "
+              f"connections={r['connections']} logins={r['logins']}")
+    speedup = results['pooled']['messages_per_sec'] / results['per_connection']['messages_per_sec']
+    print(f"speedup: {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Body rendering throughput for a batch of recipients.
+
+"concat" is how the apps built bodies before (f-string plus += for each
+optional section), "format_map" is str.format_map on the same layout, and
+"render" / "render_batch" use the compiled templates from templates.py with
+the campaign-wide sections bound in once.
+
+    python -m benchmarks.bench_templates --recipients 100000
+"""
+
+import argparse
+import time
+
+from templates import Template, registry
+
+OUTRO = "Would love to briefly discuss how my background could support your team."
+RESUME_NOTE = "<p>I have attached my resume for your reference.</p>"
+
+
+def recipients(count):
+    return [
+        {'recipient_name': f'User{i}',
+         'company_intro': f"I've been following Company{i % 500}'s work in healthcare AI and predictive analytics."}
+        for i in range(count)
+    ]
+
+
+def run(count=100000, repeat=3):
+    rows = recipients(count)
+    experience = registry.render('html/ml_systems')
+    signature = registry.render('html/signature')
+
+    def concat(row):
+        body = f"<p>Hi {row['recipient_name']},</p>\n<p>{row['company_intro']}</p>\n{experience}"
+        if OUTRO:
+            body += f"\n<p>{OUTRO}</p>"
+        if RESUME_NOTE:
+            body += f"\n{RESUME_NOTE}"
+        body += f"\n{signature}"
+        return body
+
+    start = time.perf_counter()
+    email = registry['html/email'].bind(experience=registry['html/ml_systems'],
+                                        closing=f"\n<p>{OUTRO}</p>\n{RESUME_NOTE}")
+    bind_ms = (time.perf_counter() - start) * 1000
+    layout = Template(segments=email.segments).source  # same text as a str.format layout
+
+    paths = {
+        'concat': lambda: [concat(row) for row in rows],
+        'format_map': lambda: [layout.format_map(row) for row in rows],
+        'render': lambda: [email.render(row) for row in rows],
+        'render_batch': lambda: email.render_batch(rows),
+    }
+    expected = paths['concat']()
+    results = {'bind_ms': round(bind_ms, 3)}
+    for name, render in paths.items():
+        assert render() == expected, name
+        best = min(_timed(render) for _ in range(repeat))
+        results[name] = {'renders_per_sec': round(count / best), 'seconds': round(best, 3)}
+    return results
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3, help='best of N runs')
+    args = parser.parse_args()
+
+    results = run(args.recipients, args.repeat)
+    print(f"bind (compile once per campaign): {results['bind_ms']} ms")
+    for name in ('concat', 'format_map', 'render', 'render_batch'):
+        r = results[name]
+        print(f"{name:12s} {r['renders_per_sec']:>10,} renders/s  {r['seconds']:6.3f}s for {args.recipients:,}")
+    print(f"render_batch is {results['render_batch']['renders_per_sec'] / results['concat']['renders_per_sec']:.1f}x "
+          f"the old concatenation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Sender stalls and token-endpoint load across access-token expiries.
+
+Sender threads share one account's credentials and repeatedly fetch an
+access token before each simulated send, while the stand-in token endpoint
+hands out short-lived tokens. "inline" is the old pattern: refresh once the
+token has expired, with no coordination between threads. "manager" is
+token_manager.TokenManager: background refresh ahead of expiry, with
+single-flight refresh as the fallback.
+
+    python -m benchmarks.bench_token_refresh --threads 16 --seconds 12 --lifetime 4
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from google.auth import _helpers
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+import token_manager
+from benchmarks.standins import StandinAPIServer
+
+STALL_MS = 50  # token fetches slower than this held up a send
+
+
+def _credentials(api, lifetime):
+    creds = Credentials('initial', refresh_token='refresh', client_id='client', client_secret='secret',
+                        token_uri=api.url + '/token')
+    creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=lifetime)
+    return creds
+
+
+def _inline(creds):
+    request = Request()
+
+    def get_token():
+        if creds.expired and creds.refresh_token:
+            creds.refresh(request)
+        return creds.token
+    return get_token, lambda: None
+
+
+def _manager(creds, margin):
+    manager = token_manager.TokenManager(creds, refresh_margin=margin).start()
+    return manager.token, manager.stop
+
+
+def run_one(name, threads=16, seconds=12.0, lifetime=4.0, latency_ms=200.0, send_ms=20.0):
+    # Scale google-auth's expiry skew (3m45s against real hour-long tokens) down with the lifetime
+    _helpers.REFRESH_THRESHOLD = timedelta(seconds=lifetime / 8)
+    with StandinAPIServer(latency=latency_ms / 1000, token_lifetime=lifetime) as api:
+        creds = _credentials(api, lifetime)
+        if name == 'inline':
+            get_token, stop = _inline(creds)
+        else:
+            get_token, stop = _manager(creds, margin=lifetime / 4)
+
+        fetch_ms, lock = [], threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def sender():
+            timings = []
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                get_token()
+                timings.append((time.perf_counter() - start) * 1000)
+                time.sleep(send_ms / 1000)
+            with lock:
+                fetch_ms.extend(timings)
+
+        workers = [threading.Thread(target=sender) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stop()
+
+        fetch_ms.sort()
+        return {
+            'token_requests': api.stats['token_refreshes'],
+            'sends': len(fetch_ms),
+            'stalled_sends': sum(ms > STALL_MS for ms in fetch_ms),
+            'p99_ms': round(fetch_ms[int(len(fetch_ms) * 0.99)], 2),
+            'max_ms': round(fetch_ms[-1], 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=12.0)
+    parser.add_argument('--lifetime', type=float, default=4.0, help='access token lifetime handed out by the stand-in')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='token endpoint round trip')
+    parser.add_argument('--send-ms', type=float, default=20.0, help='simulated send time between token fetches')
+    args = parser.parse_args()
+
+    expiries = int(args.seconds // args.lifetime)
+    print(f"{args.threads} sender threads, {args.seconds:g}s, {expiries} token expiries")
+    for name in ('inline', 'manager'):
+        r = run_one(name, args.threads, args.seconds, args.lifetime, args.latency_ms, args.send_ms)
+        print(f"{name:8s} token_requests={r['token_requests']:3d}  stalled_sends={r['stalled_sends']:4d}/{r['sends']}  "
+              f"p99 {r['p99_ms']:7.2f} ms  max {r['max_ms']:7.1f} ms", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Throughput scaling of lease-based scheduler workers sharing one SQLite store.
+
+Every run fills a fresh store with jobs that are all due, starts N worker
+processes (each with its own SMTP pool) against the SMTP stand-in and
+checks that every job was sent exactly once.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --jobs 4000 --latency-ms 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.standins import StandinSMTPServer
+from job_store import JobStore
+from jobs import SENT, Job
+from smtp_pool import SMTPPool
+from worker import run_worker, start_workers
+
+
+def fill_store(path, jobs):
+    store = JobStore(path)
+    due = int(time.time()) - 1
+    store.add_many(
+        Job.from_email({'to': f'user{i}@example.com', 'subject': 'Benchmark', 'recipient_name': f'User{i}',
+                        'company_intro': 'Hello from the benchmark.', 'scheduled_time': due}, store.texts)
+        for i in range(jobs)
+    )
+    store.close()
+
+
+def bench_worker(path, port, threads, batch_size):
+    store = JobStore(path, batch_size=batch_size)
+    pool = SMTPPool('127.0.0.1', port, 'bench', 'secret', size=threads, use_tls=False)
+
+    def send(job):
+        pool.sendmail('bench@example.com', job.to, f'Subject: {job.subject}\r\n\r\n{store.texts[job.intro_id]}\r\n')
+        return True, 'sent'
+
+    def record(job, success, message):
+        if success:
+            store.mark_sent(job.id)
+        else:
+            store.mark_failed(job.id, message, retry_at=time.time())
+
+    try:
+        run_worker(store, send, record, max_workers=threads, batch_size=batch_size, poll_interval=0.2)
+    finally:
+        pool.close()
+        store.close()
+
+
+def run_one(workers, jobs=4000, latency_ms=20.0, threads=4, batch_size=100):
+    with tempfile.TemporaryDirectory() as tmp, \
+            StandinSMTPServer(send_delay=latency_ms / 1000) as smtp:
+        path = os.path.join(tmp, 'jobs.db')
+        fill_store(path, jobs)
+
+        start = time.perf_counter()
+        exit_codes = start_workers(workers, bench_worker, path, smtp.port, threads, batch_size)
+        elapsed = time.perf_counter() - start
+
+        store = JobStore(path)
+        sent = store.counts()[SENT]
+        store.close()
+    return {
+        'workers': workers,
+        'jobs': jobs,
+        'seconds': round(elapsed, 2),
+        'sends_per_sec': round(jobs / elapsed, 1),
+        'sent': sent,
+        'duplicates': smtp.stats['messages'] - sent,
+        'ok': sent == jobs and all(code == 0 for code in exit_codes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--jobs', type=int, default=4000)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='stand-in SMTP time per message')
+    parser.add_argument('--threads', type=int, default=4, help='send threads (and SMTP connections) per worker')
+    parser.add_argument('--batch-size', type=int, default=100, help='jobs leased per claim')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s), {args.threads} send threads per worker")
+    baseline = None
+    for workers in args.workers:
+        r = run_one(workers, args.jobs, args.latency_ms, args.threads, args.batch_size)
+        baseline = baseline or r['sends_per_sec']
+        print(f"{r['workers']:2d} worker(s) {r['sends_per_sec']:8.1f} sends/s  {r['seconds']:7.2f}s  "
+              f"x{r['sends_per_sec'] / baseline:4.1f}  sent={r['sent']} duplicates={r['duplicates']} "
+              f"{'ok' if r['ok'] else 'FAILED'}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1062 @@
+"""
+Local stand-in servers for exercising the transports offline.
+
+StandinAPIServer answers the Gmail REST (including media uploads and
+batches), Graph (/me/messages, $batch, upload sessions), Sheets v4 and
+OAuth token calls the apps make; StandinSMTPServer speaks enough ESMTP
+for smtplib and the async transport. Both can be made to behave like the
+real services under load:
+
+- latency: a fixed number of seconds or a Latency distribution
+  (Latency.parse('lognormal:40ms:0.5')), per request or SMTP message
+- Rules per service ('gmail', 'graph', 'sheets', 'oauth'): their own
+  latency, random error rates ({429: 0.01, 503: 0.002}), token-bucket
+  Quotas and a cap on concurrent requests, with errors shaped like the
+  real service's (Gmail rateLimitExceeded, Graph Retry-After, Sheets
+  RESOURCE_EXHAUSTED). realistic_rules() has the published limits.
+- SMTP: error rates (421 closes the connection), a message-rate Quota
+  answered with 421 4.7.28 like Gmail, messages_per_connection, and
+  connections dropped after a message was queued (drop_after_data).
+
+The benchmarks start them in-process. To load test an app by hand, run
+them from the repo root and point the app at the printed addresses:
+
+    python -m benchmarks.standins --realistic --latency lognormal:40ms:0.5 --errors gmail=429:0.01,503:0.002
+"""
+
+import argparse
+import base64
+import collections
+import contextlib
+import email
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import socketserver
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.client import responses
+
+import requests
+
+import gmail_api
+
+
+# ---------------- LATENCY, ERRORS, QUOTAS ---------------- #
+
+def _duration(text):
+    """'40ms' / '0.5s' / '0.5' (seconds) -> seconds"""
+    text = text.strip().lower()
+    if text.endswith('ms'):
+        return float(text[:-2]) / 1000
+    return float(text[:-1] if text.endswith('s') else text)
+
+
+class Latency:
+    """
+    Random delay in seconds; calling it draws one.
+
+    Latency.parse() takes 'fixed:50ms' (or just '50ms'), 'uniform:LOW:HIGH',
+    'normal:MEAN:STDDEV' (clipped at 0), 'lognormal:MEDIAN:SIGMA' (the long
+    right tail real APIs have) and 'exp:MEAN'.
+    """
+
+    def __init__(self, kind, *params, seed=None):
+        self.kind = kind
+        self.params = params
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=None):
+        kind, *params = spec.split(':')
+        if not params:
+            kind, params = 'fixed', [kind]
+        if kind == 'lognormal':
+            return cls(kind, _duration(params[0]), float(params[1]), seed=seed)
+        if kind not in ('fixed', 'uniform', 'normal', 'exp'):
+            raise ValueError(f"unknown latency distribution {kind!r}")
+        return cls(kind, *map(_duration, params), seed=seed)
+
+    def __call__(self):
+        with self._lock:
+            if self.kind == 'fixed':
+                return self.params[0]
+            if self.kind == 'uniform':
+                return self._random.uniform(*self.params)
+            if self.kind == 'normal':
+                return max(0.0, self._random.gauss(*self.params))
+            if self.kind == 'lognormal':
+                median, sigma = self.params
+                return median * math.exp(self._random.gauss(0, sigma))
+            return self._random.expovariate(1 / self.params[0])
+
+    def __repr__(self):
+        return f"Latency({self.kind}, {', '.join(map(str, self.params))})"
+
+
+def _delay(latency):
+    seconds = latency() if callable(latency) else latency
+    if seconds:
+        time.sleep(seconds)
+
+
+class Quota:
+    """Token bucket: `limit` units per `period` seconds, with bursts up to `limit`"""
+
+    def __init__(self, limit, period=1.0):
+        self.limit = limit
+        self.period = period
+        self._tokens = float(limit)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, cost=1):
+        """0 if the units were available (and are now spent), else seconds until they would be"""
+        with self._lock:
+            now = time.monotonic()
+            rate = self.limit / self.period
+            self._tokens = min(self.limit, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0.0
+            return (cost - self._tokens) / rate
+
+    def __repr__(self):
+        return f"Quota({self.limit:g}/{self.period:g}s)"
+
+
+class Rules:
+    """
+    How one service behaves: latency (seconds or a Latency; None = the
+    server's), error rates {status: probability} drawn per call, Quotas by
+    bucket name, and how many requests may be in flight at once.
+    """
+
+    def __init__(self, latency=None, errors=None, quotas=None, concurrency=None, retry_after=1, seed=None):
+        self.latency = latency
+        self.errors = dict(errors or {})
+        self.quotas = dict(quotas or {})
+        self.concurrency = concurrency
+        self.retry_after = retry_after  # what throttled Graph calls are told to wait, besides quota waits
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fault(self):
+        """Status of an injected error for this call, or None"""
+        if not self.errors:
+            return None
+        with self._lock:
+            draw = self._random.random()
+        for status, rate in self.errors.items():
+            if draw < rate:
+                return status
+            draw -= rate
+        return None
+
+    def __repr__(self):
+        return (f"Rules(latency={self.latency!r}, errors={self.errors}, quotas={self.quotas}, "
+                f"concurrency={self.concurrency})")
+
+
+def realistic_rules(seed=None):
+    """
+    The published per-user limits: Gmail 250 quota units per second,
+    Graph 10,000 requests per 10 minutes and 4 concurrent requests per
+    mailbox, Sheets 60 read and 60 write requests per minute.
+    """
+    return {
+        'gmail': Rules(quotas={'units': Quota(gmail_api.USER_UNITS_PER_SECOND, 1.0)}, seed=seed),
+        'graph': Rules(quotas={'requests': Quota(10000, 600)}, concurrency=4, seed=seed),
+        'sheets': Rules(quotas={'read': Quota(60, 60), 'write': Quota(60, 60)}, seed=seed),
+    }
+
+
+# ---------------- SMTP ---------------- #
+
+SMTP_ERRORS = {
+    421: '421 4.7.0 Try again later, closing connection',
+    450: '450 4.2.1 The user you are trying to contact is receiving mail too quickly',
+    451: '451 4.3.0 Mail server temporarily rejected message',
+    452: '452 4.5.3 Your message has too many recipients',
+    550: '550 5.7.1 Message rejected',
+    552: '552 5.3.4 Message size exceeds fixed limit',
+    554: '554 5.6.0 Message content rejected',
+}
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough ESMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        # Stand-in for the TCP + TLS + AUTH round-trips of a real provider
+        _delay(server.handshake_delay)
+        server.count('connections')
+        self.reply('220 standin ESMTP ready')
+        sent_here = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.wfile.write(b'250-standin\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+            elif verb == 'AUTH':
+                if command.upper().startswith('AUTH LOGIN'):
+                    self.reply('334 VXNlcm5hbWU6')
+                    self.rfile.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                server.count('logins')
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb == 'MAIL' and server.messages_per_connection and sent_here >= server.messages_per_connection:
+                # Provider-style "too many messages on this session", before the next message starts
+                self.reply('421 4.7.0 Try again later, closing connection')
+                return
+            elif verb in ('MAIL', 'RCPT', 'RSET'):
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b'.\r\n':
+                        break
+                    size += len(data_line)
+                _delay(server.send_delay)
+                rejection = server.admit()
+                if rejection:
+                    self.reply(rejection)
+                    if rejection.startswith('421'):
+                        return
+                    continue
+                sent_here += 1
+                server.count('messages')
+                server.count('bytes', size)
+                if server.dropped():
+                    return  # queued, but the client never hears so
+                self.reply('250 2.0.0 OK queued')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StandinSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded local SMTP server with a simulated handshake cost.
+
+    Delays are seconds or Latency distributions. errors ({status: rate},
+    statuses from SMTP_ERRORS) answer the end of DATA instead of 250; a
+    421 also closes the connection. messages_per_connection refuses the
+    MAIL after that many messages with 421. quota is a Quota of messages: past it,
+    messages get Gmail's 421 4.7.28 and the connection is closed.
+    drop_after_data is the rate of messages queued and then answered by
+    closing the connection, so the client loses the reply to the final '.'.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024  # benchmarks open hundreds of connections at once
+
+    def __init__(self, host='127.0.0.1', port=0, handshake_delay=0.0, send_delay=0.0,
+                 messages_per_connection=0, errors=None, quota=None, drop_after_data=0.0, seed=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.handshake_delay = handshake_delay
+        self.send_delay = send_delay
+        self.messages_per_connection = messages_per_connection
+        self.rules = Rules(errors=errors, seed=seed)
+        self.quota = quota
+        self.drop_after_data = drop_after_data
+        self._drops = random.Random(seed)
+        self.stats = {'connections': 0, 'logins': 0, 'messages': 0, 'bytes': 0, 'faults': 0, 'throttled': 0,
+                      'dropped': 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def admit(self):
+        """None to accept a message, or the reply rejecting it"""
+        status = self.rules.fault()
+        if status:
+            self.count('faults')
+            return SMTP_ERRORS.get(status, f'{status} Rejected by stand-in')
+        if self.quota and self.quota.take():
+            self.count('throttled')
+            return '421 4.7.28 Our system has detected an unusual rate of mail, try again later'
+        return None
+
+    def dropped(self):
+        """Whether to close instead of confirming a message just queued"""
+        with self._stats_lock:
+            if not self.drop_after_data or self._drops.random() >= self.drop_after_data:
+                return False
+            self.stats['dropped'] += 1
+            return True
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------- GMAIL / GRAPH HTTP ---------------- #
+
+class _APIHandler(BaseHTTPRequestHandler):
+    """Gmail REST, Microsoft Graph, Sheets and OAuth token endpoints used by the apps"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Stand-in for the TCP + TLS handshake a new HTTPS connection costs
+        _delay(self.server.handshake_delay)
+        self.server.count('connections')
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count('bytes_out', len(body))
+
+    def do_GET(self):
+        self.dispatch(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        self.server.count('bytes', len(body))
+        self.dispatch(body)
+
+    do_PUT = do_POST
+
+    def dispatch(self, body):
+        server = self.server
+        path, _, query = self.path.partition('?')
+        service = _service(path)
+        with server.in_flight(service) as admitted:
+            _delay(server.latency_for(service))
+            server.count('requests')
+            if not admitted:
+                server.count('throttled')
+                self.send_json(*_error(service, 429, server.rules[service].retry_after, 'concurrency'))
+                return
+            if path.startswith('/batch') or path == '/$batch':
+                rejection = None  # batched calls are admitted one by one
+            else:
+                rejection = server.admit(service, _charge(service, self.command, path, query))
+            if rejection:
+                self.send_json(*rejection)
+                return
+            self.route(path, query, body)
+
+    def route(self, path, query, body):
+        server = self.server
+        if body is None:
+            status, payload = server.handle_call(path, None, query)
+            self.send_json(status, payload)
+            return
+        if path.startswith('/batch'):
+            self.send_batch(body)
+            return
+        if path.startswith(GMAIL_UPLOAD_PREFIX):
+            self.send_json(*server.handle_gmail_upload(path, query, self.headers, body))
+            return
+        if path == '/$batch':
+            self.send_graph_batch(body)
+            return
+        if path.startswith(GRAPH_UPLOAD_PREFIX) and self.command == 'PUT':
+            self.send_json(*server.handle_upload(path, self.headers.get('Content-Range', ''), body))
+            return
+        status, payload = server.handle_call(path, body)
+        self.send_json(status, payload)
+
+    def send_batch(self, body):
+        """Google batch endpoint: a multipart/mixed body of application/http calls"""
+        server = self.server
+        batch = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        for part in batch.get_payload():
+            server.count('batched_calls')
+            head, _, call_body = part.get_payload().replace('\r\n', '\n').partition('\n\n')
+            path = head.split(' ', 2)[1].split('?', 1)[0]
+            status, payload, headers = (server.admit('gmail', _charge('gmail', 'POST', path))
+                                        or server.handle_call(path, call_body.encode()) + ({},))
+            content_id = part['Content-ID'].strip('<>')
+            parts.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n'
+                f'HTTP/1.1 {status} {responses.get(status, "")}\r\n'
+                + ''.join(f'{name}: {value}\r\n' for name, value in headers.items()) +
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(payload)}\r\n'
+            )
+        data = (''.join(parts) + f'--{boundary}--\r\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/mixed; boundary={boundary}')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_graph_batch(self, body):
+        """Graph JSON $batch: {"requests": [...]} in, {"responses": [...]} out"""
+        server = self.server
+        calls = json.loads(body)['requests']
+        if len(calls) > 20:
+            self.send_json(400, {'error': {'code': 'BadRequest', 'message': 'Too many requests in batch'}})
+            return
+        responses = []
+        for call in calls:
+            server.count('batched_calls')
+            if server.throttled():
+                responses.append({'id': call['id'], 'status': 429, 'headers': {'Retry-After': '0'},
+                                  'body': {'error': {'code': 'TooManyRequests', 'message': 'Throttled'}}})
+                continue
+            rejection = server.admit('graph', ('requests', 1))
+            if rejection:
+                status, payload, headers = rejection
+                responses.append({'id': call['id'], 'status': status, 'headers': headers, 'body': payload})
+                continue
+            status, payload = server.handle_call(call['url'], json.dumps(call.get('body') or {}).encode())
+            responses.append({'id': call['id'], 'status': status,
+                              'headers': {'Content-Type': 'application/json'}, 'body': payload})
+        self.send_json(200, {'responses': responses})
+
+
+def _gmail_send(server, body):
+    return 200, {'id': server.next_id('msg'), 'threadId': server.next_id('thread'), 'labelIds': ['SENT']}
+
+
+def _gmail_draft_create(server, body):
+    return 200, {'id': server.next_id('r'), 'message': {'id': server.next_id('msg')}}
+
+
+def _gmail_draft_send(server, body):
+    return 200, {'id': server.next_id('msg'), 'labelIds': ['SENT'], 'draftId': body.get('id')}
+
+
+def _graph_create_message(server, body):
+    message_id = server.next_id('AAMk')
+    attachments = []
+    for attachment in body.get('attachments', []):
+        data = base64.b64decode(attachment['contentBytes'])
+        attachments.append({'name': attachment['name'], 'size': len(data),
+                            'sha256': hashlib.sha256(data).hexdigest()})
+    with server._stats_lock:
+        server.messages[message_id] = {'subject': body.get('subject'), 'attachments': attachments}
+    return 201, {'id': message_id, 'subject': body.get('subject'), 'isDraft': True}
+
+
+def _oauth_token(server, body):
+    server.count('token_refreshes')
+    return 200, {'access_token': server.next_id('ya29'), 'expires_in': server.token_lifetime, 'token_type': 'Bearer'}
+
+
+GMAIL_UPLOAD_PREFIX = '/upload/gmail/'
+GRAPH_MESSAGES_PREFIX = '/me/messages/'
+GRAPH_UPLOAD_PREFIX = '/upload/'
+SHEETS_PREFIX = '/v4/spreadsheets/'
+GMAIL_METHODS = {
+    '/gmail/v1/users/me/messages/send': 'messages.send',
+    '/gmail/v1/users/me/drafts': 'drafts.create',
+    '/gmail/v1/users/me/drafts/send': 'drafts.send',
+}
+
+
+def _service(path):
+    """Which service's Rules a request path falls under"""
+    if path.startswith(('/gmail/', GMAIL_UPLOAD_PREFIX, '/batch')):
+        return 'gmail'
+    if path.startswith(SHEETS_PREFIX):
+        return 'sheets'
+    if path == '/token':
+        return 'oauth'
+    return 'graph'
+
+
+def _charge(service, method, path, query=''):
+    """(quota bucket, cost) of one call, or None for upload chunks, which no quota counts"""
+    if service == 'gmail':
+        if 'upload_id=' in query:
+            return None
+        if path.startswith(GMAIL_UPLOAD_PREFIX):
+            path = path[len('/upload'):]
+        return 'units', gmail_api.QUOTA_UNITS.get(GMAIL_METHODS.get(path), 1)
+    if service == 'sheets':
+        return ('read' if method == 'GET' else 'write'), 1
+    if service == 'graph' and path.startswith(GRAPH_UPLOAD_PREFIX):
+        return None
+    return 'requests', 1
+
+
+_GOOGLE_ERRORS = {
+    403: ('userRateLimitExceeded', 'PERMISSION_DENIED'),
+    429: ('rateLimitExceeded', 'RESOURCE_EXHAUSTED'),
+    500: ('backendError', 'INTERNAL'),
+    502: ('backendError', 'UNAVAILABLE'),
+    503: ('backendError', 'UNAVAILABLE'),
+    504: ('backendError', 'DEADLINE_EXCEEDED'),
+}
+_GRAPH_ERRORS = {429: 'TooManyRequests', 500: 'generalException', 502: 'generalException',
+                 503: 'serviceNotAvailable', 504: 'gatewayTimeout'}
+
+
+def _error(service, status, retry_after=None, bucket=None):
+    """
+    (status, payload, headers) of a throttled or failed call, shaped like
+    the service's own. Graph always says Retry-After; Google only when a
+    quota (bucket) ran out.
+    """
+    if bucket:
+        message = f"Quota exceeded for '{bucket}' on the {service} stand-in"
+    else:
+        message = f'{responses.get(status, "Error")} (injected by the stand-in)'
+    headers = {}
+    if retry_after is not None and (service == 'graph' or bucket):
+        headers['Retry-After'] = str(math.ceil(retry_after))
+    if service == 'graph':
+        return status, {'error': {'code': _GRAPH_ERRORS.get(status, 'generalException'), 'message': message}}, headers
+    reason, grpc_status = _GOOGLE_ERRORS.get(status, ('backendError', 'UNKNOWN'))
+    return status, {'error': {
+        'code': status, 'message': message, 'status': grpc_status,
+        'errors': [{'message': message, 'domain': 'usageLimits' if status in (403, 429) else 'global',
+                    'reason': reason}],
+    }}, headers
+
+
+def _a1_cell(cell, default_row):
+    """'H12' -> (7, 11); a bare column ('I') gets default_row"""
+    letters = cell.rstrip('0123456789')
+    column = 0
+    for letter in letters.upper():
+        column = column * 26 + ord(letter) - ord('A') + 1
+    digits = cell[len(letters):]
+    return column - 1, int(digits) - 1 if digits else default_row
+
+
+_A1_CELLS = re.compile(r'[A-Za-z]*[0-9]*(:[A-Za-z]*[0-9]*)?')
+
+
+def _a1_split(name):
+    """(title, cells) of an A1 range; a bare name that is not a cell range is a whole tab"""
+    title, _, cells = name.rpartition('!')
+    if not title and not _A1_CELLS.fullmatch(cells):
+        title, cells = cells, 'A:ZZ'
+    return title.strip("'").replace("''", "'") or 'Sheet1', cells
+
+
+def _a1_range(name):
+    """Zero-based ((column, row), (column, row)) corners of an A1 range such as 'Sheet1'!A:I"""
+    first, _, last = _a1_split(name)[1].partition(':')
+    return _a1_cell(first, 0), _a1_cell(last or first, 10 ** 9 if last else None)
+
+
+def _a1_title(name):
+    """Worksheet title of an A1 range ('Archive'!A1 and 'Archive' -> Archive); bare cells are on Sheet1"""
+    return _a1_split(name)[0]
+
+
+def _write_values(rows, name, values):
+    (column, row_number), _ = _a1_range(name)
+    for i, row_values in enumerate(values):
+        while len(rows) <= row_number + i:
+            rows.append([])
+        row = rows[row_number + i]
+        row.extend([''] * (column + len(row_values) - len(row)))
+        row[column:column + len(row_values)] = row_values
+
+
+class StandinSession(requests.Session):
+    """requests session that sends calls for Google API hosts to a stand-in (for gspread)"""
+
+    hosts = ('https://sheets.googleapis.com',)
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+
+    def request(self, method, url, *args, **kwargs):
+        for host in self.hosts:
+            if url.startswith(host):
+                url = self.url + url[len(host):]
+        return super().request(method, url, *args, **kwargs)
+
+
+class StandinAPIServer(ThreadingHTTPServer):
+    """Local HTTP stand-in for the Gmail REST, Graph, Sheets and OAuth token endpoints we call"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024  # benchmarks open hundreds of connections at once
+
+    routes = {
+        '/gmail/v1/users/me/messages/send': _gmail_send,
+        '/gmail/v1/users/me/drafts': _gmail_draft_create,
+        '/gmail/v1/users/me/drafts/send': _gmail_draft_send,
+        '/me/messages': _graph_create_message,
+        '/token': _oauth_token,
+    }
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, token_lifetime=3600, throttle_every=0,
+                 handshake_delay=0.0, upload_errors_every=0, rules=None):
+        super().__init__((host, port), _APIHandler)
+        self.latency = latency  # seconds or a Latency, per HTTP request
+        self.rules = dict(rules or {})  # service -> Rules: latency, error rates, quotas, concurrency
+        self._in_flight = collections.Counter()
+        self.handshake_delay = handshake_delay
+        self.token_lifetime = token_lifetime  # expires_in handed out by /token
+        self.throttle_every = throttle_every  # every Nth Graph $batch call gets a 429
+        self._batched = itertools.count(1)
+        self.stats = {'requests': 0, 'connections': 0, 'batched_calls': 0, 'bytes': 0, 'token_refreshes': 0,
+                      'upload_chunks': 0, 'faults': 0, 'throttled': 0,
+                      'bytes_out': 0, 'sheet_reads': 0, 'sheet_writes': 0, 'sheet_cells_read': 0}
+        self.sheets = {}  # spreadsheet id -> rows of its first worksheet ("Sheet1")
+        self.tabs = {}  # spreadsheet id -> {title: rows} for worksheets added later
+        self.messages = {}  # Graph draft id -> subject and attachments (name, size, sha256)
+        self.uploads = {}  # Graph upload session id -> progress; bytes are hashed, not kept
+        self.upload_errors_every = upload_errors_every  # every Nth upload chunk gets a 503 and is dropped
+        self.media = {}  # Gmail id -> size and sha256 of the RFC 822 message uploaded as media
+        self._chunks = itertools.count(1)
+        self._ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    def handle_call(self, path, body, query=''):
+        """(status, payload) for one API call, direct or inside a batch; GETs have no body"""
+        if path.startswith(SHEETS_PREFIX):
+            return self.handle_sheets(path, None if body is None else json.loads(body or b'{}'), query)
+        if path.startswith(GRAPH_MESSAGES_PREFIX) and path.endswith('/attachments/createUploadSession'):
+            return self.create_upload_session(path[len(GRAPH_MESSAGES_PREFIX):].split('/', 1)[0],
+                                              json.loads(body or b'{}'))
+        if path.startswith(GRAPH_UPLOAD_PREFIX) and body is None:
+            upload = self.uploads.get(path[len(GRAPH_UPLOAD_PREFIX):])
+            if upload is None:
+                return 404, {'error': {'code': 'ItemNotFound', 'message': 'Upload session not found'}}
+            return 200, {'nextExpectedRanges': [f"{upload['next']}-"]}
+        route = self.routes.get(path)
+        if route is None:
+            return 404, {'error': {'code': 404, 'message': f'No stand-in for {path}'}}
+        if body.startswith(b'{') or not body:
+            return route(self, json.loads(body or b'{}'))
+        return route(self, dict(urllib.parse.parse_qsl(body.decode())))  # OAuth token requests are form-encoded
+
+    def handle_sheets(self, path, body, query=''):
+        """
+        Sheets v4: metadata, values get/batchGet/append/update/batchUpdate,
+        and addSheet/deleteDimension. The first tab is "Sheet1", whose rows
+        are self.sheets[spreadsheet_id]; tabs added later live in self.tabs.
+        """
+        spreadsheet_id, _, rest = urllib.parse.unquote(path[len(SHEETS_PREFIX):]).partition('/')
+        if spreadsheet_id.endswith(':batchUpdate'):
+            return self._sheets_batch_update(spreadsheet_id[:-len(':batchUpdate')], body)
+        with self._stats_lock:
+            self.sheets.setdefault(spreadsheet_id, [])
+        if body is None and not rest:
+            self.count('sheet_reads')
+            return 200, {
+                'spreadsheetId': spreadsheet_id,
+                'properties': {'title': 'Schedule'},
+                'sheets': [
+                    {'properties': {'sheetId': index, 'title': title, 'index': index, 'sheetType': 'GRID',
+                                    'gridProperties': {'rowCount': 1000, 'columnCount': 26}}}
+                    for index, title in enumerate(self._tab_titles(spreadsheet_id))
+                ],
+            }
+        if body is None and rest == 'values:batchGet':
+            self.count('sheet_reads')
+            names = urllib.parse.parse_qs(query).get('ranges', [])
+            return 200, {'spreadsheetId': spreadsheet_id,
+                         'valueRanges': [self._read_values(spreadsheet_id, name) for name in names]}
+        if body is None and rest.startswith('values/'):
+            self.count('sheet_reads')
+            return 200, self._read_values(spreadsheet_id, rest[len('values/'):])
+        if body is not None and rest.startswith('values/') and rest.endswith(':append'):
+            self.count('sheet_writes')
+            name = rest[len('values/'):-len(':append')]
+            values = body.get('values', [])
+            with self._stats_lock:
+                rows = self._tab(spreadsheet_id, _a1_title(name))
+                first = len(rows) + 1
+                rows.extend(values)
+            return 200, {'spreadsheetId': spreadsheet_id, 'updates': {
+                'spreadsheetId': spreadsheet_id, 'updatedRows': len(values),
+                'updatedRange': f'{_a1_title(name)}!A{first}:Z{first + len(values) - 1}',
+            }}
+        if body is not None and rest == 'values:batchUpdate':
+            self.count('sheet_writes')
+            with self._stats_lock:
+                for update in body.get('data', []):
+                    _write_values(self._tab(spreadsheet_id, _a1_title(update['range'])), update['range'],
+                                  update['values'])
+            return 200, {'spreadsheetId': spreadsheet_id, 'totalUpdatedRanges': len(body.get('data', []))}
+        if body is not None and rest.startswith('values/'):  # values.update (PUT)
+            self.count('sheet_writes')
+            name = rest[len('values/'):]
+            with self._stats_lock:
+                _write_values(self._tab(spreadsheet_id, _a1_title(name)), name, body['values'])
+            return 200, {'spreadsheetId': spreadsheet_id, 'updatedRange': name}
+        return 404, {'error': {'code': 404, 'message': f'No Sheets stand-in for {path}'}}
+
+    def _tab_titles(self, spreadsheet_id):
+        return ['Sheet1', *self.tabs.get(spreadsheet_id, {})]
+
+    def _tab(self, spreadsheet_id, title):
+        if title == 'Sheet1':
+            return self.sheets.setdefault(spreadsheet_id, [])
+        return self.tabs.setdefault(spreadsheet_id, {}).setdefault(title, [])
+
+    def _read_values(self, spreadsheet_id, name):
+        (first_column, first_row), (last_column, last_row) = _a1_range(name)
+        with self._stats_lock:
+            rows = self._tab(spreadsheet_id, _a1_title(name))
+            values = [row[first_column:last_column + 1] for row in rows[first_row:last_row + 1]]
+        while values and not any(values[-1]):
+            values.pop()
+        self.count('sheet_cells_read', sum(len(row) for row in values))
+        return {'range': name, 'majorDimension': 'ROWS', 'values': values}
+
+    def _sheets_batch_update(self, spreadsheet_id, body):
+        """spreadsheets.batchUpdate: addSheet and deleteDimension (rows) are all the apps use"""
+        self.count('sheet_writes')
+        replies = []
+        with self._stats_lock:
+            for request in body.get('requests', []):
+                if 'addSheet' in request:
+                    title = request['addSheet']['properties']['title']
+                    self._tab(spreadsheet_id, title)
+                    index = self._tab_titles(spreadsheet_id).index(title)
+                    replies.append({'addSheet': {'properties': {
+                        'sheetId': index, 'title': title, 'index': index, 'sheetType': 'GRID',
+                        'gridProperties': {'rowCount': 1000, 'columnCount': 26}}}})
+                elif 'deleteDimension' in request:
+                    grid = request['deleteDimension']['range']
+                    rows = self._tab(spreadsheet_id, self._tab_titles(spreadsheet_id)[grid['sheetId']])
+                    del rows[grid['startIndex']:grid['endIndex']]
+                    replies.append({})
+                else:
+                    return 400, {'error': {'code': 400, 'message': f'No stand-in for {list(request)}'}}
+        return 200, {'spreadsheetId': spreadsheet_id, 'replies': replies}
+
+    def create_upload_session(self, message_id, body):
+        """Graph attachments/createUploadSession on a draft"""
+        if message_id not in self.messages:
+            return 404, {'error': {'code': 'ErrorItemNotFound', 'message': f'No draft {message_id}'}}
+        item = body['AttachmentItem']
+        session_id = self.next_id('upload')
+        with self._stats_lock:
+            self.uploads[session_id] = {'message': message_id, 'name': item['name'], 'size': int(item['size']),
+                                        'next': 0, 'sha256': hashlib.sha256()}
+        return 201, {'uploadUrl': f'{self.url}{GRAPH_UPLOAD_PREFIX}{session_id}',
+                     'nextExpectedRanges': ['0-']}
+
+    def handle_upload(self, path, content_range, body):
+        """One PUT of an upload session: chunks in order, all but the last a multiple of 320 KiB"""
+        self.count('upload_chunks')
+        upload = self.uploads.get(path[len(GRAPH_UPLOAD_PREFIX):])
+        if upload is None:
+            return 404, {'error': {'code': 'ItemNotFound', 'message': 'Upload session not found'}}
+        with self._stats_lock:
+            failed = bool(self.upload_errors_every) and next(self._chunks) % self.upload_errors_every == 0
+        if failed:
+            return 503, {'error': {'code': 'serviceNotAvailable', 'message': 'Try again'}}
+        match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+)', content_range)
+        if match is None:
+            return 400, {'error': {'code': 'InvalidRequest', 'message': 'Content-Range required'}}
+        first, last, size = map(int, match.groups())
+        end = last + 1
+        if (first != upload['next'] or size != upload['size'] or len(body) != end - first
+                or (end < size and len(body) % (320 * 1024))):
+            return 416, {'error': {'code': 'InvalidRange', 'message': f"Expected {upload['next']}-"}}
+        with self._stats_lock:
+            upload['sha256'].update(body)
+            upload['next'] = end
+            if end < size:
+                return 200, {'nextExpectedRanges': [f'{end}-']}
+            del self.uploads[path[len(GRAPH_UPLOAD_PREFIX):]]
+            self.messages[upload['message']]['attachments'].append(
+                {'name': upload['name'], 'size': size, 'sha256': upload['sha256'].hexdigest()})
+        return 201, {}
+
+    def handle_gmail_upload(self, path, query, headers, body):
+        """
+        Gmail media upload: uploadType=media (the message is the body),
+        multipart (JSON metadata, then the message) or resumable (a session,
+        then PUTs with Content-Range; 308 until the last byte arrives).
+        Returns (status, payload, headers).
+        """
+        params = dict(urllib.parse.parse_qsl(query))
+        route = self.routes.get(path[len('/upload'):])
+        if route is None:
+            return 404, {'error': {'code': 404, 'message': f'No stand-in for {path}'}}, None
+        upload_type = params.get('uploadType')
+        if upload_type == 'media':
+            return self._gmail_media(route, {}, body) + (None,)
+        if upload_type == 'multipart':
+            boundary = re.search(r'boundary="?([^";]+)"?', headers['Content-Type']).group(1).encode()
+            metadata, media = body.split(b'--' + boundary)[1:3]
+            metadata, media = metadata.split(b'\n\n', 1)[1], media.split(b'\n\n', 1)[1]
+            return self._gmail_media(route, json.loads(metadata), media[:-1]) + (None,)
+        if upload_type != 'resumable':
+            return 400, {'error': {'code': 400, 'message': f'uploadType {upload_type!r}'}}, None
+        if 'upload_id' not in params:
+            upload_id = self.next_id('gmail-upload')
+            with self._stats_lock:
+                self.uploads[upload_id] = {'metadata': json.loads(body or b'{}'), 'next': 0,
+                                           'sha256': hashlib.sha256()}
+            return 200, {}, {'Location': f'{self.url}{path}?uploadType=resumable&upload_id={upload_id}'}
+
+        self.count('upload_chunks')
+        upload = self.uploads.get(params['upload_id'])
+        if upload is None:
+            return 404, {'error': {'code': 404, 'message': 'Upload session not found'}}, None
+        with self._stats_lock:
+            failed = bool(self.upload_errors_every) and next(self._chunks) % self.upload_errors_every == 0
+        if failed:
+            return 503, {'error': {'code': 503, 'message': 'Backend Error'}}, None
+        match = re.fullmatch(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', headers.get('Content-Range', ''))
+        if match is None:
+            return 400, {'error': {'code': 400, 'message': 'Content-Range required'}}, None
+        if match.group(1) is not None:
+            if int(match.group(1)) != upload['next'] or len(body) != int(match.group(2)) + 1 - upload['next']:
+                return 400, {'error': {'code': 400, 'message': f"Expected byte {upload['next']}"}}, None
+            with self._stats_lock:
+                upload['sha256'].update(body)
+                upload['next'] += len(body)
+        if match.group(3) != '*' and upload['next'] == int(match.group(3)):
+            with self._stats_lock:
+                del self.uploads[params['upload_id']]
+            status, payload = route(self, upload['metadata'])
+            with self._stats_lock:
+                self.media[payload['id']] = {'size': upload['next'], 'sha256': upload['sha256'].hexdigest()}
+            return status, payload, None
+        return 308, {}, {'Range': f"bytes=0-{upload['next'] - 1}"} if upload['next'] else {}
+
+    def _gmail_media(self, route, metadata, data):
+        status, payload = route(self, metadata)
+        with self._stats_lock:
+            self.media[payload['id']] = {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+        return status, payload
+
+    def next_id(self, prefix):
+        return f'{prefix}-{next(self._ids)}'
+
+    def latency_for(self, service):
+        rules = self.rules.get(service)
+        return self.latency if rules is None or rules.latency is None else rules.latency
+
+    @contextlib.contextmanager
+    def in_flight(self, service):
+        """Hold a request against the service's concurrency cap; yields False if it is over"""
+        rules = self.rules.get(service)
+        with self._stats_lock:
+            self._in_flight[service] += 1
+            admitted = not (rules and rules.concurrency) or self._in_flight[service] <= rules.concurrency
+        try:
+            yield admitted
+        finally:
+            with self._stats_lock:
+                self._in_flight[service] -= 1
+
+    def admit(self, service, charge):
+        """None to serve one call (direct or batched), or the (status, payload, headers) refusing it"""
+        rules = self.rules.get(service)
+        if rules is None:
+            return None
+        status = rules.fault()
+        if status:
+            self.count('faults')
+            return _error(service, status, rules.retry_after)
+        quota = rules.quotas.get(charge[0]) if charge else None
+        wait = quota.take(charge[1]) if quota else 0
+        if wait:
+            self.count('throttled')
+            return _error(service, 429, wait, charge[0])
+        return None
+
+    def throttled(self):
+        """Whether this Graph $batch call is one of the throttle_every 429s (counted as throttled)"""
+        with self._stats_lock:
+            throttled = bool(self.throttle_every) and next(self._batched) % self.throttle_every == 0
+            self.stats['throttled'] += throttled
+            return throttled
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------- COMMAND LINE ---------------- #
+
+QUOTA_BUCKETS = {'gmail': ('units',), 'graph': ('requests',), 'oauth': ('requests',), 'sheets': ('read', 'write'),
+                 'smtp': ('messages',)}
+
+
+def _assignment(text):
+    """'gmail=lognormal:40ms:0.5' -> ('gmail', 'lognormal:40ms:0.5'); no 'service=' -> (None, text)"""
+    name, equals, value = text.partition('=')
+    return (name, value) if equals else (None, text)
+
+
+def _rates(text):
+    """'429:0.01,503:0.002' -> {429: 0.01, 503: 0.002}"""
+    return {int(status): float(rate) for status, rate in (pair.split(':') for pair in text.split(','))}
+
+
+def _quota(text):
+    """'250/1' -> Quota(250, 1.0); '10000/10m' and '2000/1d' work too"""
+    limit, _, period = text.partition('/')
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if period[-1:] in units:
+        seconds = float(period[:-1] or 1) * units[period[-1]]
+    else:
+        seconds = _duration(period or '1')
+    return Quota(float(limit), seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Gmail/Graph/Sheets and SMTP stand-ins for load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--api-port', type=int, default=8080)
+    parser.add_argument('--smtp-port', type=int, default=2525)
+    parser.add_argument('--latency', action='append', default=[], metavar='[SERVICE=]SPEC',
+                        help="per HTTP request, e.g. 50ms, uniform:20ms:80ms, lognormal:40ms:0.5, exp:30ms; "
+                             "SERVICE is gmail, graph, sheets or oauth (default: all of them)")
+    parser.add_argument('--smtp-latency', default='0', metavar='SPEC', help='per SMTP message, at the end of DATA')
+    parser.add_argument('--handshake', default='0', metavar='SPEC', help='per new connection, both servers')
+    parser.add_argument('--errors', action='append', default=[], metavar='SERVICE=STATUS:RATE,...',
+                        help='e.g. gmail=429:0.01,503:0.002 or smtp=421:0.01,451:0.005')
+    parser.add_argument('--quota', action='append', default=[], metavar='SERVICE[.BUCKET]=LIMIT/PERIOD',
+                        help='token bucket, e.g. gmail=250/1 (units), graph=10000/10m, sheets.write=60/1m, '
+                             'smtp=2000/1d (messages)')
+    parser.add_argument('--concurrency', action='append', default=[], metavar='SERVICE=N',
+                        help='requests in flight at once before 429s, e.g. graph=4')
+    parser.add_argument('--realistic', action='store_true',
+                        help='start from the published Gmail, Graph and Sheets limits (realistic_rules)')
+    parser.add_argument('--retry-after', type=float, default=1, help='what injected Graph 429/503s say to wait')
+    parser.add_argument('--messages-per-connection', type=int, default=0, help='SMTP 421 after N (0 = no limit)')
+    parser.add_argument('--drop-after-data', type=float, default=0.0,
+                        help='rate of SMTP messages queued and then answered by closing the connection')
+    parser.add_argument('--token-lifetime', type=int, default=3600)
+    parser.add_argument('--seed', type=int, default=None, help='for reproducible latency and error draws')
+    parser.add_argument('--stats-every', type=float, default=0, help='seconds between stats lines (0 = on exit)')
+    args = parser.parse_args()
+
+    rules = realistic_rules(args.seed) if args.realistic else {}
+
+    def service_rules(service):
+        return rules.setdefault(service, Rules(seed=args.seed))
+
+    latency = 0.0
+    for service, spec in map(_assignment, args.latency):
+        if service:
+            service_rules(service).latency = Latency.parse(spec, args.seed)
+        else:
+            latency = Latency.parse(spec, args.seed)
+    smtp_errors = {}
+    for service, text in map(_assignment, args.errors):
+        if service == 'smtp':
+            smtp_errors.update(_rates(text))
+        else:
+            service_rules(service).errors.update(_rates(text))
+    smtp_quota = None
+    for key, text in map(_assignment, args.quota):
+        service, _, bucket = key.partition('.')
+        if service == 'smtp':
+            smtp_quota = _quota(text)
+            continue
+        for name in (bucket,) if bucket else QUOTA_BUCKETS[service]:
+            service_rules(service).quotas[name] = _quota(text)
+    for service, limit in map(_assignment, args.concurrency):
+        service_rules(service).concurrency = int(limit)
+    for service_rule in rules.values():
+        service_rule.retry_after = args.retry_after
+
+    handshake = Latency.parse(args.handshake, args.seed)
+    api = StandinAPIServer(args.host, args.api_port, latency=latency, token_lifetime=args.token_lifetime,
+                           handshake_delay=handshake, rules=rules)
+    smtp = StandinSMTPServer(args.host, args.smtp_port, handshake, Latency.parse(args.smtp_latency, args.seed),
+                             args.messages_per_connection, errors=smtp_errors, quota=smtp_quota,
+                             drop_after_data=args.drop_after_data, seed=args.seed)
+    with api, smtp:
+        print(f"🌐 API stand-in on {api.url} (latency {latency!r})")
+        print("   point Gmail's rootUrl, Graph's base_url, gspread's StandinSession and token_uri (+ /token) here")
+        for service, service_rule in sorted(rules.items()):
+            print(f"   {service}: {service_rule!r}")
+        print(f"📮 SMTP stand-in on {args.host}:{smtp.port} (errors {smtp_errors}, quota {smtp_quota!r})")
+        try:
+            while True:
+                time.sleep(args.stats_every or 3600)
+                if args.stats_every:
+                    print(f"📊 api {api.stats}\n   smtp {smtp.stats}")
+        except KeyboardInterrupt:
+            pass
+        print(f"\n📊 api {api.stats}\n   smtp {smtp.stats}")
+
+
+if __name__ == '__main__':
+    main()
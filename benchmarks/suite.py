@@ -0,0 +1,402 @@
+"""
+Benchmark suite: rendering, MIME building, scheduler ticks and dispatch at 1k / 100k / 1M jobs.
+
+Every scenario runs the production code paths on generated jobs:
+
+  render           body for a scheduled job (simple_app.build_body)
+  mime_text        SMTP-ready message in the writer's buffer (simple_app.send_email)
+  mime_attachment  RFC 822 bytes with the cached 200 KB PDF part (create_draft in app2/app3)
+  scheduler_tick   one check_and_send tick without the sends: lease up to
+                   DUE_BATCH_SIZE due jobs from the job store, mark them sent, flush
+  smtp_dispatch    scheduler.dispatch over an SMTPPool against the local SMTP stand-in
+  gmail_dispatch   gmail_api.send_message (media upload) against the Gmail stand-in
+  graph_dispatch   graph_api.create_drafts, 20 drafts per $batch, against the Graph stand-in
+
+Latencies are per operation ("unit" in the results): one body, message,
+tick, send or $batch request. Rendering takes about a microsecond, so it
+is timed in groups of up to RENDER_GROUP and each group's mean is one
+sample; groups shrink at small scales so there are still MIN_SAMPLES.
+The dispatch scenarios send min(jobs, --max-sends) messages (0 = all):
+a million round trips through a Python stand-in would take hours and
+measure the stand-in more than the client. Their throughput and latency
+don't depend on how many more jobs are queued behind them. Each scenario
+warms up (connections, caches, buffers) with a few untimed operations.
+
+Results are JSON with mean/p50/p95/p99/max latency in microseconds and
+throughput in operations (jobs, not requests) per second. With fewer than
+MIN_SAMPLES samples (a 1k scheduler_tick is two ticks) the percentiles
+would all be the same few values, so they are left out (null) and only
+the mean is reported. `compare` flags every metric that got worse than
+the baseline by more than --threshold, and exits 1 if any did, so it can
+gate CI; metrics missing on either side are not compared.
+
+    python -m benchmarks.suite run --scale 1k --output baseline.json
+    python -m benchmarks.suite run --scale 1k --output new.json --baseline baseline.json
+    python -m benchmarks.suite compare baseline.json new.json --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+
+import gmail_api
+import graph_api
+import mime_builder
+from benchmarks.standins import StandinAPIServer, StandinSMTPServer
+from job_store import IndexedJobStore, JobStore
+from jobs import Job, TextTable
+from scheduler import HeapQueue, TimingWheel, dispatch
+from smtp_pool import SMTPPool
+from templates import registry
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+FROM = 'me@example.com'
+SUBJECT = 'Interested in ML Roles - USC Grad'
+INTRO = "I've been following Company{}'s work in AI-driven utilization review, and my background aligns closely."
+INTROS = 500  # distinct company intros, shared across jobs the way campaigns share them
+ATTACHMENT_KB = 200
+DUE_BATCH_SIZE = 500  # simple_app's default claim size per tick
+POOL_SIZE = 8  # simple_app's SMTP_POOL_SIZE / MAX_WORKERS
+RENDER_GROUP = 100
+MIN_SAMPLES = 100  # fewer than this and p95/p99 are just the slowest one or two samples
+WARMUP = 20
+
+# Metric -> whether a bigger number is better
+METRICS = {'throughput': True, 'mean_us': False, 'p50_us': False, 'p95_us': False, 'p99_us': False}
+
+
+# ---------------- MEASUREMENT ---------------- #
+
+def _summary(unit, ops, seconds, samples):
+    """Result entry from per-operation latencies (seconds); percentiles need MIN_SAMPLES of them"""
+    samples = sorted(samples)
+
+    def percentile(q):
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6, 1)
+
+    return {
+        'unit': unit,
+        'ops': ops,
+        'seconds': round(seconds, 3),
+        'throughput': round(ops / seconds, 1) if seconds else None,
+        'samples': len(samples),
+        'mean_us': round(sum(samples) / len(samples) * 1e6, 1) if samples else None,
+        'p50_us': percentile(0.50),
+        'p95_us': percentile(0.95),
+        'p99_us': percentile(0.99),
+        'max_us': round(samples[-1] * 1e6, 1) if samples else None,
+    }
+
+
+def _timed(unit, operation, count, group=1):
+    """Run operation(i) for i in range(count), timing groups of up to `group` calls"""
+    group = max(1, min(group, count // MIN_SAMPLES))
+    for i in range(min(WARMUP, count)):
+        operation(i)
+    clock = time.perf_counter
+    samples = []
+    start = clock()
+    for first in range(0, count, group):
+        began = clock()
+        for i in range(first, min(first + group, count)):
+            operation(i)
+        samples.append((clock() - began) / (min(first + group, count) - first))
+    return _summary(unit, count, clock() - start, samples)
+
+
+# ---------------- JOBS ---------------- #
+
+class Workload:
+    """Generated jobs and the texts they refer to"""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.texts = TextTable()
+        self.intro_ids = [self.texts.intern(INTRO.format(i)) for i in range(INTROS)]
+        self.template_id = self.texts.intern('standard')
+        self.body = registry['text/intro_email'].bind(experience=registry.render('text/standard'))
+        self.attachment = os.urandom(ATTACHMENT_KB * 1024)
+
+    def job(self, i, due=0):
+        return Job(i + 1, due, f'user{i}@example.com', SUBJECT, f'User{i}',
+                   self.intro_ids[i % INTROS], self.template_id)
+
+    def render(self, job):
+        return self.body.render(recipient_name=job.recipient_name, company_intro=self.texts[job.intro_id])
+
+
+# ---------------- SCENARIOS ---------------- #
+
+def render(workload, args):
+    jobs = [workload.job(i) for i in range(min(workload.jobs, 10_000))]
+    return _timed('body', lambda i: workload.render(jobs[i % len(jobs)]), workload.jobs, RENDER_GROUP)
+
+
+def mime_text(workload, args):
+    bodies = [workload.render(workload.job(i)) for i in range(INTROS)]
+    writer = mime_builder.writer(smtp=True)
+
+    def build(i):
+        headers = {'From': FROM, 'To': f'user{i}@example.com', 'Subject': SUBJECT}
+        with writer.write(headers, bodies[i % INTROS], mixed=True):
+            pass
+
+    return _timed('message', build, workload.jobs)
+
+
+def mime_attachment(workload, args):
+    bodies = [f'<p>Hi User{i},</p>\n<p>{INTRO.format(i)}</p>' for i in range(INTROS)]
+
+    def build(i):
+        part = mime_builder.attachment_mime(workload.attachment, 'resume.pdf')
+        mime_builder.build_message({'to': f'user{i}@example.com', 'subject': SUBJECT}, bodies[i % INTROS],
+                                   'html', part, mixed=True, alternative=True)
+
+    return _timed('message', build, workload.jobs)
+
+
+def scheduler_tick(workload, args):
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, 'jobs.db'), batch_size=DUE_BATCH_SIZE)
+        # The store hands out its own text ids
+        ids = {text_id: store.texts.intern(workload.texts[text_id]) for text_id in range(1, len(workload.texts) + 1)}
+        if args.queue_backend != 'sqlite':
+            store = IndexedJobStore(store, HeapQueue if args.queue_backend == 'heap' else TimingWheel)
+
+        def job(i):
+            job = workload.job(i, int(now) - 3600 + i % 3600)  # all due, over the past hour
+            job.intro_id, job.template_id = ids[job.intro_id], ids[job.template_id]
+            return job
+
+        now = time.time()
+        for first in range(0, workload.jobs, 50_000):
+            store.add_many([job(i) for i in range(first, min(first + 50_000, workload.jobs))])
+
+        samples, ticked = [], 0
+        start = time.perf_counter()
+        while ticked < workload.jobs:
+            began = time.perf_counter()
+            due = store.pop_due(now, DUE_BATCH_SIZE)
+            for job in due:
+                store.mark_sent(job.id)
+            store.flush()
+            samples.append(time.perf_counter() - began)
+            if not due:
+                break
+            ticked += len(due)
+        result = _summary('tick', ticked, time.perf_counter() - start, samples)
+        result['jobs_per_tick'] = DUE_BATCH_SIZE
+        store.close()
+    return result
+
+
+def _dispatch(workload, args, send, unit='send'):
+    """Dispatch the first --max-sends jobs with send(job) on POOL_SIZE threads"""
+    count = workload.jobs if not args.max_sends else min(workload.jobs, args.max_sends)
+    jobs = [workload.job(i) for i in range(count)]
+    for job in jobs[:WARMUP]:
+        send(job)
+    samples = []
+
+    def timed_send(job):
+        began = time.perf_counter()
+        result = send(job)
+        samples.append(time.perf_counter() - began)  # list.append is atomic
+        return result
+
+    start = time.perf_counter()
+    report = dispatch(jobs, timed_send, due_of=lambda job: job.due, max_workers=POOL_SIZE)
+    result = _summary(unit, count, time.perf_counter() - start, samples)
+    result['failed'] = report.failed
+    return result
+
+
+def smtp_dispatch(workload, args):
+    with StandinSMTPServer(send_delay=args.latency_ms / 1000) as server:
+        pool = SMTPPool('127.0.0.1', server.port, FROM, 'secret', size=POOL_SIZE, use_tls=False)
+
+        def send(job):
+            headers = {'From': FROM, 'To': job.to, 'Subject': job.subject}
+            with mime_builder.writer(smtp=True).write(headers, workload.render(job), mixed=True) as data:
+                pool.send_data(FROM, job.to, data)
+            return True, 'sent'
+
+        try:
+            return _dispatch(workload, args, send)
+        finally:
+            pool.close()
+
+
+def gmail_dispatch(workload, args):
+    budgeter = gmail_api.QuotaBudgeter(10 ** 9)  # exercised, but never what limits the run
+    local = threading.local()
+    with StandinAPIServer(latency=args.latency_ms / 1000) as api:
+        # rootUrl too: googleapiclient keeps the discovery document's https scheme for upload URLs
+        document = {**gmail_api.load_discovery(), 'rootUrl': api.url + '/'}
+
+        def send(job):
+            if not hasattr(local, 'service'):
+                local.service = build_from_document(document, credentials=Credentials('token'))
+            message = mime_builder.build_message({'to': job.to, 'subject': job.subject}, workload.render(job))
+            return True, gmail_api.send_message(local.service, message, budgeter=budgeter)['id']
+
+        return _dispatch(workload, args, send)
+
+
+def graph_dispatch(workload, args):
+    count = workload.jobs if not args.max_sends else min(workload.jobs, args.max_sends)
+    with StandinAPIServer(latency=args.latency_ms / 1000) as api:
+        def create(i):
+            messages = [(j, graph_api.draft_message(f'user{j}@example.com', SUBJECT, workload.render(workload.job(j))))
+                        for j in range(i * graph_api.BATCH_LIMIT, min((i + 1) * graph_api.BATCH_LIMIT, count))]
+            created, errors = graph_api.create_drafts('token', messages, base_url=api.url)
+            if errors:
+                raise next(iter(errors.values()))
+
+        batches = -(-count // graph_api.BATCH_LIMIT)
+        result = _timed('$batch', create, batches)
+    # Throughput in drafts, like the other dispatch scenarios count messages
+    result['ops'] = count
+    result['throughput'] = round(count / result['seconds'], 1) if result['seconds'] else None
+    result['batches'] = batches
+    return result
+
+
+SCENARIOS = {
+    'render': render,
+    'mime_text': mime_text,
+    'mime_attachment': mime_attachment,
+    'scheduler_tick': scheduler_tick,
+    'smtp_dispatch': smtp_dispatch,
+    'gmail_dispatch': gmail_dispatch,
+    'graph_dispatch': graph_dispatch,
+}
+
+
+def run(scale='1k', scenarios=tuple(SCENARIOS), args=None):
+    args = args or argparse.Namespace(max_sends=20_000, latency_ms=0.0, queue_backend='sqlite')
+    workload = Workload(SCALES[scale.lower()])
+    results = {
+        'meta': {
+            'scale': scale.lower(),
+            'jobs': workload.jobs,
+            'max_sends': args.max_sends,
+            'latency_ms': args.latency_ms,
+            'queue_backend': args.queue_backend,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'scenarios': {},
+    }
+    for name in scenarios:
+        print(f"⏱️  {name} ({workload.jobs:,} jobs)...", file=sys.stderr, flush=True)
+        results['scenarios'][name] = SCENARIOS[name](workload, args)
+    return results
+
+
+# ---------------- COMPARE ---------------- #
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Changes per scenario and metric; returns (rows, regressions), where a
+    row is (scenario, metric, baseline, current, relative change, verdict)
+    """
+    rows, regressions = [], 0
+    for name, new in current['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            verdict = 'REGRESSION' if worse > threshold else 'improved' if worse < -threshold else 'ok'
+            regressions += verdict == 'REGRESSION'
+            rows.append((name, metric, before, after, change, verdict))
+    return rows, regressions
+
+
+def print_results(results):
+    meta = results['meta']
+    print(f"{meta['jobs']:,} jobs, Python {meta['python']}, {meta['cpus']} CPU(s)")
+    for name, r in results['scenarios'].items():
+        if r.get('p50_us') is None:
+            latency = (f"mean {r.get('mean_us') or 0:10,.1f} us  "
+                       f"({r.get('samples', 0)} samples, too few for percentiles)")
+        else:
+            latency = f"p50 {r['p50_us']:10,.1f} us  p95 {r['p95_us']:10,.1f} us  p99 {r['p99_us']:10,.1f} us"
+        print(f"{name:16s} {r['throughput'] or 0:12,.1f} ops/s  {latency}  ({r['ops']:,} ops; latency per {r['unit']})")
+
+
+def print_comparison(baseline, current, threshold):
+    settings = ('jobs', 'max_sends', 'latency_ms', 'queue_backend', 'cpus')
+    for key in settings:
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"⚠️  {key} differs: baseline {baseline['meta'].get(key)}, this run {current['meta'].get(key)}")
+    rows, regressions = compare(baseline, current, threshold)
+    for name, metric, before, after, change, verdict in rows:
+        if verdict != 'ok':
+            print(f"{'❌' if verdict == 'REGRESSION' else '✅'} {name:16s} {metric:10s} "
+                  f"{before:12,.1f} -> {after:12,.1f} ({change:+.1%})")
+    print(f"{regressions} regression(s) beyond {threshold:.0%} across {len(rows)} metrics")
+    return regressions
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the scenarios and write JSON results')
+    run_parser.add_argument('--scale', default='1k', type=str.lower, choices=SCALES)
+    run_parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=SCENARIOS)
+    run_parser.add_argument('--max-sends', type=int, default=20_000, help='messages per dispatch scenario (0 = all jobs)')
+    run_parser.add_argument('--latency-ms', type=float, default=0.0, help='stand-in time per SMTP message / HTTP request')
+    run_parser.add_argument('--queue-backend', default='sqlite', choices=('sqlite', 'heap', 'wheel'),
+                            help="simple_app's QUEUE_BACKEND for the scheduler tick")
+    run_parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+    run_parser.add_argument('--baseline', help='saved results to compare this run against')
+    run_parser.add_argument('--threshold', type=float, default=0.1, help='relative change that counts (0.1 = 10%%)')
+
+    compare_parser = commands.add_parser('compare', help='flag regressions between two saved results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='relative change that counts (0.1 = 10%%)')
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        sys.exit(1 if print_comparison(_load(args.baseline), _load(args.current), args.threshold) else 0)
+
+    results = run(args.scale, args.scenarios, args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print_results(results)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        sys.exit(1 if print_comparison(_load(args.baseline), results, args.threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+"""
+Bulk mail-merge campaigns for the Streamlit draft apps.
+
+A campaign is an uploaded CSV with one recipient per row: email, name,
+template and intro, plus optional subject and send_time columns. Every row
+is rendered up front through the shared templates registry (one bind per
+template, then render_batch). The rows then go to the app's action
+(create drafts, schedule sends) in chunks on a small thread pool. Drafts
+go out as Gmail batch requests, one HTTP call per chunk, and the shared
+quota budgeter paces all workers together.
+
+Results live in st.session_state, so they survive reruns. The retry button
+resubmits only the rows that failed, and a row that already has its draft
+keeps it.
+"""
+
+import csv
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import gmail_api
+import templates
+import token_manager
+from recipient_loader import EMAIL_RE
+
+CHUNK_SIZE = 20  # Rows per action call (one Gmail batch request when creating drafts)
+MAX_WORKERS = 4  # Chunks in flight at once
+MAX_REPORTED_ERRORS = 20
+
+# Accepted header names per field (case and spacing are ignored)
+COLUMNS = {
+    'email': ('email', 'to', 'recipient_email'),
+    'name': ('name', 'first_name', 'recipient_name'),
+    'template': ('template', 'template_type', 'type', 'recipient_type'),
+    'intro': ('intro', 'company_intro'),
+    'subject': ('subject',),
+    'send_time': ('send_time', 'scheduled_time'),
+}
+
+RESUMES = {
+    "ML/Data Science Resume": ('ml_resume_data', 'ml_resume_name'),
+    "Software Engineering Resume": ('swe_resume_data', 'swe_resume_name'),
+}
+
+
+class Recipient:
+    """One campaign row: what to render and send, and how far it got"""
+
+    __slots__ = ('line', 'email', 'name', 'template', 'intro', 'subject', 'send_time',
+                 'body', 'draft_id', 'result', 'error', 'done')
+
+    def __init__(self, line, email, name, template, intro, subject, send_time=None):
+        self.line = line
+        self.email = email
+        self.name = name
+        self.template = template  # registry name of the experience section
+        self.intro = intro
+        self.subject = subject
+        self.send_time = send_time
+        self.body = None
+        self.draft_id = None
+        self.result = ''
+        self.error = None
+        self.done = False
+
+    def draft(self, attachment=None):
+        """Arguments for the apps' create_drafts"""
+        data, filename = attachment or (None, None)
+        return {'to': self.email, 'subject': self.subject, 'body': self.body,
+                'attachment_data': data, 'attachment_filename': filename}
+
+
+# ---------------- CSV ---------------- #
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def parse_csv(data, sections, default_subject=''):
+    """
+    Recipients from CSV bytes. `sections` maps the app's template labels to
+    registry names; a row's template may be the label or the section name
+    ("ML Systems", "ml_systems"), and defaults to the first one.
+
+    Returns (recipients, errors) where errors are (line, message) pairs.
+    """
+    lookup = {}
+    for label, name in sections.items():
+        lookup[_slug(label)] = name
+        lookup[_slug(name.rsplit('/', 1)[-1])] = name
+    default_section = next(iter(sections.values()))
+
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig')))
+    fields = {_slug(header): header for header in reader.fieldnames or ()}
+    columns = {
+        field: next((fields[alias] for alias in aliases if alias in fields), None)
+        for field, aliases in COLUMNS.items()
+    }
+    missing = [field for field in ('email', 'name', 'intro') if columns[field] is None]
+    if missing:
+        return [], [(1, f"missing column(s): {', '.join(missing)}")]
+
+    def value(row, field):
+        return (row.get(columns[field]) or '').strip() if columns[field] else ''
+
+    recipients, errors = [], []
+    for row in reader:
+        line = reader.line_num
+        email, name, intro = value(row, 'email'), value(row, 'name'), value(row, 'intro')
+        template = value(row, 'template')
+        send_time = value(row, 'send_time')
+        if not EMAIL_RE.match(email):
+            errors.append((line, f"invalid email {email!r}"))
+            continue
+        if not name or not intro:
+            errors.append((line, "name and intro are required"))
+            continue
+        section = lookup.get(_slug(template)) if template else default_section
+        if section is None:
+            errors.append((line, f"unknown template {template!r}"))
+            continue
+        try:
+            send_time = datetime.fromisoformat(send_time) if send_time else None
+        except ValueError:
+            errors.append((line, f"invalid send_time {send_time!r} (use YYYY-MM-DD HH:MM)"))
+            continue
+        recipients.append(Recipient(line, email, name, section, intro,
+                                    value(row, 'subject') or default_subject, send_time))
+    return recipients, errors
+
+
+# ---------------- RENDER & RUN ---------------- #
+
+def render(recipients, layout, closing=''):
+    """Fill in every recipient's body: one bind per section, then one render_batch"""
+    groups = {}
+    for recipient in recipients:
+        groups.setdefault(recipient.template, []).append(recipient)
+    base = templates.registry[layout]
+    for section, group in groups.items():
+        email = base.bind(experience=templates.registry[section], closing=closing)
+        bodies = email.render_batch([{'recipient_name': r.name, 'company_intro': r.intro} for r in group])
+        for recipient, body in zip(group, bodies):
+            recipient.body = body
+
+
+def build_closing(outro_text, has_resume, subtype='html'):
+    """Closing section after the experience: the outro, then a line about the attached resume"""
+    lines = [outro_text] if outro_text else []
+    if has_resume:
+        lines.append("I have attached my resume for your reference.")
+    if subtype == 'html':
+        return ''.join(f"\n<p>{line}</p>" for line in lines)
+    return ''.join(f"\n\n{line}" for line in lines)
+
+
+def draft_rows(create_drafts, service, rows, attachment=None):
+    """Create drafts for rows that have none yet; returns the rows that now have one"""
+    todo = [row for row in rows if row.draft_id is None]
+    if todo:
+        for row, (_, draft_id, error) in zip(todo, create_drafts(service, [row.draft(attachment) for row in todo])):
+            row.draft_id = draft_id
+            if error is not None:
+                row.error = str(error)
+    drafted = [row for row in rows if row.draft_id is not None]
+    for row in drafted:
+        row.result = f"draft {row.draft_id}"
+    return drafted
+
+
+def drafts_action(create_drafts, attachment=None):
+    """Action that finishes a row once its draft exists"""
+    def action(service, rows):
+        for row in draft_rows(create_drafts, service, rows, attachment):
+            row.done = True
+    return action
+
+
+def run(recipients, action, get_service, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS, on_progress=None):
+    """
+    Call action(service, chunk) for every chunk of unfinished recipients on
+    a thread pool. The action sets `done` (or `error`) per row; an exception
+    fails the whole chunk. on_progress(finished, total) runs in this thread
+    after each chunk. Returns (succeeded, failed) for this run.
+    """
+    pending = [r for r in recipients if not r.done]
+    for recipient in pending:
+        recipient.error = None
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    def work(chunk):
+        action(get_service(), chunk)
+
+    finished = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='campaign') as pool:
+        futures = {pool.submit(work, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                for recipient in chunk:
+                    recipient.error = recipient.error or str(e)
+            for recipient in chunk:
+                if not recipient.done and recipient.error is None:
+                    recipient.error = "not processed"
+            finished += len(chunk)
+            if on_progress:
+                on_progress(finished, len(pending))
+    succeeded = sum(r.done for r in pending)
+    return succeeded, len(pending) - succeeded
+
+
+# ---------------- STREAMLIT UI ---------------- #
+
+def session_credentials(session_state, scopes=gmail_api.SCOPES):
+    """The apps' Gmail credentials from session_state.token_data, or None before sign-in"""
+    if 'token_data' not in session_state:
+        return None
+
+    # Shared per account: refreshed in the background before it expires
+    creds = token_manager.for_info(session_state.token_data, scopes).get()
+    if creds.token != session_state.token_data.get('token'):
+        session_state.token_data = json.loads(creds.to_json())
+    return creds
+
+
+def campaign_ui(sections, layout, closing, actions, get_credentials, default_subject='',
+                scheduled=(), html=True, key='campaign', connect=gmail_api.get_service, resumes=RESUMES):
+    """
+    Campaign tab of a draft app.
+
+    closing(outro_text, has_resume) builds the app's closing section (None
+    for layouts without one). actions maps button labels to factories
+    called in the script thread as factory(attachment, send_time) ->
+    action(service, rows) (a ValueError is shown as the reason the run
+    could not start); labels in `scheduled` ask for a default send time.
+    html=False previews plain-text bodies. get_credentials() returns the
+    credentials, and connect(credentials) the service a worker thread
+    passes to the action (a Gmail service by default). `resumes` are the
+    attachable resume labels; empty hides the choice.
+    """
+    import streamlit as st  # only the UI needs Streamlit; the rest runs in benchmarks too
+
+    st.subheader("📋 Campaign from CSV")
+    labels = ', '.join(f"`{label}`" for label in sections)
+    st.caption(f"Columns: email, name, template, intro (optional: subject, send_time as YYYY-MM-DD HH:MM). "
+               f"Templates: {labels}")
+
+    upload = st.file_uploader("Recipients CSV", type=['csv'], key=f'{key}_csv')
+    subject = st.text_input("Subject (rows without one)", value=default_subject, key=f'{key}_subject')
+
+    outro_text = ""
+    if closing is not None and st.checkbox("Include closing paragraph", key=f'{key}_outro'):
+        outro_text = st.text_area(
+            "Closing Paragraph",
+            height=100,
+            value="Would love to briefly discuss how my background could support your team.",
+            key=f'{key}_outro_text'
+        )
+
+    attachment = None
+    resume_type = None
+    if resumes:
+        resume_type = st.radio("Attach resume", ["No resume", *resumes], horizontal=True, key=f'{key}_resume')
+    if resume_type in resumes:
+        data_key, name_key = resumes[resume_type]
+        if data_key in st.session_state:
+            attachment = (st.session_state[data_key], st.session_state[name_key])
+            st.success(f"✓ Will attach: {attachment[1]}")
+        else:
+            st.warning("⚠️ Upload this resume in the sidebar")
+
+    label = st.radio("Action", list(actions), horizontal=True, key=f'{key}_action')
+    send_time = None
+    if label in scheduled:
+        send_time = st.datetime_input("Send Date & Time (rows without send_time)", value=datetime.now(),
+                                      min_value=datetime.now(), key=f'{key}_send_time')
+
+    if upload is not None:
+        recipients, errors = parse_csv(upload.getvalue(), sections, subject)
+        render(recipients, layout, closing(outro_text, attachment is not None) if closing else '')
+        st.info(f"👥 {len(recipients)} recipients ready" + (f", {len(errors)} rows skipped" if errors else ""))
+        if errors:
+            with st.expander(f"⚠️ {len(errors)} rows skipped"):
+                for line, message in errors[:MAX_REPORTED_ERRORS]:
+                    st.markdown(f"- line {line}: {message}")
+        if recipients:
+            with st.expander("Preview first email"):
+                first = recipients[0]
+                st.markdown(f"**To:** {first.email}<br>**Subject:** {first.subject}<br><br>", unsafe_allow_html=True)
+                if html:
+                    st.markdown(first.body, unsafe_allow_html=True)
+                else:
+                    st.text(first.body)
+
+            if resume_type in resumes and attachment is None:
+                st.error("❌ Upload the selected resume type or choose No resume")
+            elif st.button(f"🚀 {label} for {len(recipients)} recipients", type="primary",
+                           use_container_width=True, key=f'{key}_run'):
+                st.session_state[key] = {'recipients': recipients, 'label': label,
+                                         'attachment': attachment, 'send_time': send_time}
+                _run(st, st.session_state[key], actions, get_credentials, connect)
+
+    state = st.session_state.get(key)
+    if state:
+        _show_results(st, state, actions, get_credentials, connect, key)
+
+
+def _run(st, state, actions, get_credentials, connect):
+    credentials = get_credentials()
+    if credentials is None:
+        st.error("❌ Not authenticated")
+        return
+    try:
+        action = actions[state['label']](state['attachment'], state['send_time'])
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    recipients = state['recipients']
+
+    progress = st.progress(0.0, text="Starting...")
+    counts = st.empty()
+
+    def on_progress(finished, total):
+        succeeded = sum(r.done for r in recipients)
+        failed = sum(r.error is not None for r in recipients)
+        progress.progress(finished / total, text=f"{finished}/{total} processed")
+        counts.markdown(f"✅ {succeeded} succeeded · ❌ {failed} failed")
+
+    run(recipients, action, lambda: connect(credentials), on_progress=on_progress)
+
+
+def _show_results(st, state, actions, get_credentials, connect, key):
+    recipients = state['recipients']
+    failed = [r for r in recipients if not r.done]
+    st.markdown("---")
+    st.markdown(f"**Last run — {state['label']}:** ✅ {len(recipients) - len(failed)} succeeded · "
+                f"❌ {len(failed)} failed")
+    if failed:
+        st.dataframe(
+            [{'line': r.line, 'email': r.email, 'name': r.name, 'error': r.error} for r in failed],
+            use_container_width=True
+        )
+        if st.button(f"🔁 Retry {len(failed)} failed", key=f'{key}_retry'):
+            _run(st, state, actions, get_credentials, connect)
+            st.rerun()
+    with st.expander("All results"):
+        st.dataframe(
+            [{'line': r.line, 'email': r.email, 'name': r.name, 'result': r.result or r.error} for r in recipients],
+            use_container_width=True
+        )
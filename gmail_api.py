@@ -0,0 +1,454 @@
+"""
+Shared Gmail API helpers used by the Streamlit apps and scripts.
+
+Quota budgeting
+---------------
+Gmail meters each user in quota units (250 units/second, moving average)
+and every method has a unit cost. Firing calls unpaced under bulk load
+just trades throughput for 429 rateLimitExceeded / userRateLimitExceeded
+errors, so every Gmail call goes through a token bucket of quota units
+that runs at the maximum sustainable rate instead.
+
+Batch requests
+--------------
+Bulk draft creation sends up to BATCH_SIZE calls in one batch HTTP
+request instead of one HTTPS round trip each. Every call in a batch
+still costs its own quota units, and only the calls that failed are
+retried.
+
+Media upload
+------------
+A `raw` message is the RFC 822 text base64url-encoded into a JSON
+string: a third larger on the wire, and several full copies in memory on
+the way there. create_draft() and send_message() upload the RFC 822
+bytes as message/rfc822 media instead. Messages from RESUMABLE_THRESHOLD
+up use a resumable upload in UPLOAD_CHUNK pieces, and a failed chunk is
+resent without starting over. Batch requests can't carry media, so
+execute_batch() callers keep using `raw`.
+
+Composing
+---------
+compose_message(), compose_draft() and compose_drafts() are the draft
+apps' shared helpers: one message layout (multipart/mixed, with HTML
+bodies in a multipart/alternative) written by mime_builder, uploaded as
+media for a single draft and as `raw` inside batches.
+
+Service cache
+-------------
+googleapiclient.discovery.build() parses the full Gmail discovery document
+on every call, and the apps called it on every rerun and every send.
+get_service() builds from a trimmed copy bundled with the repo
+(gmail_discovery.json, only the methods we call). The copy is parsed once
+per process, and each thread keeps one built service per account.
+Regenerate the copy with `python gmail_api.py` after upgrading
+google-api-python-client or calling a new method.
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, MediaIoBaseUpload
+
+import mime_builder
+
+SCOPES = [
+    'https://www.googleapis.com/auth/gmail.compose',
+    'https://www.googleapis.com/auth/gmail.send',
+]
+
+# https://developers.google.com/gmail/api/reference/quota
+USER_UNITS_PER_SECOND = 250
+QUOTA_UNITS = {
+    'messages.send': 100,
+    'drafts.create': 10,
+    'drafts.send': 100,
+}
+
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+BATCH_LIMIT = 100  # Gmail refuses batches with more calls than this
+BATCH_SIZE = 50  # Google's advice: larger batches are likely to trigger rate limiting
+
+MESSAGE_MIMETYPE = 'message/rfc822'
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024  # Messages this large upload in resumable chunks
+UPLOAD_CHUNK = 4 * 1024 * 1024  # Resumable chunk size, a multiple of 256 KiB
+UPLOAD_RETRIES = 4  # Resumes after a failed resumable chunk
+
+
+# ---------------- QUOTA BUDGETER ---------------- #
+
+class QuotaBudgeter:
+    """Token bucket of Gmail quota units, shared by every caller in the process"""
+
+    def __init__(self, units_per_second=USER_UNITS_PER_SECOND, burst=None):
+        self.rate = units_per_second
+        self.capacity = burst or units_per_second
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.metrics = {
+            'calls': 0,
+            'units': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'rate_limited': 0,
+        }
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, method, count=1):
+        """Take the units for `count` calls and return how long to wait before making them"""
+        units = QUOTA_UNITS[method] * count
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Going negative keeps callers in FIFO order: each one waits for its own deficit
+            self._tokens -= units
+            wait = max(0.0, -self._tokens / self.rate)
+            metrics = self.metrics
+            metrics['calls'] += count
+            metrics['units'] += units
+            if wait > 0:
+                metrics['waits'] += 1
+                metrics['wait_seconds'] += wait
+                metrics['max_wait_seconds'] = max(metrics['max_wait_seconds'], wait)
+        return wait
+
+    def acquire(self, method, count=1):
+        wait = self.reserve(method, count)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, method, count=1):
+        wait = self.reserve(method, count)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds=1.0):
+        """Back off after Gmail said we were too fast: empty the bucket for `seconds`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -self.rate * seconds)
+            self.metrics['rate_limited'] += 1
+
+    def budget(self):
+        """Quota units available right now (negative = callers are queued)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def snapshot(self):
+        metrics = dict(self.metrics)
+        metrics['available_units'] = self.budget()
+        metrics['capacity'] = self.capacity
+        metrics['avg_wait_seconds'] = metrics['wait_seconds'] / metrics['calls'] if metrics['calls'] else 0.0
+        return metrics
+
+    def describe(self):
+        """One-line summary for the UIs"""
+        s = self.snapshot()
+        return (f"Gmail quota: {max(0, s['available_units']):.0f}/{s['capacity']} units free · "
+                f"{s['calls']} calls · waited {s['wait_seconds']:.1f}s · {s['rate_limited']} rate-limited")
+
+
+_budgeters = {}
+_budgeters_lock = threading.Lock()
+
+
+def get_budgeter(account='me'):
+    """Process-wide budgeter for one Gmail account (quota is per user)"""
+    with _budgeters_lock:
+        if account not in _budgeters:
+            _budgeters[account] = QuotaBudgeter()
+        return _budgeters[account]
+
+
+def is_rate_limited(error):
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status == 429 or (status == 403 and any(r.encode() in (error.content or b'') for r in RATE_LIMIT_REASONS))
+
+
+def is_retryable(error):
+    return is_rate_limited(error) or (isinstance(error, HttpError) and error.resp.status in SERVER_ERROR_STATUSES)
+
+
+def _retry_delay(errors, attempt):
+    retry_after = max(float(e.resp.get('retry-after') or 0) for e in errors)
+    return max(retry_after, (2 ** attempt) * (0.5 + random.random() / 2))
+
+
+def execute(request, method, budgeter=None, max_retries=4):
+    """
+    Execute a googleapiclient request after paying its quota units.
+
+    Rate-limit errors drain the bucket and are retried with jittered
+    backoff; anything else is raised to the caller unchanged. Resumable
+    uploads go through _upload(), so a retry carries on where it stopped.
+    """
+    budgeter = budgeter or get_budgeter()
+    for attempt in range(max_retries + 1):
+        budgeter.acquire(method)
+        try:
+            return _upload(request) if request.resumable else request.execute()
+        except HttpError as e:
+            if attempt == max_retries or not is_rate_limited(e):
+                raise
+            budgeter.penalize(_retry_delay([e], attempt))
+
+
+# ---------------- BATCH REQUESTS ---------------- #
+
+def _execute_chunk(service, chunk, method, budgeter, batch_uri, results, errors):
+    keys = {}
+
+    def callback(request_id, response, exception):
+        key = keys[request_id]
+        if exception is None:
+            results[key] = response
+            errors.pop(key, None)
+        else:
+            errors[key] = exception
+
+    if batch_uri:
+        batch = BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+    else:
+        batch = service.new_batch_http_request(callback=callback)
+    for i, (key, request) in enumerate(chunk):
+        keys[str(i)] = key
+        batch.add(request, request_id=str(i))
+
+    budgeter.acquire(method, len(chunk))
+    try:
+        batch.execute()
+    except HttpError as e:
+        # The batch as a whole was refused, so none of its calls ran
+        if not is_retryable(e):
+            raise
+        for key, _ in chunk:
+            errors[key] = e
+
+
+def execute_batch(service, requests, method, budgeter=None, batch_size=BATCH_SIZE,
+                  max_retries=4, batch_uri=None):
+    """
+    Execute many googleapiclient requests of one `method` as Gmail batch requests.
+
+    `requests` is an iterable of (key, request) pairs and is consumed one
+    batch at a time. Returns ({key: response}, {key: HttpError}). Calls that
+    were rate limited or hit a server error are retried in later batches
+    with backoff; calls that succeeded are never sent again. `batch_uri`
+    overrides the batch endpoint, which the client does not derive from
+    client_options.
+    """
+    budgeter = budgeter or get_budgeter()
+    batch_size = min(batch_size, BATCH_LIMIT)
+    results, errors = {}, {}
+    pending = iter(requests)
+    for attempt in range(max_retries + 1):
+        retry = []
+        while True:
+            chunk = list(itertools.islice(pending, batch_size))
+            if not chunk:
+                break
+            _execute_chunk(service, chunk, method, budgeter, batch_uri, results, errors)
+            retry.extend((key, request) for key, request in chunk
+                         if key in errors and is_retryable(errors[key]))
+        if not retry or attempt == max_retries:
+            break
+        failed = [errors[key] for key, _ in retry]
+        delay = _retry_delay(failed, attempt)
+        if any(is_rate_limited(e) for e in failed):
+            budgeter.penalize(delay)
+        else:
+            time.sleep(delay)
+        pending = iter(retry)
+    return results, errors
+
+
+# ---------------- MEDIA UPLOAD ---------------- #
+
+def message_media(data, resumable=None):
+    """Upload media for RFC 822 bytes; resumable from RESUMABLE_THRESHOLD up unless told otherwise"""
+    if resumable is None:
+        resumable = len(data) >= RESUMABLE_THRESHOLD
+    return MediaIoBaseUpload(io.BytesIO(data), mimetype=MESSAGE_MIMETYPE, chunksize=UPLOAD_CHUNK,
+                             resumable=resumable)
+
+
+def _upload(request, max_retries=UPLOAD_RETRIES):
+    """
+    Send a resumable upload chunk by chunk. After a server or connection
+    error, next_chunk() first asks Gmail how much it has, so the upload
+    resumes from there. (googleapiclient's own num_retries resends a chunk
+    from a stream it has already read, which can't work.) Rate limits are
+    left to execute().
+    """
+    failures = 0
+    while True:
+        try:
+            _, response = request.next_chunk()
+        except HttpError as e:
+            if is_rate_limited(e) or not is_retryable(e) or failures == max_retries:
+                raise
+            error = e
+        except OSError:
+            if failures == max_retries:
+                raise
+            error = None
+        else:
+            if response is not None:
+                return response
+            failures = 0
+            continue
+        failures += 1
+        time.sleep(_retry_delay([error], failures - 1) if error else 2 ** failures)
+
+
+def create_draft(service, data, budgeter=None):
+    """drafts.create with the RFC 822 bytes uploaded as media; returns the draft"""
+    request = service.users().drafts().create(userId='me', media_body=message_media(data))
+    return execute(request, 'drafts.create', budgeter=budgeter)
+
+
+def send_message(service, data, metadata=None, budgeter=None):
+    """messages.send with the RFC 822 bytes uploaded as media; metadata (threadId...) goes alongside"""
+    request = service.users().messages().send(userId='me', body=metadata, media_body=message_media(data))
+    return execute(request, 'messages.send', budgeter=budgeter)
+
+
+# ---------------- COMPOSING ---------------- #
+
+def compose_message(to, subject, body, attachment_data=None, attachment_filename=None, subtype='html',
+                    media=False):
+    """An email with an optional attachment: a `raw` dict, or RFC 822 bytes with media=True"""
+    headers = {'to': to, 'subject': subject}
+    alternative = subtype == 'html'
+    has_attachment = bool(attachment_data and attachment_filename)
+
+    # The attachment is encoded once per distinct file, then reused
+    if media:
+        attachment = mime_builder.attachment_mime(attachment_data, attachment_filename) if has_attachment else None
+        return mime_builder.build_message(headers, body, subtype, attachment, mixed=True, alternative=alternative)
+    attachment = mime_builder.attachment_part(attachment_data, attachment_filename) if has_attachment else None
+    return {'raw': mime_builder.build_raw(headers, body, subtype, attachment, mixed=True, alternative=alternative)}
+
+
+def compose_draft(service, to, subject, body, attachment_data=None, attachment_filename=None, subtype='html'):
+    """Create one draft; returns its id"""
+    # Uploaded as message/rfc822 media: no base64url pass, no JSON string around it
+    data = compose_message(to, subject, body, attachment_data, attachment_filename, subtype, media=True)
+    return create_draft(service, data)['id']
+
+
+def compose_drafts(service, drafts, subtype='html'):
+    """
+    Create many drafts with Gmail batch requests, up to BATCH_SIZE per HTTP
+    call (campaigns hand over campaign.CHUNK_SIZE rows, so one call each).
+
+    `drafts` is a list of dicts with compose_draft's arguments (to, subject,
+    body, attachment_data, attachment_filename). Returns (to, draft_id, error)
+    per draft, in order; only drafts that failed were retried.
+    """
+    requests = (
+        (i, service.users().drafts().create(userId='me', body={'message': compose_message(
+            draft['to'], draft['subject'], draft['body'],
+            draft.get('attachment_data'), draft.get('attachment_filename'), subtype
+        )}))
+        for i, draft in enumerate(drafts)
+    )
+    created, errors = execute_batch(service, requests, 'drafts.create')
+    return [
+        (draft['to'], created[i]['id'] if i in created else None, errors.get(i))
+        for i, draft in enumerate(drafts)
+    ]
+
+
+# ---------------- SERVICE CACHE ---------------- #
+
+DISCOVERY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gmail_discovery.json')
+DISCOVERY_METHODS = (
+    'users.drafts.create',
+    'users.drafts.send',
+    'users.messages.send',
+)
+
+_discovery = None
+_discovery_lock = threading.Lock()
+_local = threading.local()  # httplib2 connections are not thread-safe, so services are per thread
+
+
+def load_discovery():
+    """The bundled Gmail discovery document, parsed once per process"""
+    global _discovery
+    with _discovery_lock:
+        if _discovery is None:
+            with open(DISCOVERY_PATH, encoding='utf-8') as f:
+                _discovery = json.load(f)
+        return _discovery
+
+
+def get_service(credentials):
+    """Gmail service for `credentials`, built offline and reused by this thread"""
+    key = (credentials.client_id, credentials.refresh_token or credentials.token)
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+    service = services.get(key)
+    if service is None:
+        service = services[key] = build_from_document(load_discovery(), credentials=credentials)
+    return service
+
+
+def trim_discovery(document, methods=DISCOVERY_METHODS):
+    """Copy of a discovery document with only `methods` and the schemas they reference"""
+    trimmed = {key: value for key, value in document.items() if key not in ('resources', 'schemas')}
+    for method in methods:
+        *path, name = method.split('.')
+        source, target = document, trimmed
+        for part in path:
+            source = source['resources'][part]
+            target = target.setdefault('resources', {}).setdefault(
+                part, {key: value for key, value in source.items() if key not in ('resources', 'methods')}
+            )
+        target.setdefault('methods', {})[name] = source['methods'][name]
+
+    schemas, unresolved = set(), [trimmed['resources']]
+    while unresolved:
+        for ref in re.findall(r'"\$ref": "(\w+)"', json.dumps(unresolved.pop())):
+            if ref not in schemas:
+                schemas.add(ref)
+                unresolved.append(document['schemas'][ref])
+    trimmed['schemas'] = {name: document['schemas'][name] for name in sorted(schemas)}
+    return trimmed
+
+
+def write_discovery_document(path=DISCOVERY_PATH):
+    """Regenerate the bundled document from the copy shipped with google-api-python-client"""
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = trim_discovery(json.loads(get_static_doc('gmail', 'v1')))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=1, sort_keys=True)
+        f.write('\n')
+    return document
+
+
+if __name__ == '__main__':
+    document = write_discovery_document()
+    print(f"✅ Wrote {DISCOVERY_PATH} (Gmail {document['version']} revision {document['revision']}, "
+          f"{len(DISCOVERY_METHODS)} methods, {len(document['schemas'])} schemas)")
@@ -0,0 +1,305 @@
+"""
+Shared Microsoft Graph helpers for the Outlook draft app.
+
+Connections
+-----------
+requests.post() opens a new TCP + TLS connection for every call. Calls
+here go through a requests.Session per thread instead, whose pooled
+keep-alive connections are reused for every draft after the first.
+
+Batch requests
+--------------
+Graph's JSON $batch endpoint takes up to BATCH_LIMIT calls in one HTTP
+request. Each call gets its own response (status, headers, body) inside
+the batch response. Only the calls that were throttled (429) or hit a
+server error are retried, after their Retry-After, and calls that
+succeeded are never sent again. A 429 from Graph always carries
+Retry-After, so there is no local rate limiter like the Gmail one.
+
+Attachments
+-----------
+Graph takes attachments inline (base64 in the message JSON) only up to
+about 3 MB. Anything from INLINE_LIMIT up goes through an upload session
+instead: the file is sent in UPLOAD_CHUNK pieces (a multiple of 320 KiB)
+that are read from disk as they go out, so memory stays at about one chunk
+however large the file is. A chunk that fails resumes from the range Graph
+says it is missing, rather than restarting the file.
+"""
+
+import base64
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+BATCH_LIMIT = 20  # Graph refuses batches with more calls than this
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 8  # Keep-alive connections per thread's session
+
+INLINE_LIMIT = 3 * 1024 * 1024  # Attachments this large need an upload session
+UPLOAD_UNIT = 320 * 1024  # Upload chunks must be multiples of this
+UPLOAD_CHUNK = 10 * UPLOAD_UNIT  # 3.1 MiB per PUT; Graph takes at most 4 MiB
+
+
+class GraphError(Exception):
+    """A Graph call that failed, with the status and error body Graph returned"""
+
+    def __init__(self, status, body=None, retry_after=None):
+        error = (body or {}).get('error', {}) if isinstance(body, dict) else {}
+        self.status = status
+        self.code = error.get('code', '')
+        self.retry_after = retry_after
+        super().__init__(f"{status} {self.code}: {error.get('message') or body}".strip())
+
+    @property
+    def retryable(self):
+        return self.status in RETRY_STATUSES
+
+
+# ---------------- SESSION ---------------- #
+
+_local = threading.local()  # requests.Session is not documented as thread-safe, so one per thread
+
+
+def get_session():
+    """Keep-alive session reused by every Graph call on this thread"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
+
+
+def _headers(token):
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+
+def _retry_delay(errors, attempt):
+    retry_after = max(float(getattr(e, 'retry_after', None) or 0) for e in errors)
+    return max(retry_after, (2 ** attempt) * (0.5 + random.random() / 2))
+
+
+def _error(response):
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+    return GraphError(response.status_code, body, response.headers.get('Retry-After'))
+
+
+def request(token, method, path, body=None, base_url=GRAPH_URL, max_retries=4, timeout=30):
+    """
+    One Graph call on the pooled session; returns the response JSON.
+
+    Throttling and server errors are retried after Retry-After (or jittered
+    backoff); anything else raises GraphError.
+    """
+    for attempt in range(max_retries + 1):
+        response = get_session().request(method, base_url + path, headers=_headers(token),
+                                         data=None if body is None else json.dumps(body), timeout=timeout)
+        if response.ok:
+            return response.json() if response.content else {}
+        error = _error(response)
+        if attempt == max_retries or not error.retryable:
+            raise error
+        time.sleep(_retry_delay([error], attempt))
+
+
+# ---------------- BATCH REQUESTS ---------------- #
+
+def _execute_chunk(token, chunk, base_url, timeout, results, errors):
+    payload = {'requests': [
+        {'id': str(i), 'method': method, 'url': path,
+         **({'headers': {'Content-Type': 'application/json'}, 'body': body} if body is not None else {})}
+        for i, (_, method, path, body) in enumerate(chunk)
+    ]}
+    response = get_session().post(base_url + '/$batch', headers=_headers(token),
+                                  data=json.dumps(payload), timeout=timeout)
+    if not response.ok:
+        # The batch as a whole was refused, so none of its calls ran
+        error = _error(response)
+        if not error.retryable:
+            raise error
+        for key, *_ in chunk:
+            errors[key] = error
+        return
+    for item in response.json().get('responses', []):
+        key = chunk[int(item['id'])][0]
+        status = int(item['status'])
+        if 200 <= status < 300:
+            results[key] = item.get('body') or {}
+            errors.pop(key, None)
+        else:
+            headers = {name.lower(): value for name, value in (item.get('headers') or {}).items()}
+            errors[key] = GraphError(status, item.get('body'), headers.get('retry-after'))
+
+
+def execute_batch(token, calls, base_url=GRAPH_URL, batch_size=BATCH_LIMIT, max_retries=4, timeout=60):
+    """
+    Make many Graph calls as JSON $batch requests.
+
+    `calls` is an iterable of (key, method, path, body) tuples, with paths
+    relative to the API version ('/me/messages'). It is consumed one batch
+    at a time. Returns ({key: response body}, {key: GraphError}). Calls
+    that were throttled or hit a server error are retried in later batches.
+    """
+    batch_size = min(batch_size, BATCH_LIMIT)
+    results, errors = {}, {}
+    pending = iter(calls)
+    for attempt in range(max_retries + 1):
+        retry = []
+        while True:
+            chunk = list(itertools.islice(pending, batch_size))
+            if not chunk:
+                break
+            _execute_chunk(token, chunk, base_url, timeout, results, errors)
+            retry.extend(call for call in chunk if call[0] in errors and errors[call[0]].retryable)
+        if not retry or attempt == max_retries:
+            break
+        time.sleep(_retry_delay([errors[key] for key, *_ in retry], attempt))
+        pending = iter(retry)
+    return results, errors
+
+
+# ---------------- DRAFTS ---------------- #
+
+def draft_message(to, subject, body_html):
+    """Graph message resource for an HTML draft to one recipient"""
+    return {
+        "subject": subject,
+        "body": {"contentType": "HTML", "content": body_html},
+        "toRecipients": [{"emailAddress": {"address": to}}],
+    }
+
+
+def create_draft(token, message, attachments=(), base_url=GRAPH_URL, chunk_size=UPLOAD_CHUNK):
+    """
+    Create one draft; returns the created message.
+
+    attachments are (name, source) pairs, where source is bytes, a file
+    path or a binary file object. Small ones go inline in the create call,
+    and the rest are uploaded to the new draft through upload sessions.
+    """
+    with contextlib.ExitStack() as stack:
+        inline, uploads, inline_bytes = [], [], 0
+        for name, source in attachments:
+            file = stack.enter_context(_opened(source))
+            size = _size(file)
+            if size < INLINE_LIMIT and inline_bytes + size <= INLINE_LIMIT:
+                inline.append(file_attachment(name, file.read()))
+                inline_bytes += size
+            else:
+                uploads.append((name, file, size))
+        created = request(token, 'POST', '/me/messages', {**message, 'attachments': inline} if inline else message,
+                          base_url=base_url)
+        for name, file, size in uploads:
+            upload_attachment(token, created['id'], name, file, size, base_url=base_url, chunk_size=chunk_size)
+    return created
+
+
+def create_drafts(token, messages, base_url=GRAPH_URL, batch_size=BATCH_LIMIT):
+    """
+    Create drafts for (key, message) pairs, BATCH_LIMIT per HTTP request.
+    Returns ({key: created message}, {key: GraphError}).
+    """
+    return execute_batch(token, ((key, 'POST', '/me/messages', message) for key, message in messages),
+                         base_url=base_url, batch_size=batch_size)
+
+
+# ---------------- ATTACHMENTS ---------------- #
+
+@contextlib.contextmanager
+def _opened(source):
+    """Binary file object for bytes, a path or an open file (which is left open)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            yield f
+    else:
+        yield source
+
+
+def _size(file):
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size - position
+
+
+def _range_start(ranges):
+    return int(ranges[0].split('-', 1)[0])
+
+
+def file_attachment(name, data):
+    """Inline Graph fileAttachment"""
+    return {'@odata.type': '#microsoft.graph.fileAttachment', 'name': name,
+            'contentBytes': base64.b64encode(data).decode()}
+
+
+def upload_attachment(token, message_id, name, file, size, base_url=GRAPH_URL, chunk_size=UPLOAD_CHUNK,
+                      max_retries=4, timeout=60):
+    """
+    Attach `size` bytes read from `file` to a draft through an upload session.
+
+    Each PUT carries at most chunk_size bytes, read just before it is sent.
+    After a failed chunk the upload asks Graph which range it still needs
+    and carries on from there; an expired session is replaced by a new one.
+    """
+    if chunk_size % UPLOAD_UNIT:
+        raise ValueError(f"chunk_size must be a multiple of {UPLOAD_UNIT} bytes")
+    session = get_session()
+    item = {'AttachmentItem': {'attachmentType': 'file', 'name': name, 'size': size}}
+    path = f'/me/messages/{message_id}/attachments/createUploadSession'
+    upload_url = request(token, 'POST', path, item, base_url=base_url)['uploadUrl']
+    start = file.tell()
+    offset, failures = 0, 0
+    while True:
+        file.seek(start + offset)
+        chunk = file.read(min(chunk_size, size - offset))
+        try:
+            # The upload URL carries its own authorization; Graph rejects a bearer token on it
+            response = session.put(upload_url, data=chunk, timeout=timeout,
+                                   headers={'Content-Range': f'bytes {offset}-{offset + len(chunk) - 1}/{size}'})
+        except requests.RequestException as e:
+            error = e
+        else:
+            if response.ok:
+                ranges = (response.json() if response.content else {}).get('nextExpectedRanges')
+                if not ranges:
+                    return
+                offset, failures = _range_start(ranges), 0
+                continue
+            error = _error(response)
+            if not error.retryable and error.status != 416:
+                raise error
+        del chunk
+        failures += 1
+        if failures > max_retries:
+            raise error
+        time.sleep(_retry_delay([error], failures - 1))
+        offset, upload_url = _resume(token, path, item, upload_url, offset, base_url, timeout)
+
+
+def _resume(token, path, item, upload_url, offset, base_url, timeout):
+    """Where to carry on after a failed chunk: (offset, upload URL)"""
+    try:
+        status = get_session().get(upload_url, timeout=timeout)
+    except requests.RequestException:
+        return offset, upload_url
+    if status.status_code == 404:  # the session expired; start the file over in a new one
+        return 0, request(token, 'POST', path, item, base_url=base_url)['uploadUrl']
+    if status.ok:
+        return _range_start(status.json()['nextExpectedRanges']), upload_url
+    return offset, upload_url
@@ -0,0 +1,446 @@
+"""
+Durable SQLite job store for the SMTP email scheduler.
+
+Jobs live in a WAL-mode SQLite file instead of an in-memory list, so a
+restart neither forgets what was sent nor loses pending work. Only due
+rows are ever read (via the (status, scheduled_time) index) and status
+writes are buffered and committed in batches.
+
+Rows come back as jobs.Job records. Due times are stored as epoch-int
+seconds, statuses as ints, and intro/template text once in the `texts`
+table, referenced by id.
+
+Several scheduler processes (or hosts sharing the file) can work the
+same store: claiming a job takes a time-limited lease for this worker,
+and jobs whose lease ran out without a result go back to pending for any
+worker to claim. A worker that loses its lease cannot record a result.
+
+Status flow: pending -> in_flight (leased) -> sent / failed
+"""
+
+import contextlib
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from jobs import DEFAULT_TEMPLATE, FAILED, IN_FLIGHT, PENDING, SENT, Job, TextTable, due_seconds
+
+SCHEMA_VERSION = 3
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    body TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    dedupe_key TEXT UNIQUE,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    recipient_name TEXT NOT NULL,
+    intro_id INTEGER NOT NULL REFERENCES texts (id),
+    template_id INTEGER NOT NULL REFERENCES texts (id),
+    scheduled_time INTEGER NOT NULL,
+    status INTEGER NOT NULL DEFAULT {PENDING},
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_time ON jobs (status, scheduled_time);
+"""
+
+# Schema 1 kept text statuses, REAL due times and the intro inline on every row
+MIGRATE_V1 = f"""
+ALTER TABLE jobs RENAME TO jobs_v1;
+DROP INDEX IF EXISTS idx_jobs_status_time;
+{SCHEMA}
+INSERT OR IGNORE INTO texts (body) SELECT DISTINCT company_intro FROM jobs_v1;
+INSERT OR IGNORE INTO texts (body) VALUES ('{DEFAULT_TEMPLATE}');
+INSERT INTO jobs (id, dedupe_key, to_email, subject, recipient_name, intro_id, template_id,
+                  scheduled_time, status, attempts, last_error, updated_at)
+SELECT j.id, j.dedupe_key, j.to_email, j.subject, j.recipient_name, i.id,
+       (SELECT id FROM texts WHERE body = '{DEFAULT_TEMPLATE}'),
+       CAST(j.scheduled_time AS INTEGER) + (j.scheduled_time > CAST(j.scheduled_time AS INTEGER)),
+       CASE j.status WHEN 'in_flight' THEN {IN_FLIGHT} WHEN 'sent' THEN {SENT}
+                     WHEN 'failed' THEN {FAILED} ELSE {PENDING} END,
+       j.attempts, j.last_error, j.updated_at
+FROM jobs_v1 j JOIN texts i ON i.body = j.company_intro;
+DROP TABLE jobs_v1;
+"""
+
+# Schema 2 had no leases; old in-flight rows have a NULL lease and count as expired
+MIGRATE_V2 = """
+ALTER TABLE jobs ADD COLUMN lease_owner TEXT;
+ALTER TABLE jobs ADD COLUMN lease_expires REAL;
+"""
+
+TEXT_CACHE_SIZE = 4096  # Intro/template texts kept in memory; the rest are read back by id
+
+# Column order matches the jobs.Job constructor
+JOB_COLUMNS = 'id, scheduled_time, to_email, subject, recipient_name, intro_id, template_id, status'
+
+
+class JobStore:
+    """SQLite-backed due queue; usable as a scheduler.Scheduler backend"""
+
+    def __init__(self, path, batch_size=500, max_attempts=5, lease_seconds=300, worker_id=None,
+                 text_cache_size=TEXT_CACHE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds  # must comfortably exceed the time to send one claimed batch
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lost_leases = 0  # results dropped because another worker had re-claimed the job
+        self._lock = threading.RLock()
+        self._pending_updates = []
+        # Other worker processes hold the write lock briefly; wait for it rather than failing
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self.texts = TextTable(
+            self._conn.execute('SELECT id, body FROM texts ORDER BY id LIMIT ?', (text_cache_size,)),
+            allocate=self._insert_text,
+            fetch=self._fetch_text,
+            max_size=text_cache_size
+        )
+
+    def _migrate(self):
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"{self.path} uses job store schema {version}; this version only knows {SCHEMA_VERSION}")
+        if version == SCHEMA_VERSION:
+            return
+        has_jobs = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs'"
+        ).fetchone()
+        if version == 2:
+            script = MIGRATE_V2
+        else:
+            script = MIGRATE_V1 if has_jobs else SCHEMA
+        self._conn.executescript(f'BEGIN IMMEDIATE; {script} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;')
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        One write transaction around several calls (interning texts, then
+        add_many); calls made inside it join it instead of committing alone.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                # Texts allocated in the transaction are gone; their ids must not be reused
+                self.texts.clear()
+                raise
+            self._conn.execute('COMMIT')
+
+    def _insert_text(self, text):
+        with self.transaction():
+            self._conn.execute('INSERT OR IGNORE INTO texts (body) VALUES (?)', (text,))
+            return self._conn.execute('SELECT id FROM texts WHERE body = ?', (text,)).fetchone()[0]
+
+    def _fetch_text(self, text_id):
+        with self._lock:
+            return self._conn.execute('SELECT body FROM texts WHERE id = ?', (text_id,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # ---------- queue interface ---------- #
+
+    def __len__(self):
+        """Number of jobs not yet finished (pending or in flight)"""
+        counts = self.counts()
+        return counts[PENDING] + counts[IN_FLIGHT]
+
+    def push(self, due, job):
+        job.due = due_seconds(due)
+        self.add_many([job])
+
+    def next_due(self):
+        """When the next job becomes claimable: due pending jobs, or other workers' leases expiring"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MIN(t) FROM ('
+                '  SELECT MIN(scheduled_time) AS t FROM jobs WHERE status = ?'
+                '  UNION ALL'
+                '  SELECT MIN(COALESCE(lease_expires, 0)) FROM jobs WHERE status = ? AND lease_owner IS NOT ?'
+                ')',
+                (PENDING, IN_FLIGHT, self.worker_id)
+            ).fetchone()
+        return row[0]
+
+    def pop_due(self, now, limit=None):
+        """Lease due jobs to this worker (pending -> in_flight) and return them"""
+        limit = self.batch_size if limit is None else limit
+        leased_at = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._expire_leases(leased_at)
+                rows = self._conn.execute(
+                    'UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, updated_at = ? '
+                    'WHERE id IN ('
+                    '  SELECT id FROM jobs WHERE status = ? AND scheduled_time <= ? '
+                    '  ORDER BY scheduled_time LIMIT ?'
+                    f') RETURNING {JOB_COLUMNS}',
+                    (IN_FLIGHT, self.worker_id, leased_at + self.lease_seconds, leased_at, PENDING, now, limit)
+                ).fetchall()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        rows.sort(key=lambda row: row[1])
+        return [Job(*row) for row in rows]
+
+    def _expire_leases(self, now):
+        return self._conn.execute(
+            'UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? '
+            'WHERE status = ? AND COALESCE(lease_expires, 0) <= ?',
+            (PENDING, now, IN_FLIGHT, now)
+        ).rowcount
+
+    # ---------- writes ---------- #
+
+    def add_many(self, jobs):
+        """
+        Insert jobs in one transaction; already-known jobs are ignored.
+
+        Returns (scheduled_time, id) for every newly inserted pending job.
+        """
+        rows = [
+            (job.dedupe_key, job.to, job.subject, job.recipient_name,
+             job.intro_id, job.template_id, job.due, job.status)
+            for job in jobs
+        ]
+        with self.transaction():
+            last_id = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM jobs').fetchone()[0]
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO jobs '
+                '(dedupe_key, to_email, subject, recipient_name, intro_id, template_id, scheduled_time, status) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            # NOT INDEXED: walk the new rowid range instead of every pending row in the status index
+            inserted = self._conn.execute(
+                'SELECT scheduled_time, id FROM jobs NOT INDEXED WHERE id > ? AND status = ?',
+                (last_id, PENDING)
+            ).fetchall()
+        return inserted
+
+    def claim(self, job_ids, now):
+        """Lease specific jobs that are pending or whose lease expired; others are skipped"""
+        claimed = []
+        leased_at = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for start in range(0, len(job_ids), 500):
+                    chunk = job_ids[start:start + 500]
+                    claimed.extend(self._conn.execute(
+                        'UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, updated_at = ? '
+                        'WHERE (status = ? OR (status = ? AND COALESCE(lease_expires, 0) <= ?)) '
+                        f'AND id IN ({",".join("?" * len(chunk))}) '
+                        f'RETURNING {JOB_COLUMNS}',
+                        (IN_FLIGHT, self.worker_id, leased_at + self.lease_seconds, leased_at,
+                         PENDING, IN_FLIGHT, leased_at, *chunk)
+                    ).fetchall())
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        claimed.sort(key=lambda row: row[1])
+        return [Job(*row) for row in claimed]
+
+    def mark_sent(self, job_id):
+        self._buffer(('sent', job_id, None, None))
+
+    def mark_failed(self, job_id, error, retry_at=None):
+        """Record a failure; the job is retried at `retry_at` until max_attempts"""
+        if retry_at is not None:
+            retry_at = due_seconds(retry_at)
+        self._buffer(('failed', job_id, error, retry_at))
+
+    def _buffer(self, update):
+        with self._lock:
+            self._pending_updates.append(update)
+            if len(self._pending_updates) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Commit all buffered status transitions in a single transaction"""
+        with self._lock:
+            if not self._pending_updates:
+                return
+            updates, self._pending_updates = self._pending_updates, []
+            now = time.time()
+            owner = self.worker_id
+            sent = [(SENT, now, job_id, IN_FLIGHT, owner) for kind, job_id, _, _ in updates if kind == 'sent']
+            failed = [
+                (error, retry_at, retry_at, self.max_attempts, FAILED, PENDING, now, job_id, IN_FLIGHT, owner)
+                for kind, job_id, error, retry_at in updates if kind == 'failed'
+            ]
+            # Results only land while this worker still holds the job's lease
+            lease_held = 'WHERE id = ? AND status = ? AND lease_owner = ?'
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                applied = self._conn.executemany(
+                    'UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, '
+                    f'lease_owner = NULL, lease_expires = NULL {lease_held}',
+                    sent
+                ).rowcount
+                applied += self._conn.executemany(
+                    'UPDATE jobs SET attempts = attempts + 1, last_error = ?, '
+                    'scheduled_time = COALESCE(?, scheduled_time), '
+                    'status = CASE WHEN ? IS NULL OR attempts + 1 >= ? THEN ? ELSE ? END, '
+                    f'updated_at = ?, lease_owner = NULL, lease_expires = NULL {lease_held}',
+                    failed
+                ).rowcount
+                self._conn.execute('COMMIT')
+                self.lost_leases += len(updates) - applied
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                self._pending_updates[:0] = updates
+                raise
+
+    def recover_in_flight(self):
+        """Return jobs whose lease expired (their worker crashed or hung) to the pending queue"""
+        with self._lock:
+            return self._expire_leases(time.time())
+
+    # ---------- reads ---------- #
+
+    def counts(self):
+        self.flush()
+        counts = {PENDING: 0, IN_FLIGHT: 0, SENT: 0, FAILED: 0}
+        with self._lock:
+            for status, count in self._conn.execute(
+                'SELECT status, COUNT(*) FROM jobs GROUP BY status'
+            ):
+                counts[status] = count
+        return counts
+
+    def iter_jobs(self, limit=None):
+        """Yield jobs ordered by scheduled time, one page at a time"""
+        last = (float('-inf'), 0)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT {JOB_COLUMNS} FROM jobs '
+                    'WHERE (scheduled_time, id) > (?, ?) '
+                    'ORDER BY scheduled_time, id LIMIT ?',
+                    last + (page,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield Job(*row)
+            last = (rows[-1][1], rows[-1][0])
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def iter_claimable(self):
+        """Yield (when, id) for every job this worker could claim: pending ones and other workers' leases"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT CASE status WHEN ? THEN scheduled_time ELSE COALESCE(lease_expires, 0) END, id '
+                    'FROM jobs NOT INDEXED '
+                    'WHERE id > ? AND (status = ? OR (status = ? AND lease_owner IS NOT ?)) ORDER BY id LIMIT ?',
+                    (PENDING, last_id, PENDING, IN_FLIGHT, self.worker_id, self.batch_size * 20)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][1]
+
+
+class IndexedJobStore:
+    """
+    JobStore with its due-time index held in memory.
+
+    The SQLite file stays the source of truth for every job; only
+    (due, id) pairs live in a scheduler.HeapQueue or scheduler.TimingWheel,
+    so finding due jobs never touches the database. Everything except the
+    queue interface is delegated to the wrapped store.
+
+    The index only sees jobs added through this process, so it suits a
+    single scheduler; multi-worker setups use JobStore directly. Neither
+    index is thread-safe, and results are recorded on other threads than
+    the ones popping due jobs, so every index access holds a lock.
+    """
+
+    def __init__(self, store, index_factory):
+        self.store = store
+        self.index_factory = index_factory
+        self.index = None
+        self._index_lock = threading.RLock()
+        self._rebuild()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _rebuild(self):
+        with self._index_lock:
+            self.index = self.index_factory()
+            for due, job_id in self.store.iter_claimable():
+                self.index.push(due, job_id)
+
+    def __len__(self):
+        with self._index_lock:
+            return len(self.index)
+
+    def push(self, due, job):
+        job.due = due_seconds(due)
+        self.add_many([job])
+
+    def add_many(self, jobs):
+        inserted = self.store.add_many(jobs)
+        with self._index_lock:
+            for due, job_id in inserted:
+                self.index.push(due, job_id)
+        return inserted
+
+    def next_due(self):
+        with self._index_lock:
+            return self.index.next_due()
+
+    def pop_due(self, now, limit=None):
+        limit = self.store.batch_size if limit is None else limit
+        with self._index_lock:
+            # A retry only becomes claimable once its failure is flushed; claim() would skip it before
+            self.store.flush()
+            job_ids = self.index.pop_due(now, limit)
+        return self.store.claim(job_ids, now)
+
+    def mark_failed(self, job_id, error, retry_at=None):
+        if retry_at is not None:
+            retry_at = due_seconds(retry_at)
+        with self._index_lock:
+            self.store.mark_failed(job_id, error, retry_at)
+            if retry_at is not None:
+                # If that was the last attempt the row is 'failed' and claim() skips it
+                self.index.push(retry_at, job_id)
+
+    def recover_in_flight(self):
+        # Held across both, so a retry pushed meanwhile isn't lost with the old index
+        with self._index_lock:
+            recovered = self.store.recover_in_flight()
+            if recovered:
+                self._rebuild()
+        return recovered
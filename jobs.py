@@ -0,0 +1,142 @@
+"""
+Compact job records for the email scheduler.
+
+A scheduled email used to travel as a dict of strings: the due time was a
+'YYYY-MM-DD HH:MM:SS' string and every job carried its own copy of the
+company intro, which is usually shared by a whole campaign. A Job keeps
+its due time as whole epoch seconds, its status as a small int and refers
+to intro and template text by id in a shared TextTable, so millions of
+jobs cost a few hundred bytes each instead of about a kilobyte.
+"""
+
+import math
+from collections import OrderedDict
+from datetime import datetime
+
+from scheduler import TIME_FORMAT, parse_due_time
+
+PENDING = 0
+IN_FLIGHT = 1
+SENT = 2
+FAILED = 3
+STATUS_NAMES = ('pending', 'in_flight', 'sent', 'failed')
+
+DEFAULT_TEMPLATE = 'standard'
+
+
+def due_seconds(value):
+    """Due time (epoch seconds or 'YYYY-MM-DD HH:MM:SS') as whole epoch seconds, rounded up"""
+    if isinstance(value, str):
+        value = parse_due_time(value)
+    # Rounding up means a job is never sent early
+    return math.ceil(value)
+
+
+# ---------------- TEXT TABLE ---------------- #
+
+class TextTable:
+    """
+    Interned strings, each stored once and referenced by an int id.
+
+    `allocate(text) -> id` lets a backing store hand out the ids and
+    `fetch(id) -> text` loads texts another process added; without them
+    ids are simply numbered from 1 in this process.
+
+    With a backing store, `max_size` keeps only the most recently used
+    texts in memory: rendered intros are often unique per recipient, and
+    the rest are allocated or fetched again when next needed.
+    """
+
+    def __init__(self, rows=(), allocate=None, fetch=None, max_size=None):
+        if max_size and (allocate is None or fetch is None):
+            raise ValueError("a bounded TextTable needs allocate and fetch to find evicted texts again")
+        self._texts = OrderedDict()
+        self._ids = {}
+        self._allocate = allocate
+        self._fetch = fetch
+        self.max_size = max_size
+        for text_id, text in rows:
+            self.add(text_id, text)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __getitem__(self, text_id):
+        text = self._texts.get(text_id)
+        if text is None:
+            if self._fetch is None:
+                raise KeyError(text_id)
+            text = self._fetch(text_id)
+            self.add(text_id, text)
+        elif self.max_size:
+            self._texts.move_to_end(text_id)
+        return text
+
+    def add(self, text_id, text):
+        self._texts[text_id] = text
+        self._ids[text] = text_id
+        if self.max_size and len(self._texts) > self.max_size:
+            _, evicted = self._texts.popitem(last=False)
+            del self._ids[evicted]
+
+    def intern(self, text):
+        """Id for `text`, adding it on first sight"""
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._allocate(text) if self._allocate else len(self._texts) + 1
+            self.add(text_id, text)
+        elif self.max_size:
+            self._texts.move_to_end(text_id)
+        return text_id
+
+    def clear(self):
+        """Forget every cached text (after a rolled-back transaction allocated some)"""
+        self._texts.clear()
+        self._ids.clear()
+
+
+# ---------------- JOB ---------------- #
+
+class Job:
+    """One scheduled email"""
+
+    __slots__ = ('id', 'due', 'to', 'subject', 'recipient_name', 'intro_id', 'template_id', 'status')
+
+    def __init__(self, id, due, to, subject, recipient_name, intro_id, template_id, status=PENDING):
+        self.id = id
+        self.due = due
+        self.to = to
+        self.subject = subject
+        self.recipient_name = recipient_name
+        self.intro_id = intro_id
+        self.template_id = template_id
+        self.status = status
+
+    @classmethod
+    def from_email(cls, email, texts):
+        """Build a Job from a SCHEDULED_EMAILS-style dict, interning its intro and template"""
+        return cls(
+            None,
+            due_seconds(email['scheduled_time']),
+            email['to'],
+            email['subject'],
+            email['recipient_name'],
+            texts.intern(email['company_intro']),
+            texts.intern(email.get('template', DEFAULT_TEMPLATE)),
+            SENT if email.get('sent') else PENDING,
+        )
+
+    @property
+    def scheduled_time(self):
+        return datetime.fromtimestamp(self.due).strftime(TIME_FORMAT)
+
+    @property
+    def status_name(self):
+        return STATUS_NAMES[self.status]
+
+    @property
+    def dedupe_key(self):
+        return f"{self.to}|{self.subject}|{self.scheduled_time}"
+
+    def __repr__(self):
+        return f"Job(id={self.id}, to={self.to!r}, due={self.scheduled_time}, status={self.status_name})"
@@ -2,6 +2,8 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 import json
 import os
 
+import token_manager
+
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.compose',
     'https://www.googleapis.com/auth/gmail.send'
@@ -26,8 +28,7 @@ creds = flow.run_local_server(
 )
 
 # Save it
-with open('token.json', 'w') as f:
-    f.write(creds.to_json())
+token_manager.write_atomic('token.json', creds.to_json())
 
 # Verify
 token_data = json.loads(creds.to_json())
@@ -1,40 +1,23 @@
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from email.mime.text import MIMEText
-import base64
+import gmail_api
+import mime_builder
+import token_manager
 
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.compose',
     'https://www.googleapis.com/auth/gmail.send'
 ]
 
+def get_service():
+    """Gmail service for token.json (loaded once, refreshed ahead of expiry and saved atomically)"""
+    manager = token_manager.for_file('token.json', SCOPES, on_refresh=lambda creds: print("Token refreshed!"))
+    return gmail_api.get_service(manager.get())
+
 def send_email(to, subject, body):
-    # Load credentials
-    creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    
-    # Auto-refresh if expired
-    if creds.expired and creds.refresh_token:
-        print("Token expired, refreshing...")
-        creds.refresh(Request())
-        with open('token.json', 'w') as f:
-            f.write(creds.to_json())
-        print("Token refreshed!")
-    
-    # Build Gmail service
-    service = build('gmail', 'v1', credentials=creds)
-    
-    # Create message
-    message = MIMEText(body)
-    message['to'] = to
-    message['subject'] = subject
-    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+    service = get_service()
     
-    # Send
-    service.users().messages().send(
-        userId='me',
-        body={'raw': raw}
-    ).execute()
+    # Create message (one copy, out of a reused buffer) and send it as message/rfc822 media
+    message = mime_builder.build_message({'to': to, 'subject': subject}, body)
+    gmail_api.send_message(service, message)
     
     print(f"✅ Email sent to {to}")
 
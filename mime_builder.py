@@ -0,0 +1,351 @@
+"""
+MIME assembly into reusable buffers, with cached, pre-encoded attachment parts.
+
+Messages
+--------
+The email package builds a Message tree, runs it through a generator into
+a StringIO, and as_bytes()/as_string() copy the result out again; the send
+paths then base64url-encoded that and decoded it to str, or smtplib fixed
+line endings and dot-stuffed it, for three or four full copies of every
+message. MessageWriter writes the message straight into one bytearray
+that it keeps from message to message: headers are folded with the same
+policy the generator uses, and base64 bodies are written into the buffer
+a line at a time rather than encoded whole and copied in. Each thread has
+its own writers (writer()). What leaves the buffer is at most one copy:
+the bytes uploaded as media (build_message), the `raw` str (build_raw),
+or nothing at all when SMTP is handed the buffer itself (smtp=True writes
+CRLF lines, dot-stuffed and terminated, ready for DATA).
+
+Attachments
+-----------
+Campaigns attach the same resume to every email. Base64-encoding it costs
+far more than the rest of the message, so AttachmentCache encodes each
+distinct attachment once (keyed by a SHA-256 of its content, LRU-evicted
+by size) and the writer splices the cached part into the message.
+
+Gmail wants a `raw` message base64url-encoded once more. Base64 works in
+3-byte groups, so the cache keeps that part already base64url-encoded
+and padded to a group boundary, and the writer pads the text before it
+with up to two newlines at the end of the preceding part (invisible in
+mail clients). The encoded message is then three encoded pieces joined
+together. Uploading the message as media (message/rfc822) skips that
+second encoding, and the cached MimePart is spliced in as plain bytes.
+"""
+
+import base64
+import binascii
+import hashlib
+import random
+import sys
+import threading
+from collections import OrderedDict
+from email.message import Message
+from email.policy import compat32
+
+ATTACHMENT_CACHE_BYTES = 64 * 1024 * 1024  # encoded parts kept, ~50 distinct 1 MB PDFs
+
+
+class EncodedPart:
+    """One attachment as a base64url-encoded MIME part (headers included), kept as str"""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @property
+    def size(self):
+        return len(self.raw)
+
+
+class MimePart:
+    """One attachment as a MIME part (headers included), kept as a bytearray that is never modified"""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def size(self):
+        return len(self.data)
+
+
+def _part_bytes(data, filename, subtype):
+    writer = MessageWriter()
+    writer._attachment(data, filename, subtype)
+    return writer.detach()
+
+
+def encode_part(data, filename, subtype='pdf'):
+    """Build and encode the MIME part for an attachment (what the cache stores)"""
+    text = _part_bytes(data, filename, subtype)
+    text += b'\n' * (-len(text) % 3)  # trailing newlines are ignored inside a base64 body
+    return EncodedPart(base64.urlsafe_b64encode(text).decode())
+
+
+def mime_part(data, filename, subtype='pdf'):
+    """Build the MIME part for an attachment, for media uploads"""
+    return MimePart(_part_bytes(data, filename, subtype))
+
+
+class AttachmentCache:
+    """Size-bounded LRU of encoded attachment parts, keyed by content hash"""
+
+    def __init__(self, max_bytes=ATTACHMENT_CACHE_BYTES, encode=encode_part):
+        self.max_bytes = max_bytes
+        self.encode = encode
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._parts = OrderedDict()
+        self._last = (None, None)  # (data, key): the same bytes object is usually passed again
+        self._lock = threading.Lock()
+
+    def _key(self, data, filename, subtype):
+        last_data, last_key = self._last
+        if data is last_data and last_key[1:] == (filename, subtype):
+            return last_key
+        key = (hashlib.sha256(data).digest(), filename, subtype)
+        if type(data) is bytes:  # immutable, so the same object means the same content
+            self._last = (data, key)
+        return key
+
+    def get(self, data, filename, subtype='pdf'):
+        with self._lock:
+            key = self._key(data, filename, subtype)
+            part = self._parts.get(key)
+            if part is not None:
+                self._parts.move_to_end(key)
+                self.hits += 1
+                return part
+            self.misses += 1
+
+        part = self.encode(data, filename, subtype)
+        if part.size > self.max_bytes:
+            return part
+        with self._lock:
+            if key not in self._parts:
+                self._parts[key] = part
+                self.size += part.size
+            while self.size > self.max_bytes:
+                _, evicted = self._parts.popitem(last=False)
+                self.size -= evicted.size
+                self.evictions += 1
+        return part
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+            self._last = (None, None)
+            self.size = 0
+
+
+attachment_cache = AttachmentCache()
+mime_cache = AttachmentCache(encode=mime_part)
+
+
+def attachment_part(data, filename, subtype='pdf'):
+    """Encoded part for an attachment, from the process-wide cache"""
+    return attachment_cache.get(data, filename, subtype)
+
+
+def attachment_mime(data, filename, subtype='pdf'):
+    """MIME part bytes for an attachment, from the process-wide cache"""
+    return mime_cache.get(data, filename, subtype)
+
+
+# ---------------- WRITER ---------------- #
+
+BASE64_LINE = 57  # input bytes per 76-character base64 line
+
+
+def _boundary(text=''):
+    # Same shape as the email package's boundaries; redrawn if the text could contain it
+    while True:
+        boundary = '=' * 15 + '%019d' % random.randrange(sys.maxsize) + '=='
+        if '--' + boundary not in text:
+            return boundary
+
+
+class MessageWriter:
+    """
+    Writes MIME messages into one bytearray reused from message to message.
+
+    write() returns a memoryview of the buffer, valid until the next write;
+    release it (use it in a `with` block) before writing again.
+    """
+
+    def __init__(self, smtp=False):
+        self.smtp = smtp  # CRLF line ends, dot-stuffed, with the DATA terminator
+        self.linesep = b'\r\n' if smtp else b'\n'
+        self.policy = compat32.clone(linesep=self.linesep.decode())
+        self._buffer = bytearray()
+        self._length = 0
+
+    def _write(self, data):
+        # Slice assignment overwrites in place and only grows the buffer; it never shrinks
+        end = self._length + len(data)
+        self._buffer[self._length:end] = data
+        self._length = end
+
+    def _line(self, text):
+        self._write(text.encode('ascii'))
+        self._write(self.linesep)
+
+    def _view(self, start=0, end=None):
+        return memoryview(self._buffer)[start:self._length if end is None else end]
+
+    def detach(self):
+        """What was written, as a bytearray of its own; the writer starts over with a new buffer"""
+        buffer, length = self._buffer, self._length
+        self._buffer, self._length = bytearray(), 0
+        del buffer[length:]
+        return buffer
+
+    # ---------- parts ---------- #
+
+    def _headers(self, headers):
+        for name, value in headers.items():
+            if value is not None:
+                self._write(self.policy.fold_binary(name, value))
+        self._line('MIME-Version: 1.0')
+
+    def _text(self, body, subtype):
+        try:
+            data, charset = body.encode('ascii'), 'us-ascii'
+        except UnicodeEncodeError:
+            data, charset = body.encode('utf-8'), 'utf-8'
+        self._line(f'Content-Type: text/{subtype}; charset="{charset}"')
+        if charset == 'utf-8':
+            self._line('Content-Transfer-Encoding: base64')
+            self._write(self.linesep)
+            self._base64(data)
+            return
+        self._line('Content-Transfer-Encoding: 7bit')
+        self._write(self.linesep)
+        if not self.smtp and b'\r' not in data:
+            self._write(data)
+            return
+        lines = data.splitlines()
+        for i, line in enumerate(lines):
+            if self.smtp and line.startswith(b'.'):
+                self._write(b'.')
+            self._write(line)
+            if i < len(lines) - 1 or data.endswith((b'\n', b'\r')):
+                self._write(self.linesep)
+
+    def _base64(self, data):
+        view = memoryview(data)
+        newline = self.linesep == b'\n'
+        for start in range(0, len(view), BASE64_LINE):
+            self._write(binascii.b2a_base64(view[start:start + BASE64_LINE], newline=newline))
+            if not newline:
+                self._write(self.linesep)
+
+    def _attachment(self, data, filename, subtype):
+        disposition = Message()
+        disposition.add_header('Content-Disposition', 'attachment', filename=filename)
+        self._line(f'Content-Type: application/{subtype}')
+        self._line('MIME-Version: 1.0')
+        self._line('Content-Transfer-Encoding: base64')
+        self._write(self.policy.fold_binary('Content-Disposition', disposition['Content-Disposition']))
+        self._write(self.linesep)
+        self._base64(data)
+
+    def _open(self, subtype, body):
+        boundary = _boundary(body)
+        self._line(f'Content-Type: multipart/{subtype}; boundary="{boundary}"')
+        self._write(self.linesep)
+        self._line('--' + boundary)
+        return boundary
+
+    def _delimiter(self, boundary):
+        self._write(self.linesep)
+        self._line('--' + boundary)
+
+    def _close(self, boundary):
+        self._write(self.linesep)
+        self._write(b'--' + boundary.encode('ascii') + b'--')
+
+    def _head(self, headers, body, subtype, mixed, alternative):
+        """Headers and body of a message; returns the open multipart/mixed boundary, if any"""
+        self._length = 0
+        self._headers(headers)
+        mixed = self._open('mixed', body) if mixed else None
+        alternative = self._open('alternative', body) if alternative else None
+        self._text(body, subtype)
+        if alternative:
+            self._close(alternative)
+        return mixed
+
+    def _end(self, mixed):
+        if mixed:
+            self._close(mixed)
+        if self._buffer[self._length - len(self.linesep):self._length] != self.linesep:
+            self._write(self.linesep)
+        if self.smtp:
+            self._write(b'.\r\n')
+
+    # ---------- messages ---------- #
+
+    def write(self, headers, body, subtype='plain', attachment=None, mixed=False, alternative=False):
+        """
+        Write one message and return a memoryview of it.
+
+        headers is a {name: value} dict; None values are left out. The body
+        is a text/<subtype> part, inside multipart/alternative if asked. With
+        mixed=True, or an attachment (a MimePart), the message is a
+        multipart/mixed whose last part is the attachment.
+        """
+        if attachment is not None and self.smtp:
+            raise ValueError("attachments are cached with LF line ends; SMTP writers can't splice them")
+        mixed = self._head(headers, body, subtype, mixed or attachment is not None, alternative)
+        if attachment is not None:
+            self._delimiter(mixed)
+            self._write(attachment.data)
+        self._end(mixed)
+        return self._view()
+
+    def raw(self, headers, body, subtype='plain', attachment=None, mixed=False, alternative=False):
+        """Gmail `raw` value of the same message; attachment is an EncodedPart"""
+        if self.smtp:
+            raise ValueError("raw messages are written with LF line ends")
+        mixed = self._head(headers, body, subtype, mixed or attachment is not None, alternative)
+        split = None
+        if attachment is not None:
+            delimiter = len(self.linesep) * 2 + len(mixed) + 2
+            self._write(self.linesep * (-(self._length + delimiter) % 3))
+            self._delimiter(mixed)
+            split = self._length
+        self._end(mixed)
+        if split is None:
+            with self._view() as view:
+                return base64.urlsafe_b64encode(view).decode()
+        with self._view(0, split) as head, self._view(split) as tail:
+            # One join: the message is copied once, straight into the returned str
+            return ''.join((base64.urlsafe_b64encode(head).decode(), attachment.raw,
+                            base64.urlsafe_b64encode(tail).decode()))
+
+
+_local = threading.local()
+
+
+def writer(smtp=False):
+    """This thread's reusable MessageWriter (one for SMTP, one for everything else)"""
+    name = 'smtp' if smtp else 'lf'
+    current = getattr(_local, name, None)
+    if current is None:
+        current = MessageWriter(smtp)
+        setattr(_local, name, current)
+    return current
+
+
+def build_message(headers, body, subtype='plain', attachment=None, mixed=False, alternative=False):
+    """RFC 822 bytes for media upload, copied once out of this thread's writer"""
+    with writer().write(headers, body, subtype, attachment, mixed, alternative) as view:
+        return bytes(view)
+
+
+def build_raw(headers, body, subtype='plain', attachment=None, mixed=False, alternative=False):
+    """Gmail `raw` value, from this thread's writer"""
+    return writer().raw(headers, body, subtype, attachment, mixed, alternative)
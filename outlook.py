@@ -1,78 +1,51 @@
 import streamlit as st
-import base64
-import json
-import requests
 
-# Microsoft Graph endpoint
-GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0/me"
-
-# ---------------- TEMPLATES ---------------- #
-
-RECRUITER_TEMPLATE = """
-<p>I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions, 
-(link: <a href="https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1">https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1</a>) and have built end-to-end ML systems 
-including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.</p>
-"""
-
-HIRING_MANAGER_TEMPLATE = RECRUITER_TEMPLATE
-
-SOFTWARE_RECRUITER = """
-<p><b>• Backend Development & Data Pipelines:</b> Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records.</p>
-<p><b>• System Architecture & Performance:</b> Implemented distributed systems with ~2× throughput improvements.</p>
-<p><b>• Full-Stack & Deployment:</b> Built production ML systems with APIs, AWS, CI/CD, and monitoring.</p>
-"""
-
-SIGNATURE = """
-<p>Thank you,<br>
-Pavithra<br>
-<a href="https://pavi2803.github.io/pavithrasenthilkumar.github.io/">Website</a> | 
-<a href="https://www.linkedin.com/in/pavithra-senthilkumar-2803/">LinkedIn</a> | 
-<a href="https://github.com/pavi2803">GitHub</a></p>
-"""
+import campaign
+import graph_api
+import templates
 
 # ---------------- AUTH HELPER ---------------- #
 
-def get_headers():
-    if "access_token" not in st.session_state:
-        return None
-    return {
-        "Authorization": f"Bearer {st.session_state.access_token}",
-        "Content-Type": "application/json"
-    }
+def get_token():
+    return st.session_state.get("access_token")
 
 # ---------------- CREATE DRAFT ---------------- #
 
-def create_outlook_draft(to, subject, body_html):
-    """Create a draft email in Outlook"""
-    headers = get_headers()
-    if not headers:
+def create_outlook_draft(to, subject, body_html, attachments=()):
+    """Create a draft email in Outlook; attachments are (filename, bytes / path / file object) pairs"""
+    token = get_token()
+    if not token:
         return False, "Not authenticated"
 
-    message = {
-        "subject": subject,
-        "body": {
-            "contentType": "HTML",
-            "content": body_html
-        },
-        "toRecipients": [
-            {"emailAddress": {"address": to}}
-        ]
-    }
-
     try:
-        response = requests.post(
-            f"{GRAPH_BASE_URL}/messages",
-            headers=headers,
-            data=json.dumps(message)
-        )
-
-        if response.status_code in [200, 201]:
-            return True, "Draft created successfully!"
-        else:
-            return False, f"Error: {response.text}"
+        graph_api.create_draft(token, graph_api.draft_message(to, subject, body_html), attachments)
+        if attachments:
+            return True, f"Draft created successfully with {len(attachments)} attachment(s)!"
+        return True, "Draft created successfully!"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+def create_outlook_drafts(token, drafts):
+    """Create many drafts, 20 per Graph $batch request; returns (to, draft id, error) per draft"""
+    created, errors = graph_api.create_drafts(token, (
+        (i, graph_api.draft_message(draft['to'], draft['subject'], draft['body']))
+        for i, draft in enumerate(drafts)
+    ))
+    return [(draft['to'], created[i]['id'] if i in created else None, errors.get(i))
+            for i, draft in enumerate(drafts)]
+
+# ---------------- CAMPAIGN ---------------- #
+
+CAMPAIGN_SECTIONS = {
+    "Recruiter": 'outlook/recruiter',
+    "Hiring Manager / Technical Contact": 'outlook/hiring_manager',
+    "Software Hiring Manager": 'outlook/software',
+}
+
+CAMPAIGN_ACTIONS = {
+    "📬 Create Drafts": lambda attachment, send_time: campaign.drafts_action(create_outlook_drafts),
+}
+
 # ---------------- UI ---------------- #
 
 st.set_page_config(page_title="Outlook Draft Creator", page_icon="📬", layout="wide")
@@ -135,6 +108,15 @@ with st.sidebar:
 
 if "access_token" in st.session_state:
     st.markdown("---")
+
+    mode = st.radio("Mode", ["✉️ Single Email", "📋 Campaign (CSV)"], horizontal=True)
+    if mode == "📋 Campaign (CSV)":
+        campaign.campaign_ui(
+            CAMPAIGN_SECTIONS, 'outlook/email', None, CAMPAIGN_ACTIONS, get_token,
+            default_subject="Applied ML in Healthcare – Quick Intro",
+            connect=lambda token: token, resumes={}
+        )
+        st.stop()
     
     # Recipient info
     st.markdown("### 👤 Recipient Information")
@@ -167,11 +149,11 @@ if "access_token" in st.session_state:
 
     # Select template based on type
     if recipient_type == "Recruiter":
-        experience_template = RECRUITER_TEMPLATE
+        experience_template = templates.registry['outlook/recruiter']
     elif recipient_type == "Hiring Manager / Technical Contact":
-        experience_template = HIRING_MANAGER_TEMPLATE
+        experience_template = templates.registry['outlook/hiring_manager']
     else:
-        experience_template = SOFTWARE_RECRUITER
+        experience_template = templates.registry['outlook/software']
 
     # Custom intro
     st.markdown("### ✍️ Custom Company Introduction")
@@ -182,12 +164,8 @@ if "access_token" in st.session_state:
     )
 
     # Build full email
-    body_html = f"""
-    <p>Hi {recipient_name or '[First Name]'},</p>
-    <p>{company_intro}</p>
-    {experience_template}
-    {SIGNATURE}
-    """
+    email_template = templates.registry['outlook/email'].bind(experience=experience_template)
+    body_html = email_template.render(recipient_name=recipient_name or '[First Name]', company_intro=company_intro)
 
     # Preview
     st.markdown("---")
@@ -200,13 +178,20 @@ if "access_token" in st.session_state:
         if not recipient_name:
             st.warning("⚠️ Don't forget to enter recipient's first name!")
 
+    # Attachments
+    st.markdown("### 📎 Attachments")
+    attachment_files = st.file_uploader(
+        "Files over 3 MB are uploaded in chunks after the draft is created",
+        accept_multiple_files=True
+    )
+
     # Template reference
     with st.expander("📄 Templates (Reference)"):
         st.markdown("**Recruiter / Hiring Manager Template:**")
-        st.markdown(RECRUITER_TEMPLATE, unsafe_allow_html=True)
+        st.markdown(templates.registry.render('outlook/recruiter'), unsafe_allow_html=True)
         st.markdown("---")
         st.markdown("**Software Hiring Manager Template:**")
-        st.markdown(SOFTWARE_RECRUITER, unsafe_allow_html=True)
+        st.markdown(templates.registry.render('outlook/software'), unsafe_allow_html=True)
 
     # Create draft button
     st.markdown("---")
@@ -218,11 +203,14 @@ if "access_token" in st.session_state:
         elif not company_intro:
             st.error("❌ Please enter custom company introduction")
         else:
+            for f in attachment_files or []:
+                f.seek(0)  # the upload streams from the current position
             with st.spinner("Creating draft in Outlook..."):
                 success, message = create_outlook_draft(
                     recipient_email,
                     subject_line,
-                    body_html
+                    body_html,
+                    [(f.name, f) for f in attachment_files or []]
                 )
             
             if success:
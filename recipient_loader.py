@@ -0,0 +1,194 @@
+"""
+Streaming recipient loader for the SMTP email scheduler.
+
+Reads a CSV or JSONL recipient file one row at a time, validates and
+renders each row, and enqueues the jobs into the job store in batched
+transactions, so memory stays flat however large the file is.
+
+Columns / keys per row:
+- to, subject, scheduled_time ('YYYY-MM-DD HH:MM:SS' or epoch seconds)  required
+- recipient_name, company_intro    may use {column} placeholders from the same row
+- template                         optional body template name
+
+    python recipient_loader.py recipients.csv --db scheduled_emails.db
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import re
+import time
+
+import templates
+from job_store import JobStore
+from jobs import DEFAULT_TEMPLATE, Job, due_seconds
+
+REQUIRED_FIELDS = ('to', 'subject', 'scheduled_time')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+# ---------------- READING ---------------- #
+
+def read_rows(path):
+    """Yield (line number, row dict) from a .csv or .jsonl file, one row at a time"""
+    if path.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, RowError(f"invalid JSON: {e.msg}")
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+# ---------------- VALIDATION ---------------- #
+
+def _render(value, row, field):
+    if '{' not in value:
+        return value
+    try:
+        # Compiled once per distinct text: a shared default intro is parsed a single time
+        return templates.compiled(value).render(row).strip()
+    except KeyError as e:
+        raise RowError(f"{field} uses unknown column {e}")
+    except ValueError as e:
+        raise RowError(f"{field} is not a valid template: {e}")
+
+
+def parse_row(row, default_intro='', templates=None):
+    """Validate one raw row and return it as a scheduler email dict"""
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError("row is not an object")
+    row = {key.strip(): '' if value is None else str(value).strip()
+           for key, value in row.items() if key}
+
+    missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    if not EMAIL_RE.match(row['to']):
+        raise RowError(f"invalid address {row['to']!r}")
+
+    scheduled_time = row['scheduled_time']
+    try:
+        due = due_seconds(float(scheduled_time) if scheduled_time.replace('.', '', 1).isdigit() else scheduled_time)
+    except ValueError:
+        raise RowError(f"invalid scheduled_time {scheduled_time!r}")
+
+    template = row.get('template') or DEFAULT_TEMPLATE
+    if templates is not None and template not in templates:
+        raise RowError(f"unknown template {template!r}")
+
+    intro = _render(row.get('company_intro') or default_intro, row, 'company_intro')
+    if not intro:
+        raise RowError("missing company_intro")
+
+    return {
+        'to': row['to'],
+        'subject': _render(row['subject'], row, 'subject'),
+        'recipient_name': _render(row.get('recipient_name') or row['to'].split('@')[0], row, 'recipient_name'),
+        'company_intro': intro,
+        'scheduled_time': due,
+        'template': template,
+    }
+
+
+# ---------------- LOADING ---------------- #
+
+class LoadReport:
+    """Counts for one load; keeps only the first few row errors"""
+
+    def __init__(self):
+        self.rows = 0
+        self.queued = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []  # (line number, message)
+        self.seconds = 0.0
+
+    def reject(self, line_no, error):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, str(error)))
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f"{self.rows} rows | {self.queued} queued, {self.duplicates} already scheduled, "
+                f"{self.invalid} invalid | {self.rows_per_sec:,.0f} rows/s")
+
+
+def iter_jobs(rows, texts, report, default_intro='', templates=None):
+    """Turn raw rows into Jobs, recording rejects on the report"""
+    for line_no, row in rows:
+        report.rows += 1
+        try:
+            yield Job.from_email(parse_row(row, default_intro, templates), texts)
+        except RowError as e:
+            report.reject(line_no, e)
+
+
+def load(path, store, batch_size=1000, default_intro='', templates=None, on_batch=None):
+    """
+    Stream a recipient file into `store`, one transaction per `batch_size` rows
+    (covering the rows' new intro texts as well as the jobs).
+
+    `on_batch(report)` is called after each committed batch (progress output).
+    Returns a LoadReport.
+    """
+    report = LoadReport()
+    start = time.perf_counter()
+    jobs = iter_jobs(read_rows(path), store.texts, report, default_intro, templates)
+    while True:
+        with store.transaction():
+            batch = list(itertools.islice(jobs, batch_size))
+            if not batch:
+                break
+            queued = len(store.add_many(batch))
+        report.queued += queued
+        report.duplicates += len(batch) - queued
+        if on_batch:
+            on_batch(report)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue recipients from a CSV/JSONL file into the scheduler")
+    parser.add_argument('path', help='.csv or .jsonl recipient file')
+    parser.add_argument('--db', default='scheduled_emails.db', help='job store the scheduler reads')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per transaction')
+    parser.add_argument('--intro', default='', help='company_intro for rows without one ({column} placeholders allowed)')
+    args = parser.parse_args()
+
+    store = JobStore(args.db)
+    try:
+        report = load(args.path, store, args.batch_size, args.intro,
+                      on_batch=lambda r: print(f"\r📥 {r.rows:,} rows read, {r.queued:,} queued", end='', flush=True))
+    finally:
+        store.close()
+
+    print(f"\n✅ {report.summary()}")
+    for line_no, error in report.errors:
+        print(f"❌ line {line_no}: {error}")
+    if report.invalid > len(report.errors):
+        print(f"... and {report.invalid - len(report.errors)} more invalid rows")
+
+
+if __name__ == '__main__':
+    main()
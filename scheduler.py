@@ -0,0 +1,298 @@
+"""
+Scheduler core for the SMTP email scheduler.
+
+Jobs are kept in a due queue keyed on their pre-parsed due time (epoch
+seconds), so a tick only touches the jobs that are actually due and the
+loop can sleep exactly until the next one instead of polling.
+
+Queue backends share one interface (push / pop_due / next_due / len):
+- HeapQueue    - min-heap, O(log n) insert and pop
+- TimingWheel  - hierarchical timing wheel, O(1) insert and expiry, for
+                 millions of near-term jobs
+- job_store.JobStore - durable SQLite queue
+"""
+
+import heapq
+import itertools
+from collections import deque
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_due_time(value):
+    """Parse a 'YYYY-MM-DD HH:MM:SS' local time into epoch seconds"""
+    return datetime.strptime(value, TIME_FORMAT).timestamp()
+
+
+# ---------------- QUEUE BACKENDS ---------------- #
+
+class HeapQueue:
+    """Min-heap of jobs ordered by due time"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()  # tie-breaker so jobs are never compared
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, due, job):
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit=None):
+        """Pop every job due at or before `now` (at most `limit`)"""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            if limit is not None and len(due) >= limit:
+                break
+            due.append(heapq.heappop(heap)[2])
+        return due
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel: second / minute / hour / day wheels plus an
+    overflow heap for jobs more than a wheel-year away.
+
+    A job goes into the finest wheel whose current revolution contains its
+    due second, so insert is O(1). When a coarser wheel's slot comes round
+    its jobs cascade down into finer wheels; expiry pops whole one-second
+    slots.
+    """
+
+    LEVELS = ((1, 60), (60, 60), (3600, 24), (86400, 365))  # (seconds per slot, slots)
+
+    def __init__(self, now=None):
+        self._tick = int(time.time() if now is None else now)
+        self._wheels = [[[] for _ in range(slots)] for _, slots in self.LEVELS]
+        self._counts = [0] * len(self.LEVELS)
+        self._spans = [width * slots for width, slots in self.LEVELS]
+        self._overflow = []
+        self._seq = itertools.count()
+        self._ready = deque()
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _place(self, due, job):
+        second = int(due)
+        if second < self._tick:
+            second = self._tick
+        tick = self._tick
+        for level, span in enumerate(self._spans):
+            if second // span == tick // span:
+                width, slots = self.LEVELS[level]
+                self._wheels[level][(second // width) % slots].append((due, job))
+                self._counts[level] += 1
+                return
+        heapq.heappush(self._overflow, (due, next(self._seq), job))
+
+    def push(self, due, job):
+        self._place(due, job)
+        self._len += 1
+
+    def _cascade(self, level):
+        width, slots = self.LEVELS[level]
+        slot = self._wheels[level][(self._tick // width) % slots]
+        if slot:
+            self._wheels[level][(self._tick // width) % slots] = []
+            self._counts[level] -= len(slot)
+            for due, job in slot:
+                self._place(due, job)
+
+    def _advance(self, target):
+        """Move the wheel to second `target`, collecting every job that expired on the way"""
+        seconds = self._wheels[0]
+        while self._tick < target:
+            slot = seconds[self._tick % 60]
+            if slot:
+                seconds[self._tick % 60] = []
+                self._counts[0] -= len(slot)
+                self._ready.extend(job for _, job in slot)
+
+            # Skip straight past stretches where the finer wheels are empty
+            step = 1
+            for level, span in enumerate(self._spans):
+                if self._counts[level]:
+                    break
+                step = span
+            else:
+                if not self._overflow:
+                    self._tick = target
+                    return
+            self._tick = min(target, (self._tick // step + 1) * step)
+
+            # Coarsest first so jobs can cascade all the way down in one step
+            if self._tick % self._spans[-1] == 0:
+                span = self._spans[-1]
+                while self._overflow and self._overflow[0][0] // span <= self._tick // span:
+                    due, _, job = heapq.heappop(self._overflow)
+                    self._place(due, job)
+            for level in range(len(self.LEVELS) - 1, 0, -1):
+                if self._tick % self.LEVELS[level][0] == 0:
+                    self._cascade(level)
+
+    def pop_due(self, now, limit=None):
+        """Pop every job due at or before `now` (at most `limit`)"""
+        target = int(now)
+        if target > self._tick:
+            self._advance(target)
+        # The current second may hold jobs due later within that second
+        slot = self._wheels[0][self._tick % 60]
+        if slot:
+            keep = [entry for entry in slot if entry[0] > now]
+            self._ready.extend(job for due, job in slot if due <= now)
+            self._counts[0] -= len(slot) - len(keep)
+            self._wheels[0][self._tick % 60] = keep
+
+        count = len(self._ready) if limit is None else min(limit, len(self._ready))
+        due = [self._ready.popleft() for _ in range(count)]
+        self._len -= count
+        return due
+
+    def next_due(self):
+        if self._ready:
+            return float(self._tick)
+        for level, (width, slots) in enumerate(self.LEVELS):
+            if not self._counts[level]:
+                continue
+            wheel = self._wheels[level]
+            for index in range((self._tick // width) % slots, slots):
+                if wheel[index]:
+                    return min(due for due, _ in wheel[index])
+        return self._overflow[0][0] if self._overflow else None
+
+
+# ---------------- SCHEDULER ---------------- #
+
+class Scheduler:
+    """Thread-safe due queue that can sleep until the next job is due"""
+
+    def __init__(self, queue=None):
+        self.queue = queue if queue is not None else HeapQueue()
+        self._wakeup = threading.Condition()
+
+    def __len__(self):
+        with self._wakeup:
+            return len(self.queue)
+
+    def add(self, due, job):
+        """Queue a job and wake any sleeper so it can re-check the next due time"""
+        with self._wakeup:
+            self.queue.push(due, job)
+            self._wakeup.notify_all()
+
+    def pop_due(self, now=None, limit=None):
+        with self._wakeup:
+            return self.queue.pop_due(time.time() if now is None else now, limit)
+
+    def next_due(self):
+        with self._wakeup:
+            return self.queue.next_due()
+
+    def wait(self, timeout=None):
+        """Block until the next job is due, a job is added, or `timeout` elapses"""
+        with self._wakeup:
+            delay = timeout
+            next_due = self.queue.next_due()
+            if next_due is not None:
+                until_due = max(0.0, next_due - time.time())
+                delay = until_due if delay is None else min(delay, until_due)
+            if delay is None or delay > 0:
+                self._wakeup.wait(delay)
+
+
+# ---------------- DISPATCH ---------------- #
+
+class DispatchReport:
+    """Outcome of one dispatch: per-job results plus schedule drift"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.results = []  # (job, success, message)
+        self.sent = 0
+        self.failed = 0
+        self._timings = []  # (due, started, finished)
+
+    def record(self, job, due, started, finished, success, message):
+        self.results.append((job, success, message))
+        if success:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self._timings.append((due, started, finished))
+
+    @property
+    def drift(self):
+        """Seconds past due at which each send finished"""
+        return [max(0.0, finished - due) for due, _, finished in self._timings]
+
+    @property
+    def sequential_drift(self):
+        """Estimated drift had the same sends run back to back in due order"""
+        if not self._timings:
+            return []
+        clock = min(started for _, started, _ in self._timings)
+        drift = []
+        for due, started, finished in sorted(self._timings):
+            clock += finished - started
+            drift.append(max(0.0, clock - due))
+        return drift
+
+    @property
+    def drift_saved(self):
+        """Total seconds of drift avoided compared to sending sequentially"""
+        return max(0.0, sum(self.sequential_drift) - sum(self.drift))
+
+    def summary(self):
+        if not self.results:
+            return "nothing due"
+        return (
+            f"{self.sent} sent, {self.failed} failed with {self.max_workers} worker(s) | "
+            f"max drift {max(self.drift):.1f}s (sequential ~{max(self.sequential_drift):.1f}s) | "
+            f"drift saved {self.drift_saved:.1f}s"
+        )
+
+
+def dispatch(jobs, send, due_of, max_workers=1, on_result=None):
+    """
+    Run `send(job) -> (success, message)` for every job on a bounded thread pool.
+
+    `due_of(job)` gives the job's due epoch time so drift can be measured.
+    `on_result(job, success, message)` is called from the calling thread as
+    each send completes, so callers can update state without extra locking.
+    """
+    report = DispatchReport(max_workers)
+
+    def timed_send(job):
+        started = time.time()
+        try:
+            success, message = send(job)
+        except Exception as e:
+            success, message = False, str(e)
+        return job, success, message, started, time.time()
+
+    def collect(outcome):
+        job, success, message, started, finished = outcome
+        report.record(job, due_of(job), started, finished, success, message)
+        if on_result:
+            on_result(job, success, message)
+
+    if max_workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            collect(timed_send(job))
+        return report
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dispatch') as pool:
+        for future in as_completed([pool.submit(timed_send, job) for job in jobs]):
+            collect(future.result())
+    return report
@@ -0,0 +1,358 @@
+"""
+Send worker for the drafts app3 schedules in the Google Sheet.
+
+app3 appends one row per scheduled draft:
+
+    draft_id, email, name, subject, send_time, status, created_at
+
+Each run reads the whole sheet with one values read and picks the
+'pending' rows whose send_time has passed. It sends those drafts with
+concurrent drafts.send calls, paced by the shared Gmail quota budgeter.
+Then it writes every touched row's status, sent_at and result (message id
+or error) back with one values batchUpdate. The sheet costs two metadata
+reads, one values read and one write per run, however many rows are due.
+
+With --state, runs are incremental. A small JSON cursor records the
+first row that may still be pending (the watermark), plus up to
+MAX_DEFERRED pending rows above it, such as future sends or retries. Each
+run then reads only the rows from the watermark down and the deferred
+rows, in one values batchGet, so a run's read volume no longer grows with
+every email ever scheduled. Once COMPACT_ROWS finished rows have piled up
+at the top of the sheet, they are moved to an "Archive" tab, which keeps
+the sheet small. Editing rows above the cursor by hand is noticed through
+an anchor cell and triggers a full rescan; deleting the state file does
+the same. The cursor also remembers the draft ids of the last
+MAX_SENT_IDS sent rows. A pending row that repeats one of them is a
+duplicate of a row already sent (now above the watermark or archived) and
+fails without a send.
+
+Rows that fail for good (the draft was deleted or already sent) become
+'failed'. Rate limits, server and network errors that survive the
+retries leave the row 'pending' with the error noted, so the next run
+tries again.
+drafts.send deletes the draft, so a row can never be sent twice, even if
+two runs overlap: the slower run gets a 404 for that row.
+
+Configuration comes from the environment, for a scheduled GitHub Actions
+job (send_time is local time, so set TZ to the timezone app3 runs in):
+
+    GMAIL_TOKEN         authorized-user token JSON (the one pasted into app3)
+    SHEETS_CREDENTIALS  service account JSON
+    SHEET_ID            spreadsheet id
+
+    python sheet_worker.py --max-workers 8 --max-seconds 240 --state sheet_cursor.json
+
+GitHub Actions runners start clean, so keep the state file in
+actions/cache between runs (without it a run is simply a full scan).
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import gspread
+from googleapiclient.errors import HttpError
+
+import gmail_api
+import sheets
+import token_manager
+from scheduler import TIME_FORMAT, dispatch, parse_due_time
+
+SCOPES = [
+    'https://www.googleapis.com/auth/gmail.compose',
+    'https://www.googleapis.com/auth/gmail.send'
+]
+
+# Columns A-I; app3 writes A-G, the worker fills in H and I
+DRAFT_ID, EMAIL, NAME, SUBJECT, SEND_TIME, STATUS, CREATED_AT, SENT_AT, RESULT = range(9)
+READ_RANGE = 'A:I'
+PENDING, SENT, FAILED = 'pending', 'sent', 'failed'
+
+MAX_WORKERS = 8  # Concurrent drafts.send calls; the quota budgeter sets the actual rate
+MAX_DEFERRED = 200  # Pending rows kept above the watermark (each is one extra range per read)
+COMPACT_ROWS = 1000  # Archive the finished rows at the top once there are this many
+MAX_SENT_IDS = 2000  # Sent draft ids the cursor remembers for duplicate checks
+ARCHIVE_TITLE = 'Archive'
+
+
+class ScheduledRow:
+    """One pending sheet row and what happened to it this run"""
+
+    __slots__ = ('number', 'draft_id', 'email', 'due', 'status', 'sent_at', 'result')
+
+    def __init__(self, number, draft_id, email, due):
+        self.number = number  # 1-based sheet row
+        self.draft_id = draft_id
+        self.email = email
+        self.due = due
+        self.status = PENDING
+        self.sent_at = ''
+        self.result = ''
+
+
+def sent_ids(rows):
+    """Draft ids of the 'sent' rows among (row number, values) pairs, in row order"""
+    return [row[DRAFT_ID].strip() for _, row in rows
+            if len(row) > STATUS and row[STATUS].strip().lower() == SENT and row[DRAFT_ID].strip()]
+
+
+def find_due(rows, now, sent=()):
+    """
+    Rows to send and rows to fail, from (row number, values) pairs.
+
+    Returns (due, invalid, waiting): due is a list of ScheduledRow, invalid
+    a list of ScheduledRow already marked failed (bad send_time, no draft
+    id or a duplicate), and waiting the numbers of pending rows that are
+    not due yet. A draft scheduled on more than one row is only sent for
+    the first; one already sent, on a row in `rows` or in `sent` (draft ids
+    from earlier runs), is not sent again.
+    """
+    due, invalid, waiting, seen = [], [], [], set()
+    done = set(sent)
+    done.update(sent_ids(rows))
+    for number, row in rows:
+        row = row + [''] * (RESULT + 1 - len(row))
+        if row[STATUS].strip().lower() != PENDING:
+            continue
+        draft_id = row[DRAFT_ID].strip()
+        scheduled = ScheduledRow(number, draft_id, row[EMAIL], None)
+        try:
+            scheduled.due = parse_due_time(row[SEND_TIME].strip())
+        except ValueError:
+            scheduled.status, scheduled.result = FAILED, f"invalid send_time {row[SEND_TIME]!r}"
+            invalid.append(scheduled)
+            continue
+        if not draft_id or draft_id in seen or draft_id in done:
+            if not draft_id:
+                scheduled.result = "no draft id"
+            elif draft_id in done:
+                scheduled.result = "duplicate of a row already sent"
+            else:
+                scheduled.result = "duplicate of an earlier row"
+            scheduled.status = FAILED
+            invalid.append(scheduled)
+            continue
+        if scheduled.due <= now:
+            seen.add(draft_id)
+            due.append(scheduled)
+        else:
+            waiting.append(number)
+    return due, invalid, waiting
+
+
+def status_updates(rows):
+    """values batchUpdate data for rows: status in F, sent_at and result in H:I"""
+    data = []
+    for row in rows:
+        data.append({'range': f'F{row.number}', 'values': [[row.status]]})
+        data.append({'range': f'H{row.number}:I{row.number}', 'values': [[row.sent_at, row.result]]})
+    return data
+
+
+# ---------------- INCREMENTAL SCAN ---------------- #
+
+class Cursor:
+    """
+    Where the last scan stopped. Every row above `watermark` is finished
+    except the `deferred` ones. `anchor` is the column A value of row
+    watermark - 1, re-read by every scan to notice rows inserted or
+    deleted above the cursor. `sent` holds the draft ids of the most
+    recently sent rows, oldest first.
+    """
+
+    def __init__(self, sheet_id, watermark=1, deferred=(), anchor=None, first_row=1, last_row=0, sent=()):
+        self.sheet_id = sheet_id
+        self.watermark = watermark
+        self.deferred = list(deferred)
+        self.anchor = anchor
+        self.first_row = first_row  # 2 when row 1 is a header
+        self.last_row = last_row
+        self.sent = list(sent)
+
+    @classmethod
+    def load(cls, path, sheet_id):
+        """Cursor from a state file; a fresh one (full scan) if it is missing or for another sheet"""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return cls(sheet_id)
+        if state.get('sheet_id') != sheet_id:
+            return cls(sheet_id)
+        return cls(**state)
+
+    def save(self, path):
+        token_manager.write_atomic(path, json.dumps({
+            'sheet_id': self.sheet_id, 'watermark': self.watermark, 'deferred': self.deferred,
+            'anchor': self.anchor, 'first_row': self.first_row, 'last_row': self.last_row,
+            'sent': self.sent,
+        }))
+
+    def reset(self):
+        """Back to a full scan; the sent draft ids are kept, those drafts are gone either way"""
+        self.__init__(self.sheet_id, sent=self.sent)
+
+    def remember(self, draft_ids):
+        """Record sent draft ids, keeping the MAX_SENT_IDS most recent"""
+        sent = dict.fromkeys(self.sent)
+        for draft_id in draft_ids:
+            sent.pop(draft_id, None)
+            sent[draft_id] = None
+        self.sent = list(sent)[-MAX_SENT_IDS:]
+
+    def advance(self, rows, pending):
+        """Move past every row this scan found finished; `pending` are the row numbers still pending"""
+        if self.watermark <= 1 and rows:
+            first = rows[0][1] + [''] * (STATUS + 1 - len(rows[0][1]))
+            self.first_row = 1 if first[STATUS].strip().lower() in (PENDING, SENT, FAILED) else 2
+        values = {number: row for number, row in rows}
+        # Every row above the watermark exists; the scan only saw the tail and the deferred rows
+        self.last_row = max([self.watermark - 1, *(number for number, row in rows if any(row))])
+        pending = sorted(pending)
+        self.deferred = pending[:MAX_DEFERRED]
+        self.watermark = pending[MAX_DEFERRED] if len(pending) > MAX_DEFERRED else max(self.last_row + 1,
+                                                                                     self.watermark)
+        if self.watermark - 1 in values:
+            self.anchor = (values[self.watermark - 1] or [''])[0] or None
+        elif self.watermark <= 1:
+            self.anchor = None
+
+    def shift(self, count):
+        """Rows first_row..first_row + count - 1 were deleted"""
+        self.watermark -= count
+        self.deferred = [number - count for number in self.deferred]
+        self.last_row -= count
+        if self.watermark <= self.first_row:
+            self.anchor = None  # the anchor row itself was archived
+
+
+def scan(worksheet, cursor):
+    """
+    (row number, values) for every row that may be pending: the rows from
+    the watermark down plus the deferred rows, in one read. Falls back to
+    reading the whole sheet when the cursor is fresh or the anchor moved.
+    """
+    if cursor.watermark > 1:
+        ranges = [f'A{cursor.watermark}:I'] + [f'A{number}:I{number}' for number in cursor.deferred]
+        if cursor.anchor:
+            ranges.append(f'A{cursor.watermark - 1}')
+        results = worksheet.batch_get(ranges)
+        if not cursor.anchor or (results[-1] and results[-1][0] and results[-1][0][0] == cursor.anchor):
+            rows = list(enumerate(results[0], start=cursor.watermark))
+            rows += [(number, values[0] if values else []) for number, values in zip(cursor.deferred, results[1:])]
+            return rows
+        print("⚠️ Rows above the cursor changed, rescanning the whole sheet")
+        cursor.reset()
+    return list(enumerate(worksheet.get_values(READ_RANGE), start=1))
+
+
+def compact(worksheet, cursor, min_rows=COMPACT_ROWS):
+    """
+    Move the finished rows at the top of the sheet to the archive tab once
+    there are at least min_rows of them. Returns how many rows moved.
+    """
+    end = min([cursor.watermark - 1, *(number - 1 for number in cursor.deferred[:1])])
+    if cursor.first_row == 1:
+        end = min(end, cursor.last_row - 1)  # A sheet can't lose all its rows
+    count = end - cursor.first_row + 1
+    if count < min_rows:
+        return 0
+    values = worksheet.get_values(f'A{cursor.first_row}:I{end}')
+    try:
+        archive = worksheet.spreadsheet.worksheet(ARCHIVE_TITLE)
+    except gspread.WorksheetNotFound:
+        archive = worksheet.spreadsheet.add_worksheet(ARCHIVE_TITLE, rows=1, cols=RESULT + 1)
+    # Append before deleting: a crash in between leaves duplicates in the archive, never lost rows
+    archive.append_rows(values)
+    worksheet.delete_rows(cursor.first_row, end)
+    cursor.shift(count)
+    return count
+
+
+def run(worksheet, get_service, now=None, max_workers=MAX_WORKERS, max_seconds=None, budgeter=None,
+        cursor=None, compact_rows=COMPACT_ROWS):
+    """
+    Send every due row once and write the outcomes back.
+
+    get_service() is called from the sending threads and must return a
+    service that thread may use (gmail_api.get_service does). Sends still
+    waiting when max_seconds run out are left pending for the next run.
+    With a Cursor, only the rows it points at are read, and the cursor is
+    advanced (the caller saves it). Returns (report, rows) where rows are
+    the rows written back.
+    """
+    started = time.time()
+    if cursor is not None:
+        rows = scan(worksheet, cursor)
+    else:
+        rows = list(enumerate(worksheet.get_values(READ_RANGE), start=1))
+    due, invalid, waiting = find_due(rows, now or started, cursor.sent if cursor is not None else ())
+    deadline = started + max_seconds if max_seconds else None
+
+    def send(row):
+        if deadline and time.time() > deadline:
+            return False, 'deferred'
+        try:
+            message = gmail_api.execute(
+                get_service().users().drafts().send(userId='me', body={'id': row.draft_id}),
+                'drafts.send', budgeter=budgeter
+            )
+        except HttpError as e:
+            row.status = PENDING if gmail_api.is_retryable(e) else FAILED
+            raise  # Anything else (timeouts, resets) leaves the row pending
+        row.status = SENT
+        return True, message['id']
+
+    def on_result(row, success, message):
+        if message == 'deferred':
+            return
+        row.result = message
+        if success:
+            row.sent_at = datetime.now().strftime(TIME_FORMAT)
+
+    report = dispatch(due, send, due_of=lambda row: row.due, max_workers=max_workers, on_result=on_result)
+    written = [row for row in due if row.result] + invalid
+    if written:
+        worksheet.batch_update(status_updates(sorted(written, key=lambda row: row.number)))
+    if cursor is not None:
+        cursor.remember(sent_ids(rows) + [row.draft_id for row in due if row.status == SENT])
+        cursor.advance(rows, waiting + [row.number for row in due if row.status == PENDING])
+        if compact_rows:
+            moved = compact(worksheet, cursor, compact_rows)
+            if moved:
+                print(f"🗄️ Archived {moved} finished rows")
+    return report, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send the due drafts scheduled in the app3 sheet")
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='concurrent drafts.send calls')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='stop starting sends after this long (the rest stay pending)')
+    parser.add_argument('--state', help='cursor file for incremental scans (omit to read the whole sheet)')
+    parser.add_argument('--compact-rows', type=int, default=COMPACT_ROWS,
+                        help='archive finished rows once this many pile up (0 = never; needs --state)')
+    args = parser.parse_args()
+
+    credentials = token_manager.for_info(json.loads(os.environ['GMAIL_TOKEN']), SCOPES).get()
+    worksheet = sheets.get_worksheet(json.loads(os.environ['SHEETS_CREDENTIALS']), os.environ['SHEET_ID'])
+    cursor = Cursor.load(args.state, os.environ['SHEET_ID']) if args.state else None
+
+    report, rows = run(worksheet, lambda: gmail_api.get_service(credentials),
+                       max_workers=args.max_workers, max_seconds=args.max_seconds,
+                       cursor=cursor, compact_rows=args.compact_rows)
+    if cursor is not None:
+        cursor.save(args.state)
+    print(f"📤 {report.summary()}")
+    deferred = sum(1 for _, _, message in report.results if message == 'deferred')
+    if deferred:
+        print(f"⏳ {deferred} due rows ran out of time and stay pending for the next run")
+    for row in rows:
+        if row.status != SENT:
+            print(f"{'⏳' if row.status == PENDING else '❌'} row {row.number} ({row.email}): {row.result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Google Sheets access for the schedule sheet.
+
+Authorizing gspread and opening a spreadsheet each cost round trips (token
+exchange, two metadata reads), so clients are cached per service account
+and worksheet handles per sheet, for the life of the process.
+
+Rows are not appended one API call at a time either. A SheetWriter buffers
+them and writes the buffer with a single append_rows call once it holds
+FLUSH_ROWS rows, or FLUSH_SECONDS after the first unwritten row, from a
+background thread. Sheets allows 60 write requests per minute per user,
+so a campaign of any size costs a handful of writes. A failed write keeps
+its rows at the front of the buffer for the next attempt. flush() writes
+everything now: callers flush when their session is done with a sheet,
+and every writer is flushed at interpreter exit.
+
+    writer = sheets.get_writer(service_account_info, sheet_id)
+    writer.append(row)
+"""
+
+import atexit
+import threading
+import time
+
+import gspread
+from google.oauth2.service_account import Credentials as ServiceAccountCredentials
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+FLUSH_ROWS = 100  # Rows per append_rows call
+FLUSH_SECONDS = 2.0  # Longest a row waits in the buffer
+RETRY_DELAY = 10  # Wait after a failed background write
+
+
+def _account_key(info):
+    return info.get('client_email'), info.get('private_key_id')
+
+
+# ---------------- CLIENTS ---------------- #
+
+_clients = {}
+_worksheets = {}
+_cache_lock = threading.Lock()
+
+
+def get_client(info):
+    """gspread client for service account info, authorized once per process"""
+    key = _account_key(info)
+    with _cache_lock:
+        client = _clients.get(key)
+        if client is None:
+            credentials = ServiceAccountCredentials.from_service_account_info(info, scopes=SCOPES)
+            client = _clients[key] = gspread.authorize(credentials)
+        return client
+
+
+def get_worksheet(info, sheet_id):
+    """First worksheet of a spreadsheet; opened once per process"""
+    key = (_account_key(info), sheet_id)
+    with _cache_lock:
+        worksheet = _worksheets.get(key)
+    if worksheet is None:
+        worksheet = get_client(info).open_by_key(sheet_id).sheet1
+        with _cache_lock:
+            worksheet = _worksheets.setdefault(key, worksheet)
+    return worksheet
+
+
+# ---------------- BUFFERED WRITES ---------------- #
+
+class SheetWriter:
+    """Append buffer for one worksheet, written in batches by size or age"""
+
+    def __init__(self, worksheet, max_rows=FLUSH_ROWS, max_delay=FLUSH_SECONDS):
+        self.worksheet = worksheet
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.stats = {'rows': 0, 'writes': 0, 'failures': 0}
+        self.last_error = None
+        self._rows = []
+        self._deadline = None  # When the oldest unwritten row is due
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # One append_rows at a time keeps rows in order
+        self._closed = False
+        self._thread = None
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._rows)
+
+    def append(self, row):
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Buffer rows; writes inline once the buffer is full, otherwise within
+        max_delay. Once buffered, rows are never lost to a failed write (the
+        background thread retries), so this only raises on a closed writer.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SheetWriter is closed")
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.max_rows
+            if not full and self._deadline is None:
+                self._deadline = time.monotonic() + self.max_delay
+                self._cond.notify()
+            self._start()
+        if full:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Sheet write failed, retrying in {RETRY_DELAY}s: {e}")
+
+    def flush(self):
+        """Write every buffered row now; returns how many were written"""
+        with self._write_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+                self._deadline = None
+            if not rows:
+                return 0
+            try:
+                self.worksheet.append_rows(rows)
+            except Exception as e:
+                with self._cond:
+                    self._rows[:0] = rows
+                    self._deadline = time.monotonic() + RETRY_DELAY
+                    self.stats['failures'] += 1
+                    self.last_error = e
+                    self._cond.notify()
+                raise
+            self.stats['rows'] += len(rows)
+            self.stats['writes'] += 1
+            self.last_error = None
+            return len(rows)
+
+    def close(self):
+        """Stop the background writer and write what is left"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sheet-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._deadline is None or self._deadline > time.monotonic()):
+                    self._cond.wait(None if self._deadline is None else self._deadline - time.monotonic())
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Sheet write failed, retrying in {RETRY_DELAY}s: {e}")
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(info, sheet_id):
+    """Process-wide writer for a sheet, so sessions writing to the same sheet share batches"""
+    key = (_account_key(info), sheet_id)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = SheetWriter(get_worksheet(info, sheet_id))
+        return writer
+
+
+@atexit.register
+def flush_all():
+    for writer in list(_writers.values()):
+        try:
+            writer.flush()
+        except Exception as e:
+            print(f"⚠️ {writer.pending} schedule rows were not written: {e}")
@@ -9,11 +9,19 @@ USAGE:
 4. Keep the script running - it will send emails at scheduled times
 """
 
-import smtplib
+import asyncio
 import time
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+
+from async_engine import AsyncSMTPTransport, run_queue
+from job_store import IndexedJobStore, JobStore
+from jobs import FAILED, IN_FLIGHT, PENDING, SENT, Job
+import mime_builder
+from recipient_loader import load as load_recipients
+from scheduler import HeapQueue, Scheduler, TimingWheel, dispatch
+from smtp_pool import SMTPPool
+from templates import registry
+from worker import run_worker, start_workers
 
 # ═══════════════════════════════════════════════════════════
 # CONFIGURATION - EDIT THIS SECTION
@@ -23,6 +31,25 @@ from email.mime.text import MIMEText
 FROM_EMAIL = 'pavi2468kuk@gmail.com'  # Change this to your email
 APP_PASSWORD = 'your_16_char_app_password'  # Get from https://myaccount.google.com/apppasswords
 
+# SMTP server
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 587
+SMTP_POOL_SIZE = 8  # Logged-in connections kept open and reused across sends
+SMTP_IDLE_TIMEOUT = 120  # Seconds before an unused connection is closed
+
+# Scheduler behaviour
+JOB_DB_PATH = 'scheduled_emails.db'  # Sent/pending state survives restarts here
+QUEUE_BACKEND = 'sqlite'  # 'sqlite' = find due emails with DB queries; 'heap' or 'wheel' = in-memory due index (millions of jobs)
+DUE_BATCH_SIZE = 500  # Max due emails claimed per tick
+MAX_WORKERS = SMTP_POOL_SIZE  # Due emails sent in parallel (1 = one at a time)
+RETRY_DELAY = 60  # Seconds to wait before retrying a failed send
+STATUS_INTERVAL = 600  # Seconds between "still running" status lines
+ASYNC_ENGINE = False  # True = run on the asyncio engine (thousands of sends in flight on one core)
+ASYNC_MAX_IN_FLIGHT = 500  # Max concurrent sends when ASYNC_ENGINE is on
+DISPLAY_LIMIT = 20  # Max emails listed by display_schedule
+WORKERS = 1  # >1 = that many processes share JOB_DB_PATH, each leasing due emails so none is sent twice
+LEASE_SECONDS = 300  # A worker's claimed emails go back to the queue if it hasn't finished them by then
+
 # ═══════════════════════════════════════════════════════════
 # SCHEDULED EMAILS - ADD YOUR EMAILS HERE
 # ═══════════════════════════════════════════════════════════
@@ -34,6 +61,7 @@ SCHEDULED_EMAILS = [
         'recipient_name': 'John',
         'company_intro': "I've been following your team's work in AI-driven utilization review using ML to prioritize cases, improve patient-status decisions, and reduce denial risk; and my background aligns closely with the problems your group focuses on at Optum.",
         'scheduled_time': '2024-12-15 14:30:00',  # YYYY-MM-DD HH:MM:SS format
+        'template': 'standard',  # Optional - a key of TEMPLATES below (defaults to 'standard')
         'sent': False
     },
     {
@@ -48,6 +76,9 @@ SCHEDULED_EMAILS = [
     # Just copy the format above and change the details!
 ]
 
+# Large lists: CSV/JSONL files with the same columns, streamed into the store at startup
+RECIPIENT_FILES = []  # e.g. ['recipients.csv']
+
 # ═══════════════════════════════════════════════════════════
 # EMAIL TEMPLATE - YOUR STANDARD CONTENT
 # ═══════════════════════════════════════════════════════════
@@ -65,74 +96,205 @@ Website: https://pavi2803.notion.site/Pavithra-Senthilkumar-36e0d62aea2f4c8086fd
 LinkedIn: https://www.linkedin.com/in/pavithra-senthilkumar-2803/
 GitHub: https://github.com/pavi2803"""
 
+# Bodies an email can pick with its 'template' key
+TEMPLATES = {
+    'standard': STANDARD_BODY,
+}
+
 # ═══════════════════════════════════════════════════════════
 # EMAIL SENDING FUNCTIONS - DON'T EDIT BELOW THIS LINE
 # ═══════════════════════════════════════════════════════════
 
+# Opened on first use, so importing this module (or spawning a worker) doesn't touch the DB or network
+_STORE = None
+_SMTP_POOL = None
+_SCHEDULER = None
+
+# Each body compiled once, with only the name and intro left to fill per email
+for _name, _body in TEMPLATES.items():
+    registry.add(f'smtp/{_name}', registry['text/intro_email'].bind(experience=_body))
+
 def send_email(to_email, subject, body):
-    """Send an email via Gmail SMTP"""
+    """Send an email via Gmail SMTP (over a pooled, already logged-in connection)"""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(FROM_EMAIL, APP_PASSWORD)
-        server.sendmail(FROM_EMAIL, to_email, msg.as_string())
-        server.quit()
+        # Written as DATA-ready CRLF lines into this thread's buffer and sent from it, uncopied
+        headers = {'From': FROM_EMAIL, 'To': to_email, 'Subject': subject}
+        with mime_builder.writer(smtp=True).write(headers, body, mixed=True) as data:
+            get_smtp_pool().send_data(FROM_EMAIL, to_email, data)
         
         return True, "Email sent successfully"
     except Exception as e:
         return False, str(e)
 
+def open_store():
+    """Open the job store with the due-time index picked by QUEUE_BACKEND"""
+    store = JobStore(JOB_DB_PATH, batch_size=DUE_BATCH_SIZE, lease_seconds=LEASE_SECONDS)
+    if WORKERS > 1:
+        # An in-memory index can't see jobs other workers add or give back
+        return store
+    if QUEUE_BACKEND == 'heap':
+        return IndexedJobStore(store, HeapQueue)
+    if QUEUE_BACKEND == 'wheel':
+        return IndexedJobStore(store, TimingWheel)
+    return store
+
+def get_store():
+    """The job store, opened on first use"""
+    global _STORE
+    if _STORE is None:
+        _STORE = open_store()
+    return _STORE
+
+def get_smtp_pool():
+    """The SMTP connection pool, created on first use"""
+    global _SMTP_POOL
+    if _SMTP_POOL is None:
+        _SMTP_POOL = SMTPPool(SMTP_HOST, SMTP_PORT, FROM_EMAIL, APP_PASSWORD,
+                              size=SMTP_POOL_SIZE, idle_timeout=SMTP_IDLE_TIMEOUT)
+    return _SMTP_POOL
+
+def get_scheduler():
+    """The scheduler over the job store, created on first use"""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = Scheduler(get_store())
+    return _SCHEDULER
+
+def close():
+    """Close the SMTP pool and job store, if they were opened"""
+    global _STORE, _SMTP_POOL, _SCHEDULER
+    if _SMTP_POOL is not None:
+        _SMTP_POOL.close()
+    if _STORE is not None:
+        _STORE.close()
+    _STORE = _SMTP_POOL = _SCHEDULER = None
+
+def add_email(email):
+    """Add an email to the schedule; wakes the scheduler loop if it is sleeping"""
+    job = Job.from_email(email, get_store().texts)
+    get_scheduler().add(job.due, job)
+
+def load_schedule():
+    """Copy SCHEDULED_EMAILS and RECIPIENT_FILES into the job store (already-stored emails are skipped)"""
+    store = get_store()
+    recovered = store.recover_in_flight()
+    if recovered:
+        print(f"♻️  Re-queued {recovered} email(s) whose worker never finished them")
+    queued = len(store.add_many([Job.from_email(email, store.texts) for email in SCHEDULED_EMAILS]))
+    for path in RECIPIENT_FILES:
+        report = load_recipients(path, store, batch_size=DUE_BATCH_SIZE, templates=TEMPLATES)
+        print(f"📥 {path}: {report.summary()}")
+        for line_no, error in report.errors:
+            print(f"   ❌ line {line_no}: {error}")
+        queued += report.queued
+    return queued
+
+def build_body(job):
+    """Create full email body with your format"""
+    texts = get_store().texts
+    template = registry[f'smtp/{texts[job.template_id]}']
+    return template.render(recipient_name=job.recipient_name, company_intro=texts[job.intro_id])
+
+def send_job(job):
+    """Build the full body for a scheduled email and send it"""
+    return send_email(job.to, job.subject, build_body(job))
+
+def record_result(job, success, message):
+    """Persist the outcome of one send (called as each send completes)"""
+    if success:
+        print(f"✅ {job.to}: {message}")
+        job.status = SENT
+        get_store().mark_sent(job.id)
+    else:
+        print(f"❌ {job.to}: Failed: {message}")
+        # Retry later instead of on the next scan
+        get_store().mark_failed(job.id, message, retry_at=time.time() + RETRY_DELAY)
+
 def check_and_send():
-    """Check for emails that need to be sent"""
-    current_time = datetime.now()
-    sent_count = 0
+    """Send the emails that are due (only due rows are read from the store)"""
+    due_emails = get_scheduler().pop_due(limit=DUE_BATCH_SIZE)
+    if not due_emails:
+        return 0
     
-    for email in SCHEDULED_EMAILS:
-        if email['sent']:
-            continue
-            
-        scheduled_time = datetime.strptime(email['scheduled_time'], '%Y-%m-%d %H:%M:%S')
-        
-        if scheduled_time <= current_time:
-            print(f"\n⏰ Sending email to {email['to']}...")
-            
-            # Create full email body with your format
-            full_body = f"Hi {email['recipient_name']},\n\n{email['company_intro']}\n\n{STANDARD_BODY}"
-            
-            success, message = send_email(email['to'], email['subject'], full_body)
-            
-            if success:
-                print(f"✅ {message}")
-                email['sent'] = True
-                sent_count += 1
-            else:
-                print(f"❌ Failed: {message}")
+    print(f"\n⏰ Sending {len(due_emails)} due email(s)...")
+    report = dispatch(
+        due_emails,
+        send_job,
+        due_of=lambda job: job.due,
+        max_workers=MAX_WORKERS,
+        on_result=record_result
+    )
+    print(f"📈 {report.summary()}")
     
-    return sent_count
+    # Commit this tick's status changes in one transaction
+    get_store().flush()
+    return report.sent
+
+async def run_async():
+    """Send everything in the store on the asyncio engine; returns its DispatchReport"""
+    transport = AsyncSMTPTransport(SMTP_HOST, SMTP_PORT, FROM_EMAIL, APP_PASSWORD,
+                                   connections=SMTP_POOL_SIZE)
+    
+    async def send_job_async(job):
+        message = await transport.send(job.to, job.subject, build_body(job))
+        return True, message
+    
+    try:
+        return await run_queue(
+            get_store(),
+            send_job_async,
+            due_of=lambda job: job.due,
+            max_in_flight=ASYNC_MAX_IN_FLIGHT,
+            batch_size=DUE_BATCH_SIZE,
+            on_result=record_result
+        )
+    finally:
+        await transport.close()
 
-def display_schedule():
+def worker_main():
+    """One worker process when WORKERS > 1 (each opens its own store and SMTP pool)"""
+    store = get_store()
+    try:
+        # Lease a few sends' worth at a time so due emails spread across the workers
+        sent, failed = run_worker(store, send_job, record_result, max_workers=MAX_WORKERS,
+                                  batch_size=min(DUE_BATCH_SIZE, MAX_WORKERS * 4))
+        print(f"👷 {store.worker_id}: {sent} sent, {failed} failed")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close()
+
+def display_schedule(limit=DISPLAY_LIMIT):
     """Display the current schedule"""
     print("\n" + "="*70)
     print("📋 SCHEDULED EMAILS")
     print("="*70)
     
-    pending_count = sum(1 for e in SCHEDULED_EMAILS if not e['sent'])
-    sent_count = sum(1 for e in SCHEDULED_EMAILS if e['sent'])
+    store = get_store()
+    counts = store.counts()
+    total = sum(counts.values())
+    pending_count = counts[PENDING] + counts[IN_FLIGHT]
     
-    print(f"\nTotal: {len(SCHEDULED_EMAILS)} emails | ⏳ Pending: {pending_count} | ✅ Sent: {sent_count}\n")
+    print(f"\nTotal: {total} emails | ⏳ Pending: {pending_count} | ✅ Sent: {counts[SENT]} | ❌ Failed: {counts[FAILED]}\n")
     
-    for i, email in enumerate(SCHEDULED_EMAILS, 1):
-        status = "✅ SENT" if email['sent'] else "⏳ PENDING"
-        print(f"{i}. {status} | {email['scheduled_time']} | {email['to']}")
+    status_labels = {PENDING: "⏳ PENDING", IN_FLIGHT: "📤 SENDING", SENT: "✅ SENT", FAILED: "❌ FAILED"}
+    for i, job in enumerate(store.iter_jobs(limit=limit), 1):
+        print(f"{i}. {status_labels[job.status]} | {job.scheduled_time} | {job.to}")
+    
+    if total > limit:
+        print(f"... and {total - limit} more")
     
     print("\n" + "="*70)
 
+def print_done():
+    store = get_store()
+    failed = store.counts()[FAILED]
+    if failed:
+        print(f"\n⚠️  Done - {failed} email(s) failed after {store.max_attempts} attempts")
+    else:
+        print("\n🎉 All scheduled emails have been sent!")
+    print("You can close this window now.")
+
 def main():
     """Main scheduler loop"""
     print("""
@@ -142,7 +304,7 @@ def main():
 
 Configuration:
 📧 From: {FROM_EMAIL}
-🔄 Check interval: 60 seconds
+⏱️  Wakes at each scheduled send time
 
 """.format(FROM_EMAIL=FROM_EMAIL))
     
@@ -158,9 +320,16 @@ Configuration:
         print("\n💡 Example: APP_PASSWORD = 'abcd efgh ijkl mnop'")
         return
     
-    if not SCHEDULED_EMAILS:
-        print("❌ ERROR: No emails scheduled!")
-        print("Add emails to the SCHEDULED_EMAILS list in the script.")
+    load_schedule()
+    scheduler = get_scheduler()
+    
+    if scheduler.next_due() is None:
+        if sum(get_store().counts().values()) == 0:
+            print("❌ ERROR: No emails scheduled!")
+            print("Add emails to the SCHEDULED_EMAILS list in the script.")
+        else:
+            display_schedule()
+            print("\n🎉 Nothing left to send - all scheduled emails are done!")
         return
     
     display_schedule()
@@ -169,11 +338,23 @@ Configuration:
     print("💡 Tip: Keep this window open and the script will send emails automatically!")
     
     try:
-        check_count = 0
+        if WORKERS > 1:
+            print(f"👷 Starting {WORKERS} worker processes")
+            start_workers(WORKERS, worker_main)
+            display_schedule()
+            print_done()
+            return
+        
+        if ASYNC_ENGINE:
+            report = asyncio.run(run_async())
+            print(f"\n📈 {report.summary()}")
+            display_schedule()
+            print_done()
+            return
+        
+        last_status = time.time()
         while True:
-            check_count += 1
-            
-            # Check for emails to send
+            # Send whatever is due
             sent = check_and_send()
             
             if sent > 0:
@@ -181,23 +362,26 @@ Configuration:
                 display_schedule()
             
             # Check if all emails are sent
-            if all(email['sent'] for email in SCHEDULED_EMAILS):
-                print("\n🎉 All scheduled emails have been sent!")
-                print("You can close this window now.")
+            if scheduler.next_due() is None:
+                print_done()
                 break
             
             # Show periodic status
-            if check_count % 10 == 0:  # Every 10 minutes
-                pending = sum(1 for e in SCHEDULED_EMAILS if not e['sent'])
-                print(f"⏰ {datetime.now().strftime('%I:%M %p')} - Still running... {pending} emails pending")
+            if time.time() - last_status >= STATUS_INTERVAL:
+                last_status = time.time()
+                print(f"⏰ {datetime.now().strftime('%I:%M %p')} - Still running... {len(scheduler)} emails pending")
             
-            time.sleep(60)  # Check every 60 seconds
+            # Sleep until the next email is due (or a new one is added)
+            scheduler.wait(timeout=STATUS_INTERVAL)
             
     except KeyboardInterrupt:
         print("\n\n⏹️  Scheduler stopped by user")
-        print(f"📊 Status: {sum(1 for e in SCHEDULED_EMAILS if e['sent'])} sent, {sum(1 for e in SCHEDULED_EMAILS if not e['sent'])} pending")
+        counts = get_store().counts()
+        print(f"📊 Status: {counts[SENT]} sent, {counts[PENDING] + counts[IN_FLIGHT]} pending")
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
+    finally:
+        close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Pool of persistent, authenticated SMTP connections.
+
+Opening a connection costs a TCP + TLS + AUTH handshake, which is far
+more than sending a message, and repeated logins get throttled by the
+provider. The pool keeps up to `size` logged-in sessions open and sends
+many messages over each one.
+
+- Connections idle longer than `health_check_after` are probed with NOOP
+  before reuse.
+- A 421 reply or a dropped socket discards the connection, and the send is
+  retried once on a fresh one if it failed before the whole message was
+  sent. Once the final '.' is out the server may already have queued the
+  message, so the error is raised rather than risking a duplicate.
+- A refusal the server answered (bad recipient, rejected message) leaves
+  the session usable, and the connection goes back to the pool.
+- Connections idle longer than `idle_timeout` are closed by a reaper thread.
+"""
+
+import smtplib
+import threading
+import time
+
+# Errors that mean "this connection is dead, reconnect and try again"
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+# Refusals the server answered; after its RSET the session can carry the next message
+ANSWERED_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+def _is_reconnectable(error):
+    if isinstance(error, RECONNECT_ERRORS):
+        return True
+    # 421 = service not available, closing transmission channel
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code == 421
+
+
+def _is_usable(server, error):
+    """The session survived `error` and can go back to the pool"""
+    return server.sock is not None and isinstance(error, ANSWERED_ERRORS) and not _is_reconnectable(error)
+
+
+class _Connection:
+    __slots__ = ('server', 'last_used')
+
+    def __init__(self, server):
+        self.server = server
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Thread-safe pool of logged-in smtplib.SMTP sessions"""
+
+    def __init__(self, host, port, username, password, size=4, idle_timeout=120,
+                 health_check_after=15, use_tls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+        self._idle = []  # LIFO so the warmest connection is reused first
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = threading.Event()
+        self._reaper = None
+        self.stats = {'connects': 0, 'reconnects': 0, 'health_checks': 0, 'reaped': 0, 'sent': 0}
+
+    # ---------- connection lifecycle ---------- #
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            _quit(server)
+            raise
+        with self._lock:
+            self.stats['connects'] += 1
+        self._start_reaper()
+        return _Connection(server)
+
+    def _is_healthy(self, conn):
+        with self._lock:
+            self.stats['health_checks'] += 1
+        try:
+            return conn.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                idle_for = time.monotonic() - conn.last_used
+                if idle_for > self.idle_timeout:
+                    _quit(conn.server)
+                elif idle_for < self.health_check_after or self._is_healthy(conn):
+                    return conn
+                else:
+                    _quit(conn.server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken=False):
+        if broken or self._closed.is_set():
+            _quit(conn.server)
+        else:
+            conn.last_used = time.monotonic()
+            with self._lock:
+                self._idle.append(conn)
+        self._slots.release()
+
+    # ---------- sending ---------- #
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        """Send a message over a pooled connection, reconnecting once if it died before the message went out"""
+        return self.send_data(from_addr, to_addrs, _data_ready(msg))
+
+    def send_data(self, from_addr, to_addrs, data):
+        """
+        sendmail() for a message that is already DATA-ready: CRLF line ends,
+        dot-stuffed and ending in '.\\r\\n', as mime_builder's SMTP writer
+        makes it. The bytes are written to the socket as they are, without
+        the copies smtplib makes to fix line ends and dot-stuff.
+        """
+        return self._send(lambda server: _send_data(server, from_addr, to_addrs, data))
+
+    def _send(self, transaction):
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                result = transaction(conn.server)
+            except Exception as e:
+                self._release(conn, broken=not _is_usable(conn.server, e))
+                if attempt == 0 and _is_reconnectable(e) and not getattr(e, 'after_data', False):
+                    with self._lock:
+                        self.stats['reconnects'] += 1
+                    continue
+                raise
+            self._release(conn)
+            with self._lock:
+                self.stats['sent'] += 1
+            return result
+
+    # ---------- idle reaping ---------- #
+
+    def _start_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='smtp-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._closed.wait(interval):
+            self.close_idle()
+
+    def close_idle(self):
+        """Close connections that have been idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            stale = [c for c in self._idle if c.last_used < cutoff]
+            self._idle = [c for c in self._idle if c.last_used >= cutoff]
+            self.stats['reaped'] += len(stale)
+        for conn in stale:
+            _quit(conn.server)
+        return len(stale)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            _quit(conn.server)
+
+
+def _reset(server, code):
+    # What smtplib does after a refused command: 421 means the server is closing on us
+    if code == 421:
+        server.close()
+        return
+    try:
+        server.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def _data_ready(msg):
+    """What smtplib's sendmail() and data() send for `msg`: CRLF line ends, dot-stuffed, ending in '.\\r\\n'"""
+    if isinstance(msg, str):
+        msg = smtplib._fix_eols(msg).encode('ascii')
+    data = smtplib._quote_periods(msg)
+    if data[-2:] != b'\r\n':
+        data += b'\r\n'
+    return data + b'.\r\n'
+
+
+def _send_data(server, from_addr, to_addrs, data):
+    """smtplib's sendmail() transaction, sending `data` as it is"""
+    server.ehlo_or_helo_if_needed()
+    if isinstance(to_addrs, str):
+        to_addrs = [to_addrs]
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        _reset(server, code)
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for addr in to_addrs:
+        code, resp = server.rcpt(addr)
+        if code not in (250, 251):
+            refused[addr] = (code, resp)
+        if code == 421:
+            server.close()
+            raise smtplib.SMTPRecipientsRefused(refused)
+    if len(refused) == len(to_addrs):
+        _reset(server, 0)
+        raise smtplib.SMTPRecipientsRefused(refused)
+    server.putcmd('data')
+    code, resp = server.getreply()
+    if code != 354:
+        _reset(server, code)
+        raise smtplib.SMTPDataError(code, resp)
+    server.send(data)
+    # The message is out: from here the server may have queued it, whatever happens to the reply
+    try:
+        code, resp = server.getreply()
+        if code != 250:
+            _reset(server, code)
+            raise smtplib.SMTPDataError(code, resp)
+    except smtplib.SMTPException as e:
+        e.after_data = True
+        raise
+    return refused
+
+
+def _quit(server):
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
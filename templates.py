@@ -0,0 +1,302 @@
+"""
+Outreach templates, compiled once and shared by every send path.
+
+A template is text with {slot} placeholders in str.format syntax ({{ and }}
+are literal braces, and !r/!s/!a conversions and :format specs work). Each
+template is split into static segments and slots once, and compiled into a
+function that renders it as a single f-string, so a render builds exactly
+one string. render_batch() renders a whole list of recipients in one list
+comprehension.
+
+bind() folds campaign-wide slots (experience section, closing, signature)
+into the static text up front, so only the per-recipient slots are left to
+fill. Binding another Template splices its segments in, slots included.
+
+`registry` holds the sections and layouts the Gmail apps, the Outlook app
+and the SMTP scheduler send:
+
+    email = registry['html/email'].bind(experience=registry['html/ml_systems'], closing='')
+    bodies = email.render_batch(recipients)  # dicts with recipient_name, company_intro
+"""
+
+import functools
+import string
+
+
+class Slot:
+    """A {name!conversion:spec} placeholder"""
+
+    __slots__ = ('name', 'conversion', 'spec')
+
+    def __init__(self, name, conversion=None, spec=''):
+        self.name = name
+        self.conversion = conversion
+        self.spec = spec
+
+    def __repr__(self):
+        return f'Slot({self.name!r})'
+
+    @property
+    def source(self):
+        conversion = f'!{self.conversion}' if self.conversion else ''
+        spec = f':{self.spec}' if self.spec else ''
+        return f'{{{self.name}{conversion}{spec}}}'
+
+    def fill(self, value):
+        """What rendering puts in place of this slot for `value`"""
+        if self.conversion:
+            value = _CONVERSIONS[self.conversion](value)
+        return format(value, self.spec)
+
+
+_CONVERSIONS = {'r': repr, 's': str, 'a': ascii}
+
+
+def parse(source):
+    """Split `source` into a list of static strings and Slots"""
+    segments = []
+    for literal, name, spec, conversion in string.Formatter().parse(source):
+        if literal:
+            segments.append(literal)
+        if name is None:
+            continue
+        if not name.isidentifier():
+            raise ValueError(f"unsupported placeholder {{{name}}}: use a plain {{name}}")
+        if '{' in spec:
+            raise ValueError(f"nested placeholders are not supported in {{{name}:{spec}}}")
+        segments.append(Slot(name, conversion, spec))
+    return segments
+
+
+def _merge(segments):
+    merged = []
+    for segment in segments:
+        if isinstance(segment, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += segment
+        elif segment != '':
+            merged.append(segment)
+    return merged
+
+
+class Template:
+    """A compiled template; render() fills its slots from a mapping and/or keywords"""
+
+    def __init__(self, source='', name=None, segments=None):
+        self.name = name
+        self.segments = tuple(_merge(parse(source) if segments is None else segments))
+        self.slots = tuple(dict.fromkeys(s.name for s in self.segments if isinstance(s, Slot)))
+        self._render, self._render_batch = self._compile()
+
+    @property
+    def source(self):
+        return ''.join(
+            s.source if isinstance(s, Slot) else s.replace('{', '{{').replace('}', '}}')
+            for s in self.segments
+        )
+
+    def __repr__(self):
+        return f'Template({self.name or self.source[:40]!r}, slots={self.slots})'
+
+    def _compile(self):
+        # Generated code only names constants and slot keys by variable, so
+        # nothing from the template text ends up in the source being compiled
+        constants, parts = {}, []
+        for i, segment in enumerate(self.segments):
+            if isinstance(segment, str):
+                constants[f'_s{i}'] = segment
+                parts.append(f'_s{i}')
+                continue
+            constants[f'_k{i}'] = segment.name
+            value = f'c[_k{i}]'
+            if segment.conversion:
+                value = f'{_CONVERSIONS[segment.conversion].__name__}({value})'
+            if segment.spec:
+                constants[f'_f{i}'] = segment.spec
+                value = f'format({value}, _f{i})'
+            parts.append(value)
+        expression = "f'" + ''.join(f'{{{part}}}' for part in parts) + "'"
+        code = (
+            f"def render(c):\n    return {expression}\n"
+            f"def render_batch(rows):\n    return [{expression} for c in rows]\n"
+        )
+        namespace = dict(constants)
+        exec(code, namespace)
+        return namespace['render'], namespace['render_batch']
+
+    def render(self, context=None, /, **values):
+        """Render one message; raises KeyError for a slot with no value"""
+        if values:
+            context = {**context, **values} if context else values
+        return self._render(context or {})
+
+    def render_batch(self, contexts):
+        """Render one message per mapping in `contexts`"""
+        return self._render_batch(contexts if isinstance(contexts, (list, tuple)) else list(contexts))
+
+    def bind(self, **values):
+        """Copy with some slots filled in for good (str values) or replaced by a Template's segments"""
+        segments = []
+        for segment in self.segments:
+            if not isinstance(segment, Slot) or segment.name not in values:
+                segments.append(segment)
+                continue
+            value = values[segment.name]
+            if isinstance(value, Template) and not (segment.conversion or segment.spec):
+                segments.extend(value.segments)
+            else:
+                segments.append(segment.fill(value))
+        return Template(name=self.name, segments=segments)
+
+
+@functools.lru_cache(maxsize=1024)
+def compiled(source):
+    """Compiled Template for ad hoc text such as a per-row intro (cached by source)"""
+    return Template(source)
+
+
+class TemplateRegistry:
+    """Named templates shared across send paths"""
+
+    def __init__(self):
+        self._templates = {}
+
+    def register(self, name, source, **bound):
+        """Compile `source` under `name`, with `bound` slots bound in (see Template.bind)"""
+        template = Template(source, name=name)
+        return self.add(name, template.bind(**bound) if bound else template)
+
+    def add(self, name, template):
+        """Register an already compiled Template"""
+        template.name = name
+        self._templates[name] = template
+        return template
+
+    def __getitem__(self, name):
+        return self._templates[name]
+
+    def __contains__(self, name):
+        return name in self._templates
+
+    def names(self, prefix=''):
+        return [name for name in self._templates if name.startswith(prefix)]
+
+    def render(self, name, context=None, /, **values):
+        return self._templates[name].render(context, **values)
+
+    def render_batch(self, name, contexts):
+        return self._templates[name].render_batch(contexts)
+
+
+registry = TemplateRegistry()
+
+
+# ---------------- HTML (Gmail apps) ---------------- #
+
+registry.register('html/agent_paper', """
+<p>I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions (link: <a href="https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1">https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1</a>) and have built end-to-end ML systems including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.</p>
+""")
+
+registry.register('html/ml_systems', """
+<p>My Relevant experience includes:</p>
+<p><b>• Applied ML and Finetuning LLM:</b> Built an Agentic vision-language model for medical image classification, achieving ~0.90 ROC-AUC across multi-site data, with ownership across dataset design, modeling, and validation.</p>
+<p><b>• End-to-End ML Delivery:</b> Developed and deployed large-scale risk prediction models on 1.5M+ records using XGBoost/LightGBM, including feature engineering, explainability, evaluation, and production workflows.</p>
+<p><b>• ML Systems & Collaboration:</b> Experience with reproducible pipelines, model tracking, scalable inference, and close collaboration with cross-functional stakeholders.</p>
+""")
+
+registry.register('html/software', """
+<p>My Relevant experience includes:</p>
+<p><b>• Backend Development & Data Pipelines:</b> Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records with optimized ETL pipelines and database integrations.</p>
+<p><b>• System Architecture & Performance:</b> Implemented distributed systems with performance optimization, achieving ~2× throughput improvements through efficient resource management and parallel processing.</p>
+<p><b>• Full-Stack Development & Deployment:</b> Built and deployed production applications with end-to-end ownership, including API development, cloud infrastructure (AWS), CI/CD pipelines, and monitoring.</p>
+""")
+
+registry.register('html/signature', """
+<p>Thank you,<br>
+Pavithra<br>
+<a href="https://pavi2803.github.io/pavithrasenthilkumar.github.io/">Website</a> | 
+<a href="https://www.linkedin.com/in/pavithra-senthilkumar-2803/">LinkedIn</a> | 
+<a href="https://github.com/pavi2803">GitHub</a></p>
+""")
+
+# closing: optional outro/resume paragraphs, each starting with "\n"
+registry.register(
+    'html/email',
+    "<p>Hi {recipient_name},</p>\n<p>{company_intro}</p>\n{experience}{closing}\n{signature}",
+    signature=registry['html/signature'],
+)
+
+
+# ---------------- HTML (Outlook) ---------------- #
+
+registry.register('outlook/recruiter', """
+<p>I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions, 
+(link: <a href="https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1">https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1</a>) and have built end-to-end ML systems 
+including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.</p>
+""")
+
+registry.register('outlook/software', """
+<p><b>• Backend Development & Data Pipelines:</b> Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records.</p>
+<p><b>• System Architecture & Performance:</b> Implemented distributed systems with ~2× throughput improvements.</p>
+<p><b>• Full-Stack & Deployment:</b> Built production ML systems with APIs, AWS, CI/CD, and monitoring.</p>
+""")
+
+registry.register('outlook/hiring_manager', registry['outlook/recruiter'].source)
+
+registry.register(
+    'outlook/email',
+    "\n    <p>Hi {recipient_name},</p>\n    <p>{company_intro}</p>\n    {experience}\n    {signature}\n    ",
+    signature=registry['html/signature'],
+)
+
+
+# ---------------- PLAIN TEXT (Gmail personal, SMTP) ---------------- #
+
+registry.register('text/recruiter', """
+I recently published work on Agentic MoE based architecture for diagnosis of dementia conditions, (link: https://www.biorxiv.org/content/10.1101/2025.09.05.674598v1) and have built end-to-end ML systems including vision-language models for medical imaging (0.90 ROC-AUC) and risk prediction on 1.5M+ records.
+""")
+
+registry.register('text/hiring_manager', registry['text/recruiter'].source)
+
+registry.register('text/software', """
+My Relevant experience includes:
+
+• Backend Development & Data Pipelines: Engineered scalable data workflows using Apache Spark and Hive SQL, processing 1.5M+ records with optimized ETL pipelines and database integrations.
+
+• System Architecture & Performance: Implemented distributed systems with performance optimization, achieving ~2× throughput improvements through efficient resource management and parallel processing.
+
+• Full-Stack Development & Deployment: Built and deployed production applications with end-to-end ownership, including API development, cloud infrastructure (AWS), CI/CD pipelines, and monitoring.
+""")
+
+registry.register('text/signature', """
+Thank you,
+Pavithra
+Website: https://pavi2803.github.io/pavithrasenthilkumar.github.io/
+LinkedIn: https://www.linkedin.com/in/pavithra-senthilkumar-2803/
+GitHub: https://github.com/pavi2803""")
+
+registry.register('text/standard', """My Relevant experience includes:
+
+ • Advanced Modeling: Built MAVeRiC-AD, a vision-language ensemble for Alzheimer's MRI classification (0.90 ROC-AUC across multi-site data). Responsible for dataset design, modeling, and multi-center validation.
+
+ • End-to-End Delivery: Developed and deployed HIPAA-compliant risk prediction systems on 1.5M+ patient records using XGBoost/LightGBM with SHAP explainability—covering data engineering, modeling, evaluation, and operationalization.
+
+ • System-Level Work: Experienced with reproducible pipelines, model tracking, scalable inference, and cross-functional collaboration with clinical and product teams.
+
+I'm exploring opportunities where I can contribute to both high-level ML strategy and hands-on development within healthcare AI. If your group is hiring, or if there's someone you'd recommend I connect with, I'd appreciate the guidance.
+
+Thank you,
+Pavithra
+Website: https://pavi2803.notion.site/Pavithra-Senthilkumar-36e0d62aea2f4c8086fd279363c59b34
+LinkedIn: https://www.linkedin.com/in/pavithra-senthilkumar-2803/
+GitHub: https://github.com/pavi2803""")
+
+# closing: optional outro/resume paragraphs, each starting with "\n\n"
+registry.register(
+    'text/email',
+    "Hi {recipient_name},\n\n{company_intro}\n\n{experience}{closing}\n\n{signature}",
+    signature=registry['text/signature'],
+)
+
+# experience carries its own sign-off (text/standard, simple_app's TEMPLATES)
+registry.register('text/intro_email', "Hi {recipient_name},\n\n{company_intro}\n\n{experience}")
+registry.register('text/greeting_email', "Hi {recipient_name},\n\n{experience}")
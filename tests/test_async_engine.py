@@ -0,0 +1,201 @@
+"""Asyncio engine: timers, the in-flight cap, draining queues and the SMTP transport"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from async_engine import AsyncScheduler, AsyncSMTPTransport, SMTPError, run_queue
+from benchmarks.standins import StandinSMTPServer
+from job_store import IndexedJobStore, JobStore
+from jobs import DEFAULT_TEMPLATE, SENT, Job
+from scheduler import HeapQueue, TimingWheel
+
+DELAY = 0.2
+
+
+def test_timers_fire_at_their_due_times():
+    fired = {}
+
+    async def send(job):
+        fired[job] = time.time()
+        return True, 'ok'
+
+    async def main():
+        engine = AsyncScheduler(send)
+        start = time.time()
+        engine.add(start + 2 * DELAY, 'later')
+        engine.add(start + DELAY, 'sooner')
+        engine.add(start - 60, 'overdue')
+        assert engine.pending == 3
+        await engine.join()
+        engine.close()
+        return start, engine.report
+
+    start, report = asyncio.run(main())
+
+    assert sorted(fired, key=fired.get) == ['overdue', 'sooner', 'later']
+    assert fired['overdue'] - start < DELAY
+    assert fired['sooner'] >= start + DELAY
+    assert fired['later'] >= start + 2 * DELAY
+    assert report.sent == 3
+
+
+def test_in_flight_sends_are_capped():
+    in_flight, peak = 0, 0
+
+    async def send(job):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True, 'ok'
+
+    async def main():
+        engine = AsyncScheduler(send, max_in_flight=3)
+        for job in range(30):
+            engine.add(time.time(), job)
+        await engine.join()
+        engine.close()
+        return engine.report
+
+    assert asyncio.run(main()).sent == 30
+    assert peak == 3
+
+
+def test_results_are_recorded_off_the_event_loop():
+    threads = set()
+
+    async def send(job):
+        return job % 2 == 0, 'ok'
+
+    def on_result(job, success, message):
+        threads.add(threading.current_thread().name)
+
+    async def main():
+        engine = AsyncScheduler(send, on_result=on_result)
+        for job in range(10):
+            engine.add(time.time(), job)
+        await engine.join()  # returns only once every result is recorded
+        engine.close()
+        return engine.report
+
+    report = asyncio.run(main())
+    assert (report.sent, report.failed) == (5, 5)
+    assert len(threads) == 1 and threads.pop().startswith('record-result')
+
+
+class CountingQueue(HeapQueue):
+    """HeapQueue that tracks how many popped jobs have no result yet"""
+
+    def __init__(self):
+        super().__init__()
+        self.outstanding = self.peak = 0
+
+    def pop_due(self, now, limit=None):
+        jobs = super().pop_due(now, limit)
+        self.outstanding += len(jobs)
+        self.peak = max(self.peak, self.outstanding)
+        return jobs
+
+
+def test_run_queue_drains_a_heap_within_max_pending():
+    queue = CountingQueue()
+    now = time.time()
+    for job in range(500):
+        queue.push(now - 1 + job / 1000, job)
+    sent = []
+
+    async def send(job):
+        await asyncio.sleep(0.001)
+        return True, 'ok'
+
+    def on_result(job, success, message):
+        sent.append(job)
+        queue.outstanding -= 1
+
+    report = asyncio.run(run_queue(queue, send, due_of=lambda job: now, max_in_flight=10, batch_size=100,
+                                   on_result=on_result, max_pending=25))
+
+    assert report.sent == 500
+    assert sorted(sent) == list(range(500))
+    assert len(queue) == 0
+    assert queue.peak <= 25
+
+
+@pytest.mark.parametrize('index', [None, HeapQueue, TimingWheel])
+def test_run_queue_drains_a_job_store_with_retries(tmp_path, index):
+    store = JobStore(str(tmp_path / 'jobs.db'), max_attempts=3)
+    if index:
+        store = IndexedJobStore(store, index)
+    now = int(time.time())
+    store.add_many([
+        Job(None, now - 1, f'{i}@example.com', 'S', 'N', store.texts.intern('Intro'),
+            store.texts.intern(DEFAULT_TEMPLATE))
+        for i in range(300)
+    ])
+    attempts = {}
+
+    async def send(job):
+        attempts[job.id] = attempts.get(job.id, 0) + 1
+        return attempts[job.id] > 1, 'ok'  # every job fails once
+
+    def on_result(job, success, message):
+        if success:
+            store.mark_sent(job.id)
+        else:
+            store.mark_failed(job.id, message, retry_at=time.time())
+
+    report = asyncio.run(run_queue(store, send, due_of=lambda job: job.due, max_in_flight=20,
+                                   on_result=on_result))
+
+    assert (report.sent, report.failed) == (300, 300)
+    assert store.counts()[SENT] == 300
+    assert store.next_due() is None
+    store.close()
+
+
+# ---------------- SMTP ---------------- #
+
+def _transport(server):
+    return AsyncSMTPTransport('127.0.0.1', server.port, 'me@example.com', 'secret', use_tls=False, connections=1)
+
+
+def test_smtp_drop_after_data_is_not_resent():
+    async def main(server):
+        transport = _transport(server)
+        try:
+            with pytest.raises(ConnectionError) as raised:
+                await transport.send('you@example.com', 'Hi', 'Hello')
+            assert raised.value.after_data
+        finally:
+            await transport.close()
+
+    with StandinSMTPServer(drop_after_data=1.0) as server:
+        asyncio.run(main(server))
+
+    assert server.stats['messages'] == 1
+    assert server.stats['connections'] == 1
+
+
+def test_smtp_421_before_data_is_retried_and_refusals_keep_the_connection():
+    async def main(server):
+        transport = _transport(server)
+        try:
+            for _ in range(4):
+                await transport.send('you@example.com', 'Hi', 'Hello')
+            server.rules.errors = {550: 1.0}
+            for _ in range(3):
+                with pytest.raises(SMTPError):
+                    await transport.send('you@example.com', 'Hi', 'Hello')
+        finally:
+            await transport.close()
+
+    with StandinSMTPServer(messages_per_connection=2) as server:
+        asyncio.run(main(server))
+
+    assert server.stats['messages'] == 4
+    assert server.stats['faults'] == 3
+    assert server.stats['connections'] == 3  # one per two messages; the refusals reuse the third
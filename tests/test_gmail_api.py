@@ -0,0 +1,163 @@
+"""Gmail quota budgeter and request execution against the API stand-in"""
+
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+import gmail_api
+from benchmarks.standins import Rules, StandinAPIServer
+from gmail_api import QUOTA_UNITS, QuotaBudgeter
+
+
+class Clock:
+    """Stands in for the time module inside gmail_api: sleeping just moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(gmail_api, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def api():
+    with StandinAPIServer() as api:
+        yield api
+
+
+def _service(api):
+    return build('gmail', 'v1', credentials=Credentials('token'), client_options={'api_endpoint': api.url + '/'})
+
+
+def _draft(service, i=0):
+    return service.users().drafts().create(userId='me', body={'message': {'raw': f'draft {i}'}})
+
+
+# ---------------- QUOTA BUDGETER ---------------- #
+
+def test_reservations_queue_in_order(clock):
+    budgeter = QuotaBudgeter(100)
+
+    waits = [budgeter.reserve('drafts.create') for _ in range(15)]
+
+    # The burst is free; after it each caller waits for its own 10 units, behind the ones before it
+    assert waits[:10] == [0.0] * 10
+    assert waits[10:] == pytest.approx([0.1, 0.2, 0.3, 0.4, 0.5])
+    assert budgeter.metrics['waits'] == 5
+
+
+def test_acquire_sleeps_only_for_the_deficit(clock):
+    budgeter = QuotaBudgeter(100)
+    budgeter.acquire('messages.send')
+    assert clock.sleeps == []
+
+    clock.now += 0.05  # 5 units back
+    budgeter.acquire('drafts.create')
+    assert clock.sleeps == pytest.approx([0.05])
+
+    budgeter.acquire('drafts.create', count=3)
+    assert clock.sleeps == pytest.approx([0.05, 0.3])
+
+
+def test_penalize_empties_the_bucket_for_that_long(clock):
+    budgeter = QuotaBudgeter(100)
+    budgeter.penalize(2)
+
+    assert budgeter.budget() == pytest.approx(-200)
+    assert budgeter.reserve('drafts.create') == pytest.approx(2.1)
+    clock.now += 10
+    assert budgeter.budget() == budgeter.capacity
+
+
+@pytest.mark.parametrize('status', [429, 403])  # rateLimitExceeded, userRateLimitExceeded
+def test_execute_backs_off_and_retries_rate_limits(clock, api, status):
+    api.rules['gmail'] = Rules(errors={status: 1.0})
+    budgeter = QuotaBudgeter()
+
+    with pytest.raises(HttpError):
+        gmail_api.execute(_draft(_service(api)), 'drafts.create', budgeter=budgeter, max_retries=2)
+
+    assert api.stats['faults'] == 3
+    assert budgeter.metrics['rate_limited'] == 2
+    assert budgeter.metrics['units'] == 3 * QUOTA_UNITS['drafts.create']
+    assert sum(clock.sleeps) >= 0.5 + 1  # the jittered backoff drained the bucket before each retry
+
+
+def test_execute_raises_other_errors_at_once(clock, api):
+    api.rules['gmail'] = Rules(errors={503: 1.0})
+    budgeter = QuotaBudgeter()
+
+    with pytest.raises(HttpError) as raised:
+        gmail_api.execute(_draft(_service(api)), 'drafts.create', budgeter=budgeter)
+
+    assert raised.value.resp.status == 503
+    assert api.stats['faults'] == 1
+    assert budgeter.metrics['rate_limited'] == 0
+
+
+def test_execute_pays_each_call(clock, api):
+    budgeter = QuotaBudgeter()
+    service = _service(api)
+    for i in range(30):
+        assert gmail_api.execute(_draft(service, i), 'drafts.create', budgeter=budgeter)['id']
+
+    assert budgeter.metrics['units'] == 300
+    assert sum(clock.sleeps) == pytest.approx((300 - budgeter.capacity) / budgeter.rate)
+
+
+# ---------------- BATCH REQUESTS ---------------- #
+
+def _batch(api, count, **kwargs):
+    service = _service(api)
+    requests = ((i, _draft(service, i)) for i in range(count))
+    return gmail_api.execute_batch(service, requests, 'drafts.create', batch_uri=api.url + '/batch/gmail/v1',
+                                   **kwargs)
+
+
+def test_batch_sends_each_call_once(clock, api):
+    budgeter = QuotaBudgeter()
+    created, errors = _batch(api, 120, budgeter=budgeter, batch_size=50)
+
+    assert sorted(created) == list(range(120)) and errors == {}
+    assert api.stats['requests'] == 3
+    assert api.stats['batched_calls'] == 120
+    assert budgeter.metrics['units'] == 120 * QUOTA_UNITS['drafts.create']
+
+
+def test_batch_resends_only_the_failed_calls(clock, api):
+    api.rules['gmail'] = Rules(errors={429: 0.2, 503: 0.1, 400: 0.05}, seed=11)
+    budgeter = QuotaBudgeter()
+
+    created, errors = _batch(api, 200, budgeter=budgeter, batch_size=50)
+
+    # Every call ends up created or refused for good (400); retryable failures were sent again
+    assert sorted([*created, *errors]) == list(range(200))
+    assert errors and all(error.resp.status == 400 for error in errors.values())
+    retried = api.stats['faults'] - len(errors)
+    assert retried > 0
+    assert api.stats['batched_calls'] == 200 + retried
+    # ...and nothing that succeeded was sent twice
+    assert api.stats['batched_calls'] - api.stats['faults'] == len(created)
+    assert budgeter.metrics['rate_limited'] > 0
+
+
+def test_batch_gives_up_after_max_retries(clock, api):
+    api.rules['gmail'] = Rules(errors={429: 1.0})
+
+    created, errors = _batch(api, 10, budgeter=QuotaBudgeter(), max_retries=2)
+
+    assert created == {} and sorted(errors) == list(range(10))
+    assert api.stats['batched_calls'] == 30
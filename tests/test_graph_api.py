@@ -0,0 +1,91 @@
+"""Graph $batch requests and upload sessions against the API stand-in"""
+
+import hashlib
+import math
+import os
+
+import pytest
+
+import graph_api
+from benchmarks.standins import StandinAPIServer
+
+TOKEN = 'token'
+
+
+class Clock:
+    """Stands in for the time module inside graph_api: backoff sleeps are recorded, not slept"""
+
+    def __init__(self):
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(graph_api, 'time', clock)
+    return clock
+
+
+def _messages(count):
+    return ((i, graph_api.draft_message(f'user{i}@example.com', f'Subject {i}', '<p>Hi</p>')) for i in range(count))
+
+
+# ---------------- BATCH REQUESTS ---------------- #
+
+def test_batch_creates_each_draft_once():
+    with StandinAPIServer() as api:
+        created, errors = graph_api.create_drafts(TOKEN, _messages(50), base_url=api.url)
+
+        assert errors == {} and sorted(created) == list(range(50))
+        assert api.stats['requests'] == 3  # 20 + 20 + 10
+        assert api.stats['batched_calls'] == 50
+        assert len(api.messages) == 50
+
+
+def test_batch_resends_only_the_throttled_calls(clock):
+    with StandinAPIServer(throttle_every=4) as api:
+        created, errors = graph_api.create_drafts(TOKEN, _messages(60), base_url=api.url)
+
+        assert errors == {} and sorted(created) == list(range(60))
+        # Every call that was not throttled made exactly one draft
+        assert len(api.messages) == 60
+        assert api.stats['batched_calls'] == 60 + api.stats['throttled']
+        assert api.stats['throttled'] > 0 and clock.sleeps
+        assert {created[i]['subject'] for i in range(60)} == {f'Subject {i}' for i in range(60)}
+
+
+# ---------------- ATTACHMENTS ---------------- #
+
+def test_small_attachments_go_inline():
+    with StandinAPIServer() as api:
+        created = graph_api.create_draft(TOKEN, graph_api.draft_message('a@example.com', 'S', '<p>Hi</p>'),
+                                         [('note.txt', b'hello')], base_url=api.url)
+
+        assert api.messages[created['id']]['attachments'] == [
+            {'name': 'note.txt', 'size': 5, 'sha256': hashlib.sha256(b'hello').hexdigest()},
+        ]
+        assert api.stats['upload_chunks'] == 0
+
+
+def test_upload_resumes_after_a_failed_chunk(clock, tmp_path):
+    data = os.urandom(graph_api.INLINE_LIMIT + 12345)
+    path = tmp_path / 'report.pdf'
+    path.write_bytes(data)
+
+    with StandinAPIServer(upload_errors_every=3) as api:
+        created = graph_api.create_draft(TOKEN, graph_api.draft_message('a@example.com', 'S', '<p>Hi</p>'),
+                                         [('report.pdf', str(path))], base_url=api.url,
+                                         chunk_size=graph_api.UPLOAD_UNIT)
+
+        assert api.messages[created['id']]['attachments'] == [
+            {'name': 'report.pdf', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()},
+        ]
+        # Only the chunks that failed were sent again; the file never started over
+        chunks = math.ceil(len(data) / graph_api.UPLOAD_UNIT)
+        failures = len(clock.sleeps)
+        assert failures > 0
+        assert api.stats['upload_chunks'] == chunks + failures
+        assert api.uploads == {}
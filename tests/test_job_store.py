@@ -0,0 +1,178 @@
+"""JobStore: durable due queue, schema migrations and leases"""
+
+import sqlite3
+
+import pytest
+
+from job_store import SCHEMA_VERSION, JobStore
+from jobs import DEFAULT_TEMPLATE, FAILED, IN_FLIGHT, PENDING, SENT, Job
+
+NOW = 1_700_000_000
+
+
+def _job(store, to, due=NOW - 60, intro='Shared intro'):
+    return Job(None, due, to, 'Subject', 'Name', store.texts.intern(intro), store.texts.intern(DEFAULT_TEMPLATE))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def _status(path, job_id):
+    with sqlite3.connect(path) as conn:
+        row = conn.execute('SELECT status, lease_owner FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    return row
+
+
+# ---------------- QUEUE ---------------- #
+
+def test_state_survives_a_restart(path):
+    store = JobStore(path, worker_id='a')
+    store.add_many([_job(store, 'a@example.com'), _job(store, 'b@example.com', due=NOW + 60)])
+    [job] = store.pop_due(NOW)
+    store.mark_sent(job.id)
+    store.close()
+
+    store = JobStore(path, worker_id='a')
+    assert store.counts() == {PENDING: 1, IN_FLIGHT: 0, SENT: 1, FAILED: 0}
+    assert store.next_due() == NOW + 60
+    assert [job.to for job in store.pop_due(NOW + 60)] == ['b@example.com']
+
+
+def test_known_jobs_are_not_added_twice(path):
+    store = JobStore(path)
+    assert len(store.add_many([_job(store, 'a@example.com')])) == 1
+    assert store.add_many([_job(store, 'a@example.com')]) == []
+    assert len(store) == 1
+
+
+def test_status_writes_wait_for_flush(path):
+    store = JobStore(path, worker_id='a', batch_size=100)
+    store.add_many([_job(store, 'a@example.com')])
+    [job] = store.pop_due(NOW)
+    store.mark_sent(job.id)
+
+    assert _status(path, job.id)[0] == IN_FLIGHT
+    store.flush()
+    assert _status(path, job.id)[0] == SENT
+
+
+def test_failures_stop_retrying_after_max_attempts(path):
+    store = JobStore(path, worker_id='a', max_attempts=2)
+    store.add_many([_job(store, 'x@example.com')])
+    for _ in range(2):
+        [job] = store.pop_due(NOW)
+        store.mark_failed(job.id, 'boom', retry_at=NOW - 1)
+        store.flush()
+
+    assert store.counts()[FAILED] == 1
+    assert store.pop_due(NOW) == []
+
+
+def test_newer_schema_is_refused(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION + 1}')
+    conn.close()
+
+    with pytest.raises(RuntimeError):
+        JobStore(path)
+
+
+# ---------------- MIGRATIONS ---------------- #
+
+SCHEMA_V1 = """
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY,
+    dedupe_key TEXT UNIQUE,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    recipient_name TEXT NOT NULL,
+    company_intro TEXT NOT NULL,
+    scheduled_time REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL
+);
+CREATE INDEX idx_jobs_status_time ON jobs (status, scheduled_time);
+"""
+
+
+def test_migrates_schema_1(path):
+    with sqlite3.connect(path) as conn:
+        conn.executescript(SCHEMA_V1)
+        conn.executemany(
+            'INSERT INTO jobs (id, dedupe_key, to_email, subject, recipient_name, company_intro, '
+            'scheduled_time, status, attempts, last_error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (1, 'k1', 'a@example.com', 'S', 'A', 'Shared intro', NOW + 0.25, 'pending', 0, None),
+                (2, 'k2', 'b@example.com', 'S', 'B', 'Shared intro', NOW, 'sent', 1, None),
+                (3, 'k3', 'c@example.com', 'S', 'C', 'Other intro', NOW, 'failed', 5, 'boom'),
+                (4, 'k4', 'd@example.com', 'S', 'D', 'Other intro', NOW, 'in_flight', 0, None),
+            ]
+        )
+    conn.close()
+
+    store = JobStore(path, worker_id='a')
+
+    jobs = {job.to: job for job in store.iter_jobs()}
+    assert {to: job.status for to, job in jobs.items()} == {
+        'a@example.com': PENDING, 'b@example.com': SENT, 'c@example.com': FAILED, 'd@example.com': IN_FLIGHT,
+    }
+    assert jobs['a@example.com'].due == NOW + 1  # rounded up, never early
+    assert jobs['a@example.com'].intro_id == jobs['b@example.com'].intro_id
+    assert store.texts[jobs['c@example.com'].intro_id] == 'Other intro'
+    assert store.texts[jobs['a@example.com'].template_id] == DEFAULT_TEMPLATE
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM texts WHERE body = 'Shared intro'").fetchone()[0] == 1
+    conn.close()
+
+    # The old in-flight row has no lease, so it is free to claim straight away
+    assert store.recover_in_flight() == 1
+    assert sorted(job.to for job in store.pop_due(NOW + 1)) == ['a@example.com', 'd@example.com']
+
+
+# ---------------- LEASES ---------------- #
+
+def test_unexpired_lease_is_not_claimed_by_another_worker(path):
+    first = JobStore(path, worker_id='a', lease_seconds=300)
+    second = JobStore(path, worker_id='b', lease_seconds=300)
+    first.add_many([_job(first, 'x@example.com')])
+
+    assert [job.to for job in first.pop_due(NOW)] == ['x@example.com']
+    assert second.pop_due(NOW) == []
+    assert second.next_due() > NOW  # only the other worker's lease expiring can free it
+
+
+def test_expired_lease_goes_back_to_pending(path):
+    store = JobStore(path, worker_id='a', lease_seconds=0)
+    store.add_many([_job(store, 'x@example.com')])
+    [job] = store.pop_due(NOW)
+
+    assert store.recover_in_flight() == 1
+    assert _status(path, job.id) == (PENDING, None)
+
+
+def test_stolen_lease_result_is_dropped(path):
+    first = JobStore(path, worker_id='a', lease_seconds=0)
+    second = JobStore(path, worker_id='b', lease_seconds=300)
+    first.add_many([_job(first, 'x@example.com')])
+    [job] = first.pop_due(NOW)
+
+    # a's lease ran out; b takes the job over before a reports back
+    [stolen] = second.pop_due(NOW)
+    assert stolen.id == job.id
+    first.mark_sent(job.id)
+    first.flush()
+
+    assert first.lost_leases == 1
+    assert _status(path, job.id) == (IN_FLIGHT, 'b')
+
+    second.mark_failed(job.id, 'boom', retry_at=NOW + 60)
+    second.flush()
+    assert second.lost_leases == 0
+    assert _status(path, job.id) == (PENDING, None)
@@ -0,0 +1,128 @@
+"""MessageWriter output parses back to the message that was written"""
+
+import base64
+import email
+import os
+from email import policy
+
+import pytest
+
+import mime_builder
+from mime_builder import MessageWriter
+
+HEADERS = {'From': 'me@example.com', 'To': 'you@example.com', 'Subject': 'Quick intro', 'Cc': None}
+PDF = b'%PDF-1.4\n' + os.urandom(5000)
+
+BODIES = [
+    'Hi Ada,\n\nShort ASCII body.\n',
+    'Hi Zoë,\n\nNon-ASCII body — base64 encoded.\n',
+    'No trailing newline',
+    '.leading dot\n..two dots\nmiddle . dot\n',
+]
+
+
+def _parse(data):
+    return email.message_from_bytes(bytes(data), policy=policy.default)
+
+
+def _smtp_to_message(data):
+    """What the server stores after DATA: CRLF lines, dot-stuffing undone, terminator dropped"""
+    data = bytes(data)
+    assert data.endswith(b'\r\n.\r\n')
+    assert b'\n' not in data.replace(b'\r\n', b'')
+    lines = data[:-len(b'.\r\n')].split(b'\r\n')
+    return b'\n'.join(line[1:] if line.startswith(b'.') else line for line in lines)
+
+
+def _text_body(message):
+    return message.get_body(('plain', 'html')).get_content()
+
+
+def _assert_headers(message):
+    assert message['From'] == HEADERS['From']
+    assert message['To'] == HEADERS['To']
+    assert message['Subject'] == HEADERS['Subject']
+    assert message['Cc'] is None
+
+
+@pytest.mark.parametrize('body', BODIES)
+@pytest.mark.parametrize('subtype', ['plain', 'html'])
+def test_single_part_round_trip(body, subtype):
+    with MessageWriter().write(HEADERS, body, subtype) as view:
+        message = _parse(view)
+
+    _assert_headers(message)
+    assert message.get_content_type() == f'text/{subtype}'
+    assert _text_body(message).rstrip('\n') == body.rstrip('\n')
+
+
+@pytest.mark.parametrize('body', BODIES)
+def test_alternative_and_attachment_round_trip(body):
+    part = mime_builder.mime_part(PDF, 'resume.pdf')
+    with MessageWriter().write(HEADERS, body, 'html', attachment=part, alternative=True) as view:
+        message = _parse(view)
+
+    _assert_headers(message)
+    assert message.get_content_type() == 'multipart/mixed'
+    [attachment] = message.iter_attachments()
+    assert attachment.get_filename() == 'resume.pdf'
+    assert attachment.get_content_type() == 'application/pdf'
+    assert attachment.get_content() == PDF
+    assert _text_body(message).rstrip('\n') == body.rstrip('\n')
+
+
+@pytest.mark.parametrize('body', BODIES)
+def test_raw_matches_write(body):
+    writer = MessageWriter()
+    part = mime_builder.encode_part(PDF, 'resume.pdf')
+    raw = writer.raw(HEADERS, body, 'html', attachment=part)
+    message = _parse(base64.urlsafe_b64decode(raw))
+
+    [attachment] = message.iter_attachments()
+    assert attachment.get_content() == PDF
+    assert _text_body(message).rstrip('\n') == body.rstrip('\n')
+
+    # Without an attachment, raw is exactly write() encoded
+    plain = writer.raw(HEADERS, body)
+    with writer.write(HEADERS, body) as view:
+        assert base64.urlsafe_b64decode(plain) == bytes(view)
+
+
+@pytest.mark.parametrize('body', BODIES)
+def test_smtp_writer_is_ready_for_data(body):
+    with MessageWriter(smtp=True).write(HEADERS, body, mixed=True) as view:
+        message = _parse(_smtp_to_message(view))
+
+    _assert_headers(message)
+    assert message.get_content_type() == 'multipart/mixed'
+    assert _text_body(message).rstrip('\n') == body.rstrip('\n')
+
+
+def test_smtp_writer_refuses_attachments():
+    with pytest.raises(ValueError):
+        MessageWriter(smtp=True).write(HEADERS, 'x', attachment=mime_builder.mime_part(PDF, 'a.pdf'))
+
+
+def test_long_subject_is_folded():
+    subject = 'Interested in ML roles ' * 8
+    with MessageWriter().write({**HEADERS, 'Subject': subject}, 'x') as view:
+        data = bytes(view)
+
+    assert max(len(line) for line in data.split(b'\n')) <= 78
+    assert _parse(data)['Subject'] == subject
+
+
+def test_buffer_is_reused_and_detach_hands_it_over():
+    writer = MessageWriter()
+    with writer.write(HEADERS, 'a much longer first body ' * 100) as view:
+        first = bytes(view)
+    with writer.write(HEADERS, 'short') as view:
+        second = bytes(view)
+
+    assert _text_body(_parse(second)) == 'short\n'
+    detached = writer.detach()
+    assert bytes(detached) == second
+    assert len(first) > len(second)
+    with writer.write(HEADERS, 'again') as view:
+        assert _text_body(_parse(view)) == 'again\n'
+    assert bytes(detached) == second
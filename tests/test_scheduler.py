@@ -0,0 +1,147 @@
+"""Due queues and the scheduler's sleep-until-next-job"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from scheduler import HeapQueue, Scheduler, TimingWheel
+
+START = 1_700_000_000
+DELAY = 0.2  # seconds; long enough to tell a wake-up from a timeout on a busy machine
+
+
+def test_heap_pops_in_due_order_and_keeps_later_jobs():
+    heap = HeapQueue()
+    for due, job in [(START + 5, 'c'), (START + 1, 'a'), (START + 3, 'b'), (START + 1, 'a2')]:
+        heap.push(due, job)
+
+    assert heap.next_due() == START + 1
+    assert heap.pop_due(START + 3) == ['a', 'a2', 'b']
+    assert heap.pop_due(START + 4) == []
+    assert heap.next_due() == START + 5
+    assert len(heap) == 1
+
+
+def test_wait_sleeps_until_the_next_job_is_due():
+    scheduler = Scheduler()
+    scheduler.add(time.time() + DELAY, 'job')
+
+    start = time.monotonic()
+    scheduler.wait(timeout=10)
+    waited = time.monotonic() - start
+
+    assert DELAY * 0.9 <= waited < DELAY + 1
+    assert scheduler.pop_due() == ['job']
+
+
+def test_wait_returns_at_once_when_a_job_is_overdue():
+    scheduler = Scheduler()
+    scheduler.add(time.time() - 60, 'late')
+
+    start = time.monotonic()
+    scheduler.wait(timeout=10)
+
+    assert time.monotonic() - start < DELAY
+
+
+def test_wait_times_out_on_an_empty_queue():
+    start = time.monotonic()
+    Scheduler().wait(timeout=DELAY)
+
+    assert time.monotonic() - start >= DELAY * 0.9
+
+
+def test_add_wakes_a_sleeping_wait():
+    scheduler = Scheduler()
+    scheduler.add(time.time() + 60, 'later')
+    woke = threading.Event()
+
+    def sleeper():
+        scheduler.wait(timeout=30)
+        woke.set()
+
+    thread = threading.Thread(target=sleeper)
+    thread.start()
+    time.sleep(DELAY)
+    assert not woke.is_set()
+
+    start = time.monotonic()
+    scheduler.add(time.time(), 'now')
+    assert woke.wait(5)
+    assert time.monotonic() - start < 1
+    thread.join()
+    assert scheduler.pop_due() == ['now']
+
+
+# ---------------- TIMING WHEEL ---------------- #
+
+def _fill(queue, dues):
+    for job, due in enumerate(dues):
+        queue.push(due, job)
+
+
+def _drain(queue, steps, limit=None):
+    """What each pop_due(now) returns as `now` walks through `steps`"""
+    return [queue.pop_due(now, limit) for now in steps]
+
+
+@pytest.mark.parametrize('horizon', [90, 3 * 3600, 400 * 86400])  # seconds, minutes, overflow heap
+def test_wheel_pops_the_same_jobs_as_the_heap(horizon):
+    rng = random.Random(horizon)
+    dues = [START + rng.uniform(0, horizon) for _ in range(2000)]
+    steps = sorted(START + rng.uniform(0, horizon * 1.1) for _ in range(50)) + [START + horizon * 2]
+    heap, wheel = HeapQueue(), TimingWheel(now=START)
+    _fill(heap, dues)
+    _fill(wheel, dues)
+
+    for from_heap, from_wheel in zip(_drain(heap, steps), _drain(wheel, steps)):
+        assert sorted(from_wheel) == sorted(from_heap)
+        # The heap pops in due order; the wheel in due order by whole second
+        assert [dues[job] for job in from_heap] == sorted(dues[job] for job in from_heap)
+        seconds = [int(dues[job]) for job in from_wheel]
+        assert seconds == sorted(seconds)
+    assert len(heap) == len(wheel) == 0
+
+
+def test_wheel_keeps_jobs_due_later_in_the_current_second():
+    wheel = TimingWheel(now=START)
+    wheel.push(START + 0.2, 'early')
+    wheel.push(START + 0.8, 'late')
+
+    assert wheel.pop_due(START + 0.5) == ['early']
+    assert wheel.next_due() == START + 0.8
+    assert wheel.pop_due(START + 0.9) == ['late']
+
+
+def test_next_due_matches_the_heap():
+    rng = random.Random(7)
+    heap, wheel = HeapQueue(), TimingWheel(now=START)
+    for job in range(500):
+        due = START + rng.choice([rng.uniform(0, 60), rng.uniform(0, 86400), rng.uniform(0, 400 * 86400)])
+        heap.push(due, job)
+        wheel.push(due, job)
+
+    now = START
+    while len(heap):
+        assert wheel.next_due() == heap.next_due()
+        now = heap.next_due()
+        assert sorted(wheel.pop_due(now)) == sorted(heap.pop_due(now))
+    assert wheel.next_due() is None
+
+
+def test_limit_leaves_the_rest_due():
+    heap, wheel = HeapQueue(), TimingWheel(now=START)
+    _fill(heap, [START + i for i in range(10)])
+    _fill(wheel, [START + i for i in range(10)])
+
+    assert _drain(heap, [START + 20] * 3, limit=4) == _drain(wheel, [START + 20] * 3, limit=4)
+    assert len(heap) == len(wheel) == 0
+
+
+def test_past_due_jobs_pop_at_once():
+    wheel = TimingWheel(now=START)
+    wheel.push(START - 3600, 'overdue')
+
+    assert wheel.pop_due(START) == ['overdue']
@@ -0,0 +1,161 @@
+"""sheet_worker's scans against an in-memory worksheet: duplicates, and the cursor that resumes them"""
+
+import re
+
+import gspread
+import pytest
+
+import sheet_worker
+from sheet_worker import Cursor, find_due, scan
+
+SHEET_ID = 'sheet'
+NOW = 1_700_000_000
+HEADER = ['Draft ID', 'Email', 'Name', 'Subject', 'Send Time', 'Status', 'Created At', 'Sent At', 'Result']
+PAST, FUTURE = '2023-01-01 09:00:00', '2099-01-01 09:00:00'
+
+
+class Worksheet:
+    """In-memory stand-in for the gspread calls sheet_worker makes, counting the rows it reads"""
+
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.spreadsheet = self
+        self.archive = None
+        self.rows_read = 0
+
+    def _read(self, name):
+        first, last = re.fullmatch(r'A(\d*)(?::I(\d*))?', name).groups()
+        start = int(first or 1)
+        end = start if last is None and first else int(last) if last else len(self.rows)
+        values = [row[:1] if last is None and first else row for row in self.rows[start - 1:end]]
+        self.rows_read += len(values)
+        return values
+
+    def get_values(self, name):
+        return self._read(name if name != sheet_worker.READ_RANGE else 'A1:I')
+
+    def batch_get(self, ranges):
+        return [self._read(name) for name in ranges]
+
+    def delete_rows(self, start, end):
+        del self.rows[start - 1:end]
+
+    # spreadsheet methods, for compact()
+    def worksheet(self, title):
+        if self.archive is None:
+            raise gspread.WorksheetNotFound(title)
+        return self.archive
+
+    def add_worksheet(self, title, rows, cols):
+        self.archive = Worksheet([])
+        return self.archive
+
+    def append_rows(self, values):
+        self.rows.extend(values)
+
+
+def _row(draft_id, status='pending', when=PAST):
+    return [draft_id, f'{draft_id}@example.com', 'Name', 'Subject', when, status, PAST]
+
+
+def _finish(worksheet, cursor, sent=()):
+    """One worker run without sending: mark the due rows `sent` and advance the cursor"""
+    rows = scan(worksheet, cursor)
+    due, invalid, waiting = find_due(rows, NOW, cursor.sent)
+    for row in due:
+        if row.draft_id in sent:
+            worksheet.rows[row.number - 1][sheet_worker.STATUS] = 'sent'
+    cursor.remember(row.draft_id for row in due if row.draft_id in sent)
+    cursor.advance(rows, waiting + [row.number for row in due if row.draft_id not in sent])
+    return due, invalid
+
+
+def test_duplicates_of_rows_sent_in_earlier_runs_fail(tmp_path):
+    worksheet = Worksheet([HEADER] + [_row('d1'), _row('d2')])
+    cursor = Cursor(SHEET_ID)
+    _finish(worksheet, cursor, sent={'d1', 'd2'})
+    path = str(tmp_path / 'cursor.json')
+    cursor.save(path)
+    cursor = Cursor.load(path, SHEET_ID)
+
+    worksheet.rows += [_row('d1'), _row('d3'), _row('d3')]
+    due, invalid = _finish(worksheet, cursor, sent={'d3'})
+
+    assert [row.draft_id for row in due] == ['d3']
+    assert [(row.number, row.result) for row in invalid] == [
+        (4, 'duplicate of a row already sent'), (6, 'duplicate of an earlier row'),
+    ]
+
+
+def test_sent_ids_are_bounded(monkeypatch):
+    monkeypatch.setattr(sheet_worker, 'MAX_SENT_IDS', 3)
+    cursor = Cursor(SHEET_ID)
+    cursor.remember(['a', 'b', 'c'])
+    cursor.remember(['a', 'd'])
+
+    assert cursor.sent == ['c', 'a', 'd']
+    cursor.reset()
+    assert (cursor.watermark, cursor.sent) == (1, ['c', 'a', 'd'])
+
+
+def test_resumes_from_the_saved_cursor(tmp_path):
+    worksheet = Worksheet([HEADER] + [_row(f'd{i}') for i in range(10)] + [_row('later', when=FUTURE)])
+    cursor = Cursor(SHEET_ID)
+    due, _ = _finish(worksheet, cursor, sent={f'd{i}' for i in range(10)})
+    assert len(due) == 10
+    assert (cursor.first_row, cursor.watermark, cursor.deferred) == (2, 13, [12])
+
+    path = str(tmp_path / 'cursor.json')
+    cursor.save(path)
+    resumed = Cursor.load(path, SHEET_ID)
+    assert vars(resumed) == vars(cursor)
+
+    worksheet.rows += [_row('new')]
+    worksheet.rows_read = 0
+    due, _ = _finish(worksheet, resumed, sent={'new'})
+
+    assert [row.draft_id for row in due] == ['new']
+    assert worksheet.rows_read == 3  # the new row, the deferred one and the anchor
+    assert (resumed.watermark, resumed.deferred) == (14, [12])
+
+
+def test_missing_or_foreign_state_is_a_full_scan(tmp_path):
+    path = str(tmp_path / 'cursor.json')
+    assert Cursor.load(path, SHEET_ID).watermark == 1
+
+    Cursor('another sheet', watermark=50).save(path)
+    assert Cursor.load(path, SHEET_ID).watermark == 1
+
+
+def test_rows_edited_above_the_cursor_trigger_a_rescan():
+    worksheet = Worksheet([HEADER] + [_row(f'd{i}') for i in range(5)])
+    cursor = Cursor(SHEET_ID)
+    _finish(worksheet, cursor, sent={f'd{i}' for i in range(5)})
+    assert cursor.anchor == 'd4'
+
+    worksheet.rows.insert(3, _row('inserted'))
+    due, _ = _finish(worksheet, cursor, sent={'inserted'})
+
+    assert [row.draft_id for row in due] == ['inserted']
+    assert cursor.watermark == 8
+
+
+@pytest.mark.parametrize('finished', [5, 30])
+def test_compact_archives_finished_rows_and_the_cursor_follows(finished):
+    worksheet = Worksheet([HEADER] + [_row(f'd{i}') for i in range(finished)] + [_row('later', when=FUTURE)])
+    cursor = Cursor(SHEET_ID)
+    _finish(worksheet, cursor, sent={f'd{i}' for i in range(finished)})
+
+    moved = sheet_worker.compact(worksheet, cursor, min_rows=10)
+
+    if finished < 10:
+        assert moved == 0 and worksheet.archive is None
+        return
+    assert moved == finished
+    assert [row[0] for row in worksheet.rows] == ['Draft ID', 'later']
+    assert len(worksheet.archive.rows) == finished
+    assert (cursor.watermark, cursor.deferred) == (3, [2])
+
+    worksheet.rows += [_row('new')]
+    due, _ = _finish(worksheet, cursor, sent={'new'})
+    assert [row.draft_id for row in due] == ['new']
@@ -0,0 +1,95 @@
+"""SMTPPool against the stand-in SMTP server: reuse, retries and never resending after DATA"""
+
+import smtplib
+import socket
+
+import pytest
+
+from benchmarks.standins import StandinSMTPServer
+from smtp_pool import SMTPPool
+
+MESSAGE = b'From: me@example.com\r\nTo: you@example.com\r\nSubject: Hi\r\n\r\nHello\r\n'
+
+
+def _pool(server, **kwargs):
+    return SMTPPool('127.0.0.1', server.port, 'me@example.com', 'secret', use_tls=False, size=1,
+                    health_check_after=60, **kwargs)
+
+
+def _send(pool, count=1):
+    for _ in range(count):
+        pool.sendmail('me@example.com', ['you@example.com'], MESSAGE)
+
+
+def test_connection_is_reused():
+    with StandinSMTPServer() as server:
+        pool = _pool(server)
+        _send(pool, 20)
+        pool.close()
+
+    assert server.stats['messages'] == 20
+    assert server.stats['connections'] == server.stats['logins'] == 1
+
+
+def test_421_before_data_is_retried_once_on_a_new_connection():
+    with StandinSMTPServer(messages_per_connection=2) as server:
+        pool = _pool(server)
+        _send(pool, 5)
+        pool.close()
+
+    assert server.stats['messages'] == 5
+    assert server.stats['connections'] == 3
+    assert pool.stats['reconnects'] == 2
+
+
+def test_dropped_connection_is_replaced():
+    with StandinSMTPServer() as server:
+        pool = _pool(server)
+        _send(pool)
+        pool._idle[0].server.sock.shutdown(socket.SHUT_RDWR)
+        _send(pool)
+        pool.close()
+
+    assert server.stats['messages'] == 2
+    assert server.stats['connections'] == 2
+    assert pool.stats['reconnects'] == 1
+
+
+def test_no_resend_when_the_connection_drops_after_data():
+    with StandinSMTPServer(drop_after_data=1.0) as server:
+        pool = _pool(server)
+        with pytest.raises(smtplib.SMTPServerDisconnected) as raised:
+            _send(pool)
+        pool.close()
+
+    assert raised.value.after_data
+    assert server.stats['messages'] == 1
+    assert server.stats['connections'] == 1
+    assert pool.stats['reconnects'] == 0
+
+
+def test_no_resend_after_a_421_to_the_final_dot():
+    with StandinSMTPServer(errors={421: 1.0}) as server:
+        pool = _pool(server)
+        with pytest.raises(smtplib.SMTPDataError) as raised:
+            _send(pool)
+        pool.close()
+
+    assert raised.value.smtp_code == 421
+    assert server.stats['faults'] == 1
+    assert server.stats['connections'] == 1
+
+
+def test_answered_refusal_keeps_the_connection():
+    with StandinSMTPServer(errors={550: 1.0}) as server:
+        pool = _pool(server)
+        for _ in range(3):
+            with pytest.raises(smtplib.SMTPDataError):
+                _send(pool)
+        server.rules.errors = {}
+        _send(pool)
+        pool.close()
+
+    assert server.stats['faults'] == 3
+    assert server.stats['messages'] == 1
+    assert server.stats['connections'] == 1
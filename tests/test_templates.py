@@ -0,0 +1,85 @@
+"""Compiled templates render what str.format would"""
+
+import pytest
+
+from templates import Template, TemplateRegistry, compiled, parse, registry
+
+CONTEXT = {'recipient_name': 'Ada', 'company_intro': "It's {not} a slot", 'count': 3.14159}
+
+
+@pytest.mark.parametrize('source', [
+    'Hi {recipient_name},\n\n{company_intro}',
+    '{recipient_name}{recipient_name}',
+    'literal {{braces}} around {recipient_name}',
+    '{recipient_name!r} and {company_intro!a}',
+    '{count:.2f} / {recipient_name:>6} / {count!s:>10}',
+    'no slots at all',
+    '',
+])
+def test_render_matches_str_format(source):
+    template = Template(source)
+
+    assert template.render(CONTEXT) == source.format(**CONTEXT)
+    assert template.render(**CONTEXT) == source.format(**CONTEXT)
+    assert template.render_batch([CONTEXT, {**CONTEXT, 'recipient_name': 'Bob'}]) == [
+        source.format(**CONTEXT), source.format(**{**CONTEXT, 'recipient_name': 'Bob'})
+    ]
+
+
+def test_source_round_trips():
+    source = 'A {{literal}} {recipient_name!r:>8} {count:.1f}'
+
+    assert Template(source).source == source
+    assert Template(Template(source).source).render(CONTEXT) == source.format(**CONTEXT)
+
+
+def test_slot_text_is_never_compiled():
+    template = Template("{recipient_name}' + __import__('os').getcwd() + '")
+
+    assert template.render(recipient_name='x') == "x' + __import__('os').getcwd() + '"
+
+
+def test_missing_slot_raises_key_error():
+    with pytest.raises(KeyError):
+        Template('Hi {recipient_name}').render(company_intro='x')
+
+
+@pytest.mark.parametrize('source', ['{0}', '{}', '{a.b}', '{a[0]}', '{a:{b}}'])
+def test_unsupported_placeholders_are_rejected(source):
+    with pytest.raises(ValueError):
+        parse(source)
+
+
+def test_bind_folds_values_and_splices_templates():
+    closing = Template('\n{outro}')
+    email = Template('Hi {recipient_name},{closing}\n{signature}').bind(closing=closing, signature='-- {me}')
+
+    assert email.slots == ('recipient_name', 'outro')
+    # A bound str is text, not a template: its braces stay literal
+    assert email.render(recipient_name='Ada', outro='Bye') == 'Hi Ada,\nBye\n-- {me}'
+
+
+def test_bind_applies_a_slots_format_spec():
+    assert Template('[{count:.1f}]').bind(count=2.25).render() == '[2.2]'
+
+
+def test_compiled_is_cached_by_source():
+    assert compiled('Hi {recipient_name}') is compiled('Hi {recipient_name}')
+    assert compiled('Hi {recipient_name}').render(recipient_name='Ada') == 'Hi Ada'
+
+
+def test_registry_register_binds_and_names():
+    templates = TemplateRegistry()
+    templates.register('t/sig', 'Thanks,\n{me}', me='Ada')
+    templates.register('t/email', 'Hi {recipient_name}\n{signature}', signature=templates['t/sig'])
+
+    assert templates.names('t/') == ['t/sig', 't/email']
+    assert templates.render('t/email', recipient_name='Bob') == 'Hi Bob\nThanks,\nAda'
+    assert templates['t/email'].name == 't/email'
+
+
+def test_shipped_layouts_leave_only_per_recipient_slots():
+    email = registry['html/email'].bind(experience=registry['html/ml_systems'], closing='')
+
+    assert set(email.slots) == {'recipient_name', 'company_intro'}
+    assert email.render(CONTEXT).startswith('<p>Hi Ada,</p>\n<p>It\'s {not} a slot</p>\n')
@@ -0,0 +1,93 @@
+"""TokenManager's single-flight refresh against the OAuth stand-in"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+
+from benchmarks.standins import Rules, StandinAPIServer
+from token_manager import TokenManager
+
+THREADS = 16
+
+
+@pytest.fixture
+def api():
+    # Slow token calls, so every thread is queued behind the first refresh
+    with StandinAPIServer(rules={'oauth': Rules(latency=0.2)}) as api:
+        yield api
+
+
+def _expire(manager):
+    # google-auth keeps expiry as naive UTC
+    manager.credentials.expiry = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+
+
+def _manager(api):
+    credentials = Credentials('expired', refresh_token='refresh', token_uri=api.url + '/token',
+                              client_id='client', client_secret='secret')
+    manager = TokenManager(credentials)
+    _expire(manager)
+    return manager
+
+
+def _get_all(manager):
+    """manager.get() from THREADS threads at once: (tokens, errors)"""
+    barrier = threading.Barrier(THREADS)
+    tokens, errors = [], []
+
+    def get():
+        barrier.wait()
+        try:
+            tokens.append(manager.get().token)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tokens, errors
+
+
+def test_expired_token_is_refreshed_once(api):
+    manager = _manager(api)
+
+    tokens, errors = _get_all(manager)
+
+    assert errors == []
+    assert len(tokens) == THREADS and len(set(tokens)) == 1 and tokens[0] != 'expired'
+    assert api.stats['token_refreshes'] == manager.refreshes == 1
+
+
+def test_one_token_request_per_expiry(api):
+    manager = _manager(api)
+
+    first, _ = _get_all(manager)
+    _get_all(manager)  # still valid: nobody refreshes
+    _expire(manager)
+    second, _ = _get_all(manager)
+
+    assert len(set(first)) == len(set(second)) == 1 and first[0] != second[0]
+    assert api.stats['token_refreshes'] == manager.refreshes == 2
+
+
+def test_waiters_get_the_failed_refresh_error(api):
+    api.rules['oauth'] = Rules(latency=0.2, errors={400: 1.0})
+    manager = _manager(api)
+
+    tokens, errors = _get_all(manager)
+
+    # One token request; the threads queued behind it raise its error instead of trying again
+    assert tokens == [] and len(errors) == THREADS
+    assert all(error is errors[0] for error in errors)
+    assert isinstance(errors[0], RefreshError)
+    assert api.stats['requests'] == api.stats['faults'] == 1
+
+    # The next caller starts a fresh attempt
+    api.rules['oauth'] = Rules()
+    assert manager.get().token != 'expired'
+    assert api.stats['token_refreshes'] == 1
@@ -0,0 +1,203 @@
+"""
+Shared OAuth credentials for every Gmail send path.
+
+Each account has exactly one TokenManager per process. It keeps the
+Credentials object in memory and refreshes it from a background thread
+REFRESH_MARGIN seconds before the access token expires (half way through
+the lifetime of tokens that live shorter than twice that), so senders
+never wait on the token endpoint. If a token does expire (the refresher was
+stopped or refreshes keep failing), get() refreshes inline. Concurrent
+refreshes are single-flight: the first thread calls the token endpoint,
+and threads that queued behind it reuse its result.
+
+Token files are rewritten atomically (temp file + os.replace), so a crash
+mid-save leaves the old token instead of a truncated one.
+
+    manager = token_manager.for_file('token.json', SCOPES)
+    service = gmail_api.get_service(manager.get())
+    sender = async_engine.GmailRESTTransport(manager.token)
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+# google-auth itself refreshes inline once a token is within 3m45s of expiry;
+# refreshing earlier keeps that from ever happening on a send path
+REFRESH_MARGIN = 300
+RETRY_DELAY = 15  # First retry after a failed background refresh, doubled up to REFRESH_MARGIN
+
+
+def write_atomic(path, text):
+    """Replace `path` with `text` so readers see either the old or the new file, never a partial one"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class TokenManager:
+    """In-memory credentials for one account, refreshed ahead of expiry"""
+
+    def __init__(self, credentials, path=None, refresh_margin=REFRESH_MARGIN, on_refresh=None):
+        self.credentials = credentials
+        self.path = path  # token file kept in sync after every refresh
+        self.refresh_margin = refresh_margin
+        self.on_refresh = on_refresh  # called with the credentials after every refresh
+        self.refreshes = 0
+        self._lifetime = None  # seconds the last refreshed token was valid for
+        self._request = Request()
+        self._lock = threading.Lock()
+        self._attempts = 0
+        self._error = None  # outcome of the last attempt, handed to callers that waited on it
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, scopes, **kwargs):
+        return cls(Credentials.from_authorized_user_file(path, scopes), path=path, **kwargs)
+
+    @classmethod
+    def from_info(cls, info, scopes, **kwargs):
+        return cls(Credentials.from_authorized_user_info(info, scopes), **kwargs)
+
+    # ---------------- ACCESS ---------------- #
+
+    def seconds_left(self):
+        """Seconds until the access token expires (None if it carries no expiry)"""
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return None
+        # google-auth keeps expiry as naive UTC
+        return (expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+
+    def margin(self):
+        """How long before expiry to refresh: refresh_margin, capped at half the token's lifetime"""
+        if self._lifetime is None:
+            return self.refresh_margin
+        return min(self.refresh_margin, self._lifetime / 2)
+
+    def stale(self):
+        """Due for a background refresh"""
+        if not self.credentials.token:
+            return True
+        left = self.seconds_left()
+        return left is not None and left <= self.margin()
+
+    def get(self):
+        """Credentials with a usable access token"""
+        # Only block once google-auth itself would refuse the token; inside the
+        # margin the old token still works while the background refresh runs
+        attempt = self._attempts
+        if not self.credentials.valid and self.credentials.refresh_token:
+            self._refresh(attempt)
+        return self.credentials
+
+    def token(self):
+        """Current access token (for raw HTTP senders such as async_engine)"""
+        return self.get().token
+
+    def refresh(self):
+        """Refresh now; callers that queued behind a running refresh share its result (or its error)"""
+        return self._refresh(self._attempts)
+
+    def _refresh(self, attempt):
+        # `attempt` is the count seen before deciding to refresh; if it moved, someone refreshed since
+        with self._lock:
+            if self._attempts != attempt:
+                if self._error is not None:
+                    raise self._error
+                return self.credentials
+            try:
+                self.credentials.refresh(self._request)
+                self._error = None
+            except Exception as e:
+                self._error = e
+                raise
+            finally:
+                self._attempts += 1
+            self.refreshes += 1
+            self._lifetime = self.seconds_left()
+            if self.path:
+                write_atomic(self.path, self.credentials.to_json())
+        if self.on_refresh:
+            self.on_refresh(self.credentials)
+        return self.credentials
+
+    # ---------------- BACKGROUND REFRESH ---------------- #
+
+    def start(self):
+        """Start the background refresher (no-op without a refresh token or if already running)"""
+        if self.credentials.refresh_token and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='token-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        retry_delay = RETRY_DELAY
+        while not self._stop.is_set():
+            if self.stale():
+                try:
+                    self.refresh()
+                    retry_delay = RETRY_DELAY
+                except Exception as e:
+                    print(f"⚠️ Token refresh failed, retrying in {retry_delay}s: {e}")
+                    self._stop.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, self.refresh_margin)
+                    continue
+            left = self.seconds_left()
+            margin = self.margin()
+            if left is None:
+                self._stop.wait()  # No expiry: the token never goes stale on its own
+            elif left > margin:
+                self._stop.wait(left - margin)
+            else:
+                # A fresh token that is already stale (it came back expired); don't refresh in a loop
+                self._stop.wait(max(left, RETRY_DELAY))
+
+
+# ---------------- SHARED MANAGERS ---------------- #
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def _shared(key, create):
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = create().start()
+        return manager
+
+
+def for_file(path, scopes, **kwargs):
+    """Process-wide manager for a token file (loaded once, saved after every refresh)"""
+    path = os.path.abspath(path)
+    return _shared(('file', path), lambda: TokenManager.from_file(path, scopes, **kwargs))
+
+
+def for_info(info, scopes, **kwargs):
+    """Process-wide manager for authorized-user info such as a token pasted into a Streamlit session"""
+    key = ('info', info.get('client_id'), info.get('refresh_token') or info.get('token'))
+    return _shared(key, lambda: TokenManager.from_info(info, scopes, **kwargs))
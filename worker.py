@@ -0,0 +1,70 @@
+"""
+Multi-process scheduler workers sharing one job store.
+
+Every worker opens its own connection to the SQLite job store and leases
+due jobs through job_store.JobStore.pop_due, so two workers never claim
+the same email and jobs held by a worker that crashed are picked up by
+the others once their lease runs out. The same loop runs on other hosts
+as long as they share a store with the same claim semantics (SQLite
+itself is only safe on a local disk, not a network share).
+
+simple_app starts these when WORKERS > 1.
+"""
+
+import multiprocessing
+import time
+
+from scheduler import dispatch
+
+POLL_INTERVAL = 5.0  # Max seconds between store checks (other workers add and finish jobs too)
+
+
+def run_worker(store, send, on_result, max_workers=1, batch_size=500,
+               poll_interval=POLL_INTERVAL, exit_when_done=True, stop=None):
+    """
+    Lease and send due jobs until nothing is left (or `stop` is set).
+
+    `send(job) -> (success, message)` and `on_result(job, success, message)`
+    are the same callables scheduler.dispatch takes. Returns (sent, failed).
+    """
+    sent = failed = 0
+    while stop is None or not stop.is_set():
+        jobs = store.pop_due(time.time(), batch_size)
+        if jobs:
+            report = dispatch(jobs, send, due_of=lambda job: job.due,
+                              max_workers=max_workers, on_result=on_result)
+            store.flush()
+            sent += report.sent
+            failed += report.failed
+            continue
+
+        next_due = store.next_due()
+        if next_due is None and exit_when_done:
+            break
+        delay = poll_interval if next_due is None else min(poll_interval, max(0.0, next_due - time.time()))
+        if stop is None:
+            time.sleep(delay)
+        else:
+            stop.wait(delay)
+    return sent, failed
+
+
+def start_workers(count, target, *args):
+    """Run `target(*args)` in `count` fresh processes and wait for all of them"""
+    # spawn, not fork: each worker must open its own SQLite connection and SMTP sockets
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=target, args=args, name=f'scheduler-worker-{i}')
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the whole process group; let the workers record their results
+        for process in processes:
+            process.join()
+        raise
+    return [process.exitcode for process in processes]